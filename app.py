@@ -1,7 +1,14 @@
+import logging
+import queue
+from datetime import timedelta
 import streamlit as st
-import pandas as pd
-from datetime import datetime, timedelta
-from scraper import AuchanScraper
+from filtres import semaine_courante, seuil_par_defaut
+
+# pandas, Playwright et le scraper sont importés au premier usage (charger_* ci-dessous) :
+# au démarrage à froid, les contrôles s'affichent sans attendre que pandas soit chargé
+
+# Logs structurés des phases de scraping (une ligne JSON par phase)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
 
 # Configuration de la page
 st.set_page_config(
@@ -27,16 +34,28 @@ with st.sidebar:
     
     username = os.getenv("auchan_username")
     password = os.getenv("auchan_password")
+    
+    # Plusieurs comptes @GP : RAPTHOR_COMPTES (JSON) remplace auchan_username / auchan_password
+    identifiants = bool(username and password or os.getenv("RAPTHOR_COMPTES"))
 
-if username and password:
+if identifiants:
     st.success("✅ Identifiants configurés")
 else:
     st.error("❌ Variables d'environnement manquantes sur Render")
-    st.info("Configurez auchan_username et auchan_password dans Environment sur Render")
+    st.info("Configurez auchan_username et auchan_password (ou RAPTHOR_COMPTES) dans Environment sur Render")
 
 # Zone principale
 st.header("📅 Commandes de la semaine")
-st.info("📆 Semaine en cours : du 24/11/2025 au 30/11/2025")
+
+periode = st.date_input(
+    "📆 Période de livraison",
+    value=semaine_courante(),
+    format="DD/MM/YYYY",
+    help="Par défaut : la semaine en cours (lundi au dimanche)"
+)
+# Tant que la deuxième date n'est pas choisie, on reste sur une seule journée
+debut, fin = (periode[0], periode[-1]) if periode else semaine_courante()
+st.info(f"📆 Période : du {debut:%d/%m/%Y} au {fin:%d/%m/%Y}")
 
 col1, col2 = st.columns(2)
 
@@ -45,105 +64,294 @@ with col1:
     show_desadv = st.checkbox("DESADV à faire uniquement", value=True)
 
 with col2:
-    show_sup_850 = st.checkbox("Montants > 850€", value=True)
+    seuil = st.number_input("Seuil des grosses commandes (€)", min_value=0.0, value=seuil_par_defaut(), step=50.0)
+    show_sup_seuil = st.checkbox(f"Montants > {seuil:,.0f}€", value=True)
     show_totaux = st.checkbox("Total par client", value=True)
 
 st.markdown("---")
 
-# Bouton de lancement
-if st.button("🚀 Lancer le scraping", type="primary", use_container_width=True):
+# Stockage local des commandes, partagé entre les sessions Streamlit.
+# store.py importe pandas : il n'est chargé qu'après les contrôles, et seulement s'il sert
+CHEMIN_DB = os.getenv("RAPTHOR_DB", "/tmp/rapthor.db")
+
+
+@st.cache_resource
+def charger_store():
+    from store import CommandeStore
+    return CommandeStore(CHEMIN_DB)
+
+
+# Historique Parquet des scrapings (pyarrow importé seulement quand l'archive sert)
+@st.cache_resource
+def charger_archive():
+    from archive import ArchiveParquet
+    return ArchiveParquet()
+
+
+def afficher_resultats(resultats):
+    """Affiche les onglets de résultats (commandes, DESADV, > seuil, totaux)"""
+    seuil = resultats["seuil"]
     
-    if not username or not password:
+    # Onglets pour différentes vues
+    tab1, tab2, tab3, tab4 = st.tabs([
+        "📋 Toutes les commandes", 
+        "📦 DESADV à faire", 
+        f"💰 Commandes > {seuil:,.0f}€",
+        "👥 Total par client"
+    ])
+
+    with tab1:
+        df = resultats["commandes"]
+        if show_all and not df.empty:
+            st.subheader(f"📋 {len(df)} commandes trouvées")
+            st.dataframe(df, use_container_width=True)
+
+            # Bouton téléchargement
+            csv = df.to_csv(index=False).encode('utf-8')
+            st.download_button(
+                "📥 Télécharger CSV",
+                csv,
+                f"commandes_{debut:%Y%m%d}-{fin:%Y%m%d}.csv",
+                "text/csv"
+            )
+        else:
+            st.info("Aucune commande à afficher")
+
+    with tab2:
+        df_desadv = resultats["desadv_a_faire"]
+        if show_desadv and not df_desadv.empty:
+            st.subheader(f"📦 {len(df_desadv)} DESADV à faire")
+            st.dataframe(df_desadv, use_container_width=True)
+
+            st.metric("Nombre de DESADV", len(df_desadv))
+            
+            # Lignes des commandes (EAN, quantités, prix) pour préparer les DESADV
+            lignes = resultats.get("lignes_desadv")
+            if lignes is not None and not lignes.empty:
+                with st.expander(f"📦 Détail : {len(lignes)} ligne(s) sur {lignes['numero'].nunique()} commande(s)"):
+                    st.dataframe(lignes, use_container_width=True)
+        else:
+            st.success("✅ Aucun DESADV à faire")
+
+    with tab3:
+        df_seuil = resultats["commandes_sup_seuil"]
+        if show_sup_seuil and not df_seuil.empty:
+            st.subheader(f"💰 {len(df_seuil)} commandes > {seuil:,.0f}€")
+            st.dataframe(df_seuil, use_container_width=True)
+
+            st.metric("Montant total", f"{df_seuil['montant'].sum():,.2f} €")
+        else:
+            st.info(f"Aucune commande > {seuil:,.0f}€")
+
+    with tab4:
+        totaux = resultats["total_par_client"]
+        if show_totaux and not totaux.empty:
+            st.subheader("👥 Récapitulatif par client")
+
+            for client, info in totaux.iterrows():
+                with st.expander(f"**{client}** - {info['nb_commandes']} commande(s)"):
+                    col_a, col_b = st.columns(2)
+                    with col_a:
+                        st.metric("Montant total", f"{info['montant_total']:,.2f} €")
+                    with col_b:
+                        st.metric("Nombre de commandes", info['nb_commandes'])
+
+                    st.write("**Numéros de commandes:**")
+                    st.write(", ".join(info['commandes']))
+
+                    if info['montant_total'] > seuil:
+                        st.warning(f"⚠️ Total > {seuil:,.0f}€")
+        else:
+            st.info("Aucun client trouvé")
+
+
+# Firefox gardé ouvert entre les scrapings (relancé en cas de panne, recyclé après N usages)
+@st.cache_resource
+def charger_navigateur():
+    from navigateur import NavigateurPartage
+    return NavigateurPartage()
+
+
+# Scraping en arrière-plan, un seul job à la fois pour tout le conteneur.
+# Le navigateur est préchauffé sur le thread de scraping dès le démarrage du scheduler, seulement
+# avec RAPTHOR_BACKEND=playwright : en auto, Firefox n'est lancé qu'au premier repli JavaScript
+# (pas de navigateur résident si le HTTP pur suffit) ; RAPTHOR_PRECHAUFFAGE=0 le désactive
+@st.cache_resource
+def charger_scheduler():
+    from functools import partial
+    from async_engine import comptes_configures
+    from scheduler import ScrapeScheduler
+    from scraper import AuchanScraper
+    
+    comptes = comptes_configures()
+    navigateur = charger_navigateur()
+    scraper_factory = partial(AuchanScraper, navigateur=navigateur)
+    prechauffage = None
+    # Plusieurs comptes : le moteur async lance son propre Firefox, rien à préchauffer
+    if (os.getenv("RAPTHOR_PRECHAUFFAGE", "1") == "1" and os.getenv("RAPTHOR_BACKEND", "auto") == "playwright"
+            and len(comptes) == 1):
+        prechauffage = navigateur.prechauffer
+    return ScrapeScheduler(
+        comptes[0]["username"], comptes[0]["password"], charger_store(), scraper_factory=scraper_factory,
+        prechauffage=prechauffage, archive=charger_archive(), comptes=comptes,
+    ).demarrer()
+
+
+# Résultats mis en cache entre les reruns Streamlit : un changement de case à cocher
+# ne relance ni scraping ni requête ; la version du stockage invalide le cache après chaque synchro
+@st.cache_data(ttl=int(os.getenv("RAPTHOR_CACHE_TTL", "600")), show_spinner=False)
+def charger_resultats(debut, fin, seuil, version):
+    return charger_store().resultats(debut, fin, seuil)
+
+
+@st.cache_data(ttl=int(os.getenv("RAPTHOR_CACHE_TTL", "600")), show_spinner=False)
+def analyser_archive(debut, fin, seuil, comptes, version):
+    archive = charger_archive()
+    return archive.totaux_par_client(debut, fin, comptes), archive.evolution_hebdomadaire(debut, fin, seuil, comptes)
+
+
+# Bouton de rafraîchissement : rejoint le scraping en cours au lieu d'en lancer un second
+scraping_lance = st.button("🔄 Rafraîchir maintenant", type="primary", use_container_width=True)
+
+# Les contrôles sont affichés : le scheduler (scraper, Playwright, pandas) peut maintenant être chargé
+scheduler = None
+if identifiants:
+    try:
+        scheduler = charger_scheduler()
+    except ValueError as e:
+        # RAPTHOR_COMPTES vide ou mal formé : signalé à chaque rerun au lieu de faire planter la page
+        st.error(f"❌ {e}")
+if scraping_lance:
+    
+    if scheduler is None:
         st.error("❌ Veuillez configurer vos identifiants dans les variables d'environnement")
     else:
-        # Créer une zone pour les logs
-        log_placeholder = st.empty()
-        progress_bar = st.progress(0)
+        import pandas as pd
         
-        with st.spinner("🔄 Connexion et extraction en cours..."):
-            # Créer le scraper
-            scraper = AuchanScraper(username, password)
-            
-            # Lancer le scraping (sans paramètre de date)
+        # Les commandes s'affichent au fur et à mesure de l'extraction, page par page
+        progress_bar = st.progress(0.0, text="🔄 Connexion et extraction en cours...")
+        zone_commandes = st.empty()
+        
+        job, file = scheduler.suivre(debut, fin)
+        lots = []
+        while True:
             try:
-                resultats = scraper.scraper_commandes()
-                progress_bar.progress(100)
-            except Exception as e:
-                st.error(f"❌ Erreur critique: {str(e)}")
-                resultats = {"success": False, "message": str(e)}
+                evenement = file.get(timeout=1)
+            except queue.Empty:
+                if job.done() and file.empty():
+                    break
+                continue
             
-            # Afficher les résultats
-            if resultats["success"]:
-                st.success(f"✅ {resultats['message']}")
-                
-                # Onglets pour différentes vues
-                tab1, tab2, tab3, tab4 = st.tabs([
-                    "📋 Toutes les commandes", 
-                    "📦 DESADV à faire", 
-                    "💰 Commandes > 850€",
-                    "👥 Total par client"
-                ])
-                
-                with tab1:
-                    if show_all and resultats["commandes"]:
-                        st.subheader(f"📋 {len(resultats['commandes'])} commandes trouvées")
-                        df = pd.DataFrame(resultats["commandes"])
-                        st.dataframe(df, use_container_width=True)
-                        
-                        # Bouton téléchargement
-                        csv = df.to_csv(index=False).encode('utf-8')
-                        st.download_button(
-                            "📥 Télécharger CSV",
-                            csv,
-                            f"commandes_semaine_24-30_nov.csv",
-                            "text/csv"
-                        )
-                    else:
-                        st.info("Aucune commande à afficher")
-                
-                with tab2:
-                    if show_desadv and resultats["desadv_a_faire"]:
-                        st.subheader(f"📦 {len(resultats['desadv_a_faire'])} DESADV à faire")
-                        df_desadv = pd.DataFrame(resultats["desadv_a_faire"])
-                        st.dataframe(df_desadv, use_container_width=True)
-                        
-                        st.metric("Nombre de DESADV", len(resultats["desadv_a_faire"]))
-                    else:
-                        st.success("✅ Aucun DESADV à faire")
-                
-                with tab3:
-                    if show_sup_850 and resultats["commandes_sup_850"]:
-                        st.subheader(f"💰 {len(resultats['commandes_sup_850'])} commandes > 850€")
-                        df_850 = pd.DataFrame(resultats["commandes_sup_850"])
-                        st.dataframe(df_850, use_container_width=True)
-                        
-                        total = sum(cmd["montant"] for cmd in resultats["commandes_sup_850"])
-                        st.metric("Montant total", f"{total:,.2f} €")
-                    else:
-                        st.info("Aucune commande > 850€")
-                
-                with tab4:
-                    if resultats["total_par_client"]:
-                        st.subheader("👥 Récapitulatif par client")
-                        
-                        for client, info in resultats["total_par_client"].items():
-                            with st.expander(f"**{client}** - {info['nb_commandes']} commande(s)"):
-                                col_a, col_b = st.columns(2)
-                                with col_a:
-                                    st.metric("Montant total", f"{info['montant_total']:,.2f} €")
-                                with col_b:
-                                    st.metric("Nombre de commandes", info['nb_commandes'])
-                                
-                                st.write("**Numéros de commandes:**")
-                                st.write(", ".join(info['commandes']))
-                                
-                                if info['montant_total'] > 850:
-                                    st.warning("⚠️ Total > 850€")
-                    else:
-                        st.info("Aucun client trouvé")
-                        
-            else:
-                st.error(f"❌ {resultats['message']}")
+            if evenement["type"] == "fin":
+                break
+            elif evenement["type"] == "phase":
+                progress_bar.progress(evenement["progression"], text=f"⏳ {evenement['phase']} ({evenement['statut']})")
+            elif evenement["type"] == "commandes":
+                if not evenement["commandes"].empty:
+                    lots.append(evenement["commandes"])
+                nb_commandes = 0
+                if lots:
+                    df_partiel = pd.concat(lots, ignore_index=True).drop_duplicates("numero")
+                    nb_commandes = len(df_partiel)
+                    zone_commandes.dataframe(df_partiel, use_container_width=True)
+                progress_bar.progress(
+                    evenement["progression"],
+                    text=f"📑 Page {evenement['pages_faites']}/{evenement['nb_pages']} - {nb_commandes} commande(s)"
+                )
+        
+        try:
+            job.result()
+            charger_resultats.clear()
+        except Exception as e:
+            st.error(f"❌ Erreur critique: {str(e)}")
+        progress_bar.progress(1.0, text="✅ Extraction terminée")
+        zone_commandes.empty()
+
+if scheduler is not None:
+    snapshot = scheduler.snapshot(debut, fin)
+    if scheduler.en_cours(debut, fin):
+        st.info("⏳ Rafraîchissement en cours en arrière-plan...")
+    if snapshot:
+        if snapshot["success"]:
+            rapport = snapshot["rapport"]
+            st.success(f"✅ {snapshot['message']} (mis à jour à {snapshot['horodatage']:%H:%M:%S})")
+            st.caption(
+                f"🗄️ {len(rapport['nouvelles'])} nouvelle(s), {len(rapport['modifiees'])} modifiée(s), "
+                f"{len(rapport['disparues'])} disparue(s) depuis la dernière synchronisation"
+            )
+        else:
+            st.error(f"❌ {snapshot['message']} ({snapshot['horodatage']:%H:%M:%S})")
+        
+        if snapshot["phases"]:
+            with st.expander(f"⏱️ Durée par phase - total {snapshot['duree_totale_s']} s"):
+                st.dataframe(snapshot["phases"], use_container_width=True)
+        
+        # Listes DESADV / factures lues dans la même session (RAPTHOR_DOCUMENTS)
+        rapprochement = snapshot.get("rapprochement")
+        if rapprochement is not None and not rapprochement.empty:
+            with st.expander(f"🚚 Rapprochement commandes / DESADV / factures - {len(rapprochement)} commande(s)"):
+                colonnes = st.columns(2)
+                if "expediee" in rapprochement:
+                    colonnes[0].metric("Sans DESADV envoyé", int((~rapprochement["expediee"]).sum()))
+                if "facturee" in rapprochement:
+                    colonnes[1].metric("Non facturées", int((~rapprochement["facturee"]).sum()))
+                st.dataframe(rapprochement, use_container_width=True)
+
+# Afficher les résultats depuis le stockage local (instantané, sans relancer de scraping).
+# Sans scheduler ni base existante, il n'y a rien à afficher : ni store ni pandas à importer
+if scheduler is not None or os.path.exists(CHEMIN_DB):
+    store = charger_store()
+    resultats = charger_resultats(debut, fin, seuil, store.version)
+    if resultats["success"]:
+        st.info(f"🗄️ Données locales - dernière synchronisation: {store.derniere_synchro()}")
+        afficher_resultats(resultats)
+
+# Historique : l'archive Parquet n'est lue que si la section est ouverte
+st.markdown("---")
+if st.checkbox("📈 Analyse de l'historique", value=False):
+    archive = charger_archive()
+    historique = st.date_input(
+        "📆 Période analysée",
+        value=(fin - timedelta(weeks=13), fin),
+        format="DD/MM/YYYY",
+        key="periode_historique",
+        help="Par défaut : le dernier trimestre",
+    )
+    h_debut, h_fin = (historique[0], historique[-1]) if historique else (fin - timedelta(weeks=13), fin)
+    comptes = archive.comptes()
+    if len(comptes) > 1:
+        comptes = st.multiselect("Comptes", comptes, default=comptes)
+    
+    totaux, evolution = analyser_archive(h_debut, h_fin, seuil, tuple(comptes), archive.version)
+    if evolution.empty:
+        st.info("Aucune commande archivée sur cette période")
+    else:
+        col_a, col_b, col_c = st.columns(3)
+        col_a.metric("Montant total", f"{evolution['montant_total'].sum():,.2f} €")
+        col_b.metric("Commandes", int(evolution["nb_commandes"].sum()))
+        col_c.metric(f"Commandes > {seuil:,.0f}€", int(evolution["nb_sup_seuil"].sum()))
+        
+        st.subheader("👥 Montant par client et par semaine")
+        st.line_chart(totaux)
+        
+        st.subheader("📊 Évolution d'une semaine sur l'autre")
+        st.dataframe(evolution, use_container_width=True)
+        
+        # Fichiers générés au clic, lot par lot depuis l'archive (rien n'est préparé à chaque rerun)
+        nom = f"historique_{h_debut:%Y%m%d}-{h_fin:%Y%m%d}"
+        col_csv, col_xlsx = st.columns(2)
+        col_csv.download_button(
+            "📥 Télécharger CSV",
+            lambda: archive.exporter_csv(h_debut, h_fin, comptes),
+            f"{nom}.csv",
+            "text/csv",
+        )
+        col_xlsx.download_button(
+            "📥 Télécharger XLSX",
+            lambda: archive.exporter_xlsx(h_debut, h_fin, comptes),
+            f"{nom}.xlsx",
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
 
 # Footer
 st.markdown("---")
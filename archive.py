@@ -0,0 +1,223 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+from urllib.parse import unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from openpyxl import Workbook
+
+from pipeline import commandes_dataframe
+
+
+# Colonnes archivées : celles de pipeline.COLONNES, client en texte (une catégorie par fichier ne se fusionne pas)
+SCHEMA = pa.schema([
+    ("numero", pa.string()),
+    ("client", pa.string()),
+    ("livrer_a", pa.string()),
+    ("date_creation", pa.timestamp("ms")),
+    ("date_livraison", pa.timestamp("ms")),
+    ("gln", pa.string()),
+    ("montant", pa.float64()),
+    ("statut", pa.string()),
+    ("desadv", pa.bool_()),
+    ("scrape_le", pa.timestamp("us")),
+    # Version marquant une commande disparue du portail (annulée) : elle masque les précédentes à la lecture
+    ("disparu", pa.bool_()),
+])
+
+# Répertoires semaine=2026-W42/compte=... : une requête sur un trimestre n'ouvre que ses 13 semaines
+PARTITIONS = pa.schema([("semaine", pa.string()), ("compte", pa.string())])
+
+COLONNES_EXPORT = ["semaine", "compte", *(nom for nom in SCHEMA.names if nom != "disparu")]
+
+# Clé d'une commande dans l'historique : la même commande peut être archivée à chaque modification
+CLE = ["compte", "numero"]
+
+
+def semaine_iso(jour):
+    """2026-10-12 -> '2026-W42' (tri alphabétique = tri chronologique)"""
+    annee, semaine, _ = jour.isocalendar()
+    return f"{annee}-W{semaine:02d}"
+
+
+def semaines_iso(debut, fin):
+    """Semaines ISO touchées par la période [debut, fin]"""
+    lundi = debut - timedelta(days=debut.weekday())
+    return [semaine_iso(lundi + timedelta(weeks=i)) for i in range((fin - lundi).days // 7 + 1)]
+
+
+def _dernieres_versions(df, cle):
+    """Dernière version archivée de chaque commande ; les fichiers d'avant la colonne disparu la lisent nulle"""
+    df = df.sort_values("scrape_le").drop_duplicates(cle, keep="last")
+    return df.assign(disparu=df["disparu"].fillna(False).astype(bool))
+
+
+class ArchiveParquet:
+    """
+    Historique des scrapings en Parquet (RAPTHOR_ARCHIVE_DIR), partitionné par semaine de livraison et compte.
+    Chaque synchronisation ajoute un fichier avec les commandes nouvelles ou modifiées (horodatées scrape_le)
+    et un marqueur pour les commandes disparues ; les lectures ne gardent que la dernière version de chaque
+    commande, sauf si elle a disparu. Les requêtes ne lisent que les colonnes utiles et passent leurs filtres
+    (semaines, dates, comptes) au scan Parquet.
+    """
+
+    def __init__(self, dossier=None):
+        self.dossier = dossier or os.getenv("RAPTHOR_ARCHIVE_DIR", "/tmp/rapthor_archive")
+        # Change à chaque ajout : sert de clé d'invalidation aux caches de l'UI
+        self.version = datetime.now().isoformat()
+
+    def _partition(self, semaine, compte):
+        """Répertoire de la partition tel que pyarrow l'écrit (valeurs encodées en URI : compta%40x.fr)"""
+        chemin, _ = ds.partitioning(PARTITIONS, flavor="hive").format(
+            (ds.field("semaine") == semaine) & (ds.field("compte") == compte)
+        )
+        return os.path.join(self.dossier, chemin)
+
+    def ajouter(self, df, compte, rapport=None, horodatage=None):
+        """
+        Archive le DataFrame d'un scraping (commandes_dataframe) pour le compte.
+        Avec le rapport de CommandeStore.synchroniser, seules les commandes nouvelles ou modifiées sont écrites,
+        sauf pour les semaines encore absentes de l'archive (écrites en entier), et les commandes disparues
+        reçoivent un marqueur. Retourne le nombre de lignes.
+        """
+        horodatage = horodatage or datetime.now()
+        df = commandes_dataframe(df).dropna(subset=["date_livraison"])
+        df = df.assign(client=df["client"].astype("string"), semaine=df["date_livraison"].map(semaine_iso),
+                       disparu=False)
+
+        if rapport is not None:
+            changees = set(rapport["nouvelles"]) | set(rapport["modifiees"])
+            nouvelles_semaines = {
+                s for s in df["semaine"].unique() if not os.path.isdir(self._partition(s, compte))
+            }
+            df = df[df["numero"].isin(changees) | df["semaine"].isin(nouvelles_semaines)]
+            disparues = self._disparues(compte, rapport.get("disparues", []))
+            if not disparues.empty:
+                df = pd.concat([df, disparues], ignore_index=True)
+
+        if df.empty:
+            return 0
+
+        table = pa.Table.from_pandas(
+            df.assign(scrape_le=pd.Timestamp(horodatage)), schema=SCHEMA, preserve_index=False,
+        )
+        table = table.append_column("semaine", pa.array(df["semaine"], pa.string()))
+        table = table.append_column("compte", pa.array([compte] * len(table), pa.string()))
+        ds.write_dataset(
+            table, self.dossier, format="parquet",
+            partitioning=ds.partitioning(PARTITIONS, flavor="hive"),
+            basename_template=f"snapshot-{horodatage:%Y%m%dT%H%M%S%f}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        self.version = datetime.now().isoformat()
+        print(f"📦 Archive Parquet: {len(table)} ligne(s) ajoutée(s) pour {compte}")
+        return len(table)
+
+    def _disparues(self, compte, numeros):
+        """Dernière version archivée des commandes disparues, marquée disparu (même semaine de livraison)"""
+        dataset = self._dataset()
+        if dataset is None or not numeros:
+            return pd.DataFrame()
+        filtre = (ds.field("compte") == compte) & ds.field("numero").isin(list(numeros))
+        df = dataset.to_table(columns=["semaine", *SCHEMA.names], filter=filtre).to_pandas()
+        df = _dernieres_versions(df, ["numero"])
+        return df[~df["disparu"]].assign(disparu=True)
+
+    def _dataset(self):
+        """Dataset de l'archive, None tant que rien n'a été archivé"""
+        if not os.path.isdir(self.dossier):
+            return None
+        return ds.dataset(
+            self.dossier, format="parquet",
+            schema=pa.unify_schemas([SCHEMA, PARTITIONS]),
+            partitioning=ds.partitioning(PARTITIONS, flavor="hive"),
+        )
+
+    def _filtre(self, debut, fin, comptes=None):
+        """Semaines (élagage des répertoires) puis dates de livraison (statistiques des row groups)"""
+        filtre = (
+            ds.field("semaine").isin(semaines_iso(debut, fin))
+            & (ds.field("date_livraison") >= pa.scalar(pd.Timestamp(debut), pa.timestamp("ms")))
+            & (ds.field("date_livraison") <= pa.scalar(pd.Timestamp(fin), pa.timestamp("ms")))
+        )
+        if comptes:
+            filtre &= ds.field("compte").isin(list(comptes))
+        return filtre
+
+    def lire(self, debut, fin, colonnes, comptes=None):
+        """Dernière version des commandes livrées entre debut et fin, réduite aux colonnes demandées"""
+        colonnes = list(dict.fromkeys(["semaine", *CLE, "scrape_le", *colonnes]))
+        dataset = self._dataset()
+        if dataset is None:
+            return pd.DataFrame(columns=colonnes)
+        df = dataset.to_table(columns=[*colonnes, "disparu"], filter=self._filtre(debut, fin, comptes)).to_pandas()
+        df = _dernieres_versions(df, CLE)
+        return df.loc[~df["disparu"], colonnes].reset_index(drop=True)
+
+    def comptes(self):
+        """Comptes présents dans l'archive (noms des répertoires décodés, aucun fichier lu)"""
+        if not os.path.isdir(self.dossier):
+            return []
+        return sorted({
+            unquote(nom.split("=", 1)[1])
+            for semaine in os.scandir(self.dossier) if semaine.is_dir()
+            for nom in os.listdir(semaine.path) if nom.startswith("compte=")
+        })
+
+    def totaux_par_client(self, debut, fin, comptes=None):
+        """Montant livré par semaine (lignes) et par client (colonnes)"""
+        df = self.lire(debut, fin, ["client", "montant"], comptes)
+        return df.pivot_table(index="semaine", columns="client", values="montant", aggfunc="sum", fill_value=0.0)
+
+    def evolution_hebdomadaire(self, debut, fin, seuil, comptes=None):
+        """Par semaine : montant total, nombre de commandes, commandes > seuil et variation sur la semaine précédente"""
+        df = self.lire(debut, fin, ["montant"], comptes)
+        semaines = (
+            df.assign(sup_seuil=df["montant"] > seuil)
+            .groupby("semaine", sort=True)
+            .agg(montant_total=("montant", "sum"), nb_commandes=("numero", "size"), nb_sup_seuil=("sup_seuil", "sum"))
+        )
+        return semaines.assign(variation=semaines["montant_total"].pct_change())
+
+    def _lots(self, debut, fin, comptes=None):
+        """
+        Dernière version des commandes de la période, lot par lot (jamais tout l'historique en mémoire) :
+        un premier scan des seules clés trouve la version courante de chaque commande.
+        """
+        dataset = self._dataset()
+        if dataset is None:
+            return
+        filtre = self._filtre(debut, fin, comptes)
+        courantes = _dernieres_versions(
+            dataset.to_table(columns=[*CLE, "scrape_le", "disparu"], filter=filtre).to_pandas(), CLE,
+        )
+        courantes = courantes.loc[~courantes["disparu"], [*CLE, "scrape_le"]]
+        for lot in dataset.to_batches(columns=COLONNES_EXPORT, filter=filtre):
+            df = lot.to_pandas().merge(courantes, on=[*CLE, "scrape_le"])
+            if not df.empty:
+                yield df[COLONNES_EXPORT]
+
+    def exporter_csv(self, debut, fin, comptes=None):
+        """Export CSV écrit lot par lot dans un fichier temporaire, retourné ouvert et rembobiné"""
+        fichier = tempfile.TemporaryFile()
+        pd.DataFrame(columns=COLONNES_EXPORT).to_csv(fichier, index=False)
+        for df in self._lots(debut, fin, comptes):
+            df = df.assign(scrape_le=df["scrape_le"].dt.strftime("%d/%m/%Y %H:%M:%S"))
+            df.to_csv(fichier, index=False, header=False, date_format="%d/%m/%Y")
+        fichier.seek(0)
+        return fichier
+
+    def exporter_xlsx(self, debut, fin, comptes=None):
+        """Export XLSX en mode write_only d'openpyxl (lignes écrites en flux), retourné ouvert et rembobiné"""
+        classeur = Workbook(write_only=True)
+        feuille = classeur.create_sheet("commandes")
+        feuille.append(COLONNES_EXPORT)
+        for df in self._lots(debut, fin, comptes):
+            for ligne in df.astype(object).where(df.notna(), None).itertuples(index=False):
+                feuille.append([v.to_pydatetime() if isinstance(v, pd.Timestamp) else v for v in ligne])
+        fichier = tempfile.TemporaryFile()
+        classeur.save(fichier)
+        fichier.seek(0)
+        return fichier
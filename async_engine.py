@@ -0,0 +1,364 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from urllib.parse import urljoin
+
+import pandas as pd
+from playwright.async_api import async_playwright
+
+from extraction import DOCUMENTS
+from filtres import donnees_filtre, formulaire_filtre_dates, semaine_courante, url_filtre_get
+from http_backend import ConnexionRefusee
+from instrumentation import Trace
+from navigateur import bloquer_ressources_async
+from pagination import recuperer_pages_playwright_async
+from pipeline import commandes_dataframe, lignes_dataframe, seuil_par_defaut, vues
+from reprise import Checkpoint, PortailIndisponible, reessayer_async
+from scraper import AuchanScraper
+
+
+def comptes_configures():
+    """
+    Comptes @GP à scraper : RAPTHOR_COMPTES (JSON [{"username": ..., "password": ...}])
+    ou, à défaut, le compte unique auchan_username / auchan_password.
+    Lève ValueError si RAPTHOR_COMPTES n'est pas une liste non vide de comptes complets.
+    """
+    valeur = os.getenv("RAPTHOR_COMPTES")
+    if valeur:
+        try:
+            comptes = json.loads(valeur)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"RAPTHOR_COMPTES n'est pas du JSON valide: {e}") from e
+        if (not isinstance(comptes, list) or not comptes
+                or not all(isinstance(c, dict) and c.get("username") and c.get("password") for c in comptes)):
+            raise ValueError('RAPTHOR_COMPTES doit être une liste non vide de {"username": ..., "password": ...}')
+        return comptes
+    username = os.getenv("auchan_username")
+    password = os.getenv("auchan_password")
+    return [{"username": username, "password": password}] if username and password else []
+
+
+class AsyncAuchanScraper(AuchanScraper):
+    """
+    Variante du backend Playwright sur l'API async : plusieurs comptes partagent un seul navigateur,
+    chacun dans son propre contexte (cookies et session isolés).
+    Seules les interactions avec la page sont réécrites en async : nouveaux essais et disjoncteur,
+    points de reprise, détail des commandes et autres listes passent par les helpers d'AuchanScraper.
+    """
+
+    async def scraper_commandes_async(self, browser, debut=None, fin=None, rappel=None):
+        semaine = semaine_courante()
+        debut = debut or semaine[0]
+        fin = fin or semaine[1]
+
+        self.rappel = rappel
+        self.progression = 0.0
+        self.trace = Trace(rappel=self._publier_phase)
+        self.checkpoint = Checkpoint(self.username, debut, fin)
+
+        # Portail en panne : on ne le relance pas avant la fin du délai du disjoncteur
+        try:
+            self.disjoncteur.verifier()
+        except PortailIndisponible as e:
+            resultats = self._resultats_vides()
+            resultats["message"] = f"Erreur: {e}"
+            print(f"🔌 [{self.username}] {e}")
+        else:
+            resultats = await self._scraper_navigateur_async(browser, debut, fin)
+
+        # Run abouti : plus rien à reprendre
+        if resultats["success"]:
+            self.checkpoint.effacer()
+
+        resultats["phases"] = self.trace.resume()
+        resultats["duree_totale_s"] = self.trace.duree_totale()
+        return resultats
+
+    async def _reessayer_async(self, span, fonction, *args, **kwargs):
+        """Même politique que _reessayer (backoff + jitter, disjoncteur du portail) pour une coroutine"""
+        return await reessayer_async(fonction, *args, span=span, coupe_circuit=self.disjoncteur, **kwargs)
+
+    async def _scraper_navigateur_async(self, browser, debut, fin):
+        resultats = self._resultats_vides()
+
+        # Réutiliser la session @GP enregistrée si elle existe encore
+        storage_state = self.session_store.charger(self.username, self.hotes_portail)
+        if storage_state:
+            context = await browser.new_context(storage_state=storage_state)
+        else:
+            context = await browser.new_context()
+        await bloquer_ressources_async(context)
+        page = await context.new_page()
+
+        try:
+            session_reprise = False
+            if storage_state:
+                print(f"♻️ [{self.username}] Session enregistrée trouvée, accès direct aux commandes...")
+                with self.trace.span("5_liste_commandes", backend="async", session="reprise") as span:
+                    await self._reessayer_async(span, self._ouvrir_liste_async, page, "commandes")
+                    if self._est_page_login(page.url):
+                        span.statut = "session_expiree"
+                        print(f"⌛ [{self.username}] Session expirée côté portail, reconnexion complète")
+                        self.session_store.invalider(self.username)
+                    else:
+                        session_reprise = True
+
+            if not session_reprise:
+                await self._se_connecter_async(page)
+                self.session_store.sauvegarder_etat(self.username, await context.storage_state())
+
+                with self.trace.span("5_liste_commandes", backend="async") as span:
+                    await self._reessayer_async(span, self._ouvrir_liste_async, page, "commandes")
+            else:
+                for phase in ("1_page_login", "2_identifiants", "3_validation", "4_verification"):
+                    self.trace.ignorer(phase, "session réutilisée", backend="async")
+
+            with self.trace.span("6_filtres", backend="async") as span:
+                await self._effacer_filtres_async(page)
+                await self._reessayer_async(span, self._appliquer_filtre_dates_async, page, debut, fin)
+
+            with self.trace.span("7_extraction", backend="async") as span:
+                html_content = await self._snapshot_liste_async(page)
+                commandes, nb_pages = [], 0
+                if html_content:
+                    commandes, nb_pages = await self._extraire_toutes_pages_async(
+                        context, html_content, page.url, debut, fin, span,
+                    )
+                span.attributs.update(pages=nb_pages, lignes=len(commandes))
+
+            self._construire_resultats(resultats, commandes, debut, fin)
+            await self._recuperer_details_async(resultats, commandes, context, page.url)
+            await self._recuperer_documents_async(resultats, context, page)
+
+        except Exception as e:
+            resultats["message"] = self._message_erreur(e)
+            print(f"❌ [{self.username}] Erreur durant le scraping: {e}")
+
+        finally:
+            try:
+                await context.close()
+            except Exception as e:
+                print(f"⚠️ [{self.username}] Fermeture du contexte impossible: {e}")
+
+        return resultats
+
+    async def _extraire_toutes_pages_async(self, context, html_content, url_page, debut, fin, span, extraire=None,
+                                           publier=True):
+        """Comme _extraire_toutes_pages, les pages suivantes étant chargées dans des onglets du contexte"""
+        pagination = self._paginer(html_content, url_page, debut, fin, span, extraire, publier)
+        if pagination.restantes():
+            print(f"📑 [{self.username}] {len(pagination.restantes())} page(s) supplémentaire(s), "
+                  f"chargement par {self.concurrence}...")
+            await self._reessayer_async(
+                span, pagination.charger_async,
+                lambda urls, rappel: recuperer_pages_playwright_async(context, urls, self.concurrence, rappel),
+            )
+        return pagination.resultat(), pagination.nb_pages
+
+    async def _recuperer_details_async(self, resultats, commandes, context, url_page):
+        """8. Détail des commandes DESADV (voir _recuperer_details), pages chargées dans des onglets"""
+        a_faire = self._details_a_faire(resultats, commandes, url_page)
+        if a_faire is None:
+            return
+        empreintes, en_cache, urls = a_faire
+
+        with self.trace.span("8_details", backend="async", en_cache=len(en_cache), a_recuperer=len(urls)) as span:
+            pages = []
+            if urls:
+                print(f"🔎 [{self.username}] Détail de {len(urls)} commande(s) DESADV ({len(en_cache)} en cache)...")
+                try:
+                    pages = await recuperer_pages_playwright_async(
+                        context, list(urls.values()), self.concurrence_details, selecteur="table",
+                        sur_erreur=self._detail_non_recupere,
+                    )
+                except Exception as e:
+                    self._details_indisponibles(span, e)
+            self._enregistrer_details(resultats, empreintes, dict(zip(urls, pages)), span)
+
+    async def _recuperer_documents_async(self, resultats, context, page):
+        """9. Autres listes @GP (voir _recuperer_documents), dans l'onglet des commandes"""
+        if not self.documents or not resultats["success"]:
+            return
+
+        for type_document in self.documents:
+            with self.trace.span(f"9_liste_{type_document}", backend="async") as span:
+                print(f"📄 [{self.username}] Liste {type_document}...")
+                try:
+                    documents = await self._extraire_document_async(
+                        context, page, type_document, resultats["debut"], resultats["fin"], span,
+                    )
+                except Exception as e:
+                    self._liste_indisponible(span, type_document, e)
+                    continue
+                self._integrer_documents(resultats, type_document, documents, span)
+
+        self._rapprocher(resultats)
+
+    async def _extraire_document_async(self, context, page, type_document, debut, fin, span):
+        # Première page hors disjoncteur : une liste absente du portail n'est pas une panne
+        await self._ouvrir_liste_async(page, type_document)
+        await self._effacer_filtres_async(page)
+        await self._reessayer_async(span, self._appliquer_filtre_dates_async, page, debut, fin, type_document)
+
+        html_content = await self._snapshot_liste_async(page)
+        if not html_content:
+            return []
+        documents, nb_pages = await self._extraire_toutes_pages_async(
+            context, html_content, page.url, debut, fin, span,
+            extraire=lambda html_page: self._extraire_documents_from_html(html_page, type_document),
+            publier=False,
+        )
+        span.attributs.update(pages=nb_pages)
+        return documents
+
+    async def _se_connecter_async(self, page):
+        """Connexion complète via le formulaire de login @GP (étapes 1 à 4)"""
+        with self.trace.span("1_page_login", backend="async") as span:
+            await self._reessayer_async(span, self._ouvrir_login_async, page)
+
+        with self.trace.span("2_identifiants", backend="async"):
+            await page.fill('input[name="_username"]', self.username)
+            await page.fill('input[name="_password"]', self.password)
+
+        with self.trace.span("3_validation", backend="async"):
+            async with page.expect_navigation(wait_until="domcontentloaded", timeout=30000):
+                await page.click('button:has-text("Se connecter")')
+
+        with self.trace.span("4_verification", backend="async"):
+            if self._est_page_login(page.url):
+                try:
+                    await page.wait_for_url(lambda url: not self._est_page_login(url), timeout=5000)
+                except Exception:
+                    raise ConnexionRefusee("Échec de connexion - Vérifiez vos identifiants")
+            print(f"✅ [{self.username}] Connexion réussie!")
+
+    async def _ouvrir_login_async(self, page):
+        await page.goto(self.login_url, timeout=30000, wait_until="domcontentloaded")
+        await page.wait_for_selector('input[name="_username"]', timeout=30000)
+
+    async def _ouvrir_liste_async(self, page, type_document):
+        """Navigue vers une liste @GP et attend le tableau (ou le login si la session a expiré)"""
+        await page.goto(self.url_liste(type_document), timeout=30000, wait_until="domcontentloaded")
+        await page.wait_for_selector('table.VL, input[name="_username"]', timeout=30000)
+
+    async def _effacer_filtres_async(self, page):
+        """Suit le lien de la gomme si un filtre est actif sur la liste (voir _effacer_filtres)"""
+        try:
+            gomme = page.locator('.fa.fa-eraser')
+            if await gomme.count():
+                print(f"🧹 [{self.username}] Filtres détectés, effacement en cours...")
+                lien = page.locator('a[href]:has(.fa-eraser)')
+                href = await lien.first.get_attribute("href") if await lien.count() else None
+                if href and not href.startswith(("#", "javascript")):
+                    await page.goto(urljoin(page.url, href), timeout=15000, wait_until="domcontentloaded")
+                else:
+                    # Attendre la nouvelle page : l'ancien tableau satisferait wait_for_selector tout de suite
+                    async with page.expect_navigation(wait_until="domcontentloaded", timeout=15000):
+                        await gomme.first.dispatch_event("click")
+                await page.wait_for_selector('table.VL', timeout=15000)
+        except Exception as e:
+            print(f"ℹ️ [{self.username}] Pas de filtres actifs ou erreur: {e}")
+
+    async def _appliquer_filtre_dates_async(self, page, debut, fin, type_document="commandes"):
+        formulaire = formulaire_filtre_dates(await page.content(), page.url, DOCUMENTS[type_document]["date_periode"])
+        if not formulaire:
+            return
+
+        if formulaire["methode"] == "get":
+            await page.goto(url_filtre_get(formulaire, debut, fin), timeout=30000)
+        else:
+            valeurs = donnees_filtre(formulaire, debut, fin)
+            await page.fill(f'input[name="{formulaire["debut"]}"]', valeurs[formulaire["debut"]])
+            await page.fill(f'input[name="{formulaire["fin"]}"]', valeurs[formulaire["fin"]])
+            async with page.expect_navigation(wait_until="domcontentloaded", timeout=30000):
+                await page.locator(f'input[name="{formulaire["fin"]}"]').press("Enter")
+        await page.wait_for_selector('table.VL', timeout=30000)
+
+    async def _snapshot_liste_async(self, page):
+        """HTML de la liste une fois le tableau présent (None si le tableau n'apparaît pas)"""
+        try:
+            await page.wait_for_selector('table.VL tbody tr', timeout=10000)
+        except Exception as e:
+            print(f"❌ [{self.username}] Erreur extraction tableau: {e}")
+            return None
+        return await page.content()
+
+
+def _avec_compte(frames):
+    """Concatène les DataFrames par compte ; concat de catégories différentes retombe en object : on re-type"""
+    df = pd.concat([f.assign(compte=compte) for compte, f in frames.items()], ignore_index=True)
+    for colonne in ("client", "compte"):
+        if colonne in df:
+            df[colonne] = df[colonne].astype("category")
+    return df
+
+
+async def scraper_comptes(comptes, debut=None, fin=None, concurrence=None, seuil=None, rappel=None, **options):
+    """
+    Scrape tous les comptes en parallèle (au plus `concurrence` à la fois) avec un seul Firefox.
+    Retourne {"comptes": {username: resultats}, **vues} où les vues, le détail DESADV, les documents
+    et le rapprochement portent sur les données fusionnées avec une colonne "compte".
+    rappel(evenement) reçoit les phases et lots de tous les comptes (champ "compte" en plus,
+    progression moyenne de tous les comptes).
+    """
+    concurrence = concurrence or int(os.getenv("RAPTHOR_COMPTES_CONCURRENCE", "3"))
+    seuil = seuil_par_defaut() if seuil is None else seuil
+    limite = asyncio.Semaphore(max(1, concurrence))
+    debut_run = datetime.now()
+    # Progression globale = moyenne des comptes : elle ne recule pas quand les événements s'entrelacent
+    progressions = {c["username"]: 0.0 for c in comptes}
+
+    async with async_playwright() as p:
+        # Firefox en mode headless (plus stable que Chromium sur serveurs)
+        browser = await p.firefox.launch(headless=True)
+        try:
+            async def scraper_compte(compte):
+                username = compte["username"]
+
+                def rappel_compte(evenement):
+                    progressions[username] = evenement["progression"]
+                    progression = sum(progressions.values()) / len(progressions)
+                    rappel({**evenement, "compte": username, "progression": progression})
+
+                async with limite:
+                    scraper = AsyncAuchanScraper(username, compte["password"], seuil=seuil, **options)
+                    return await scraper.scraper_commandes_async(
+                        browser, debut, fin, rappel=rappel_compte if rappel is not None else None,
+                    )
+
+            par_compte = await asyncio.gather(*(scraper_compte(c) for c in comptes))
+        finally:
+            await browser.close()
+
+    resultats_comptes = {c["username"]: r for c, r in zip(comptes, par_compte)}
+    reussis = {username: r for username, r in resultats_comptes.items() if r["success"]}
+    df = _avec_compte({u: r["commandes"] for u, r in reussis.items()}) if reussis else commandes_dataframe([])
+    resultats = {
+        "success": bool(reussis),
+        "message": f"{len(df)} commandes sur {len(reussis)}/{len(comptes)} compte(s)",
+        "comptes": resultats_comptes,
+        **vues(df, seuil),
+        "lignes_desadv": (
+            _avec_compte({u: r["lignes_desadv"] for u, r in reussis.items()}) if reussis else lignes_dataframe([])
+        ),
+        "documents": {},
+        "rapprochement": None,
+        "phases": [{**phase, "compte": u} for u, r in resultats_comptes.items() for phase in r["phases"]],
+        "duree_totale_s": (datetime.now() - debut_run).total_seconds(),
+    }
+    for type_document in {t for r in reussis.values() for t in r["documents"]}:
+        resultats["documents"][type_document] = _avec_compte({
+            u: r["documents"][type_document] for u, r in reussis.items() if type_document in r["documents"]
+        })
+    rapprochements = {u: r["rapprochement"] for u, r in reussis.items() if r["rapprochement"] is not None}
+    if rapprochements:
+        resultats["rapprochement"] = _avec_compte(rapprochements)
+
+    print(f"✅ {len(reussis)}/{len(comptes)} compte(s) scrapé(s) en {resultats['duree_totale_s']:.1f} s")
+    return resultats
+
+
+def scraper_comptes_sync(comptes, debut=None, fin=None, **options):
+    """Point d'entrée synchrone (scheduler, scripts) pour scraper_comptes"""
+    return asyncio.run(scraper_comptes(comptes, debut, fin, **options))
@@ -0,0 +1,131 @@
+"""
+Temps de démarrage à froid de l'application Streamlit.
+
+    python -m benchmarks.bench_demarrage
+    python -m benchmarks.bench_demarrage --repetitions 5 --port 8599
+
+Mesure, chacun dans un processus neuf :
+  - imports du premier rendu (les imports de niveau module de app.py, relus dans le fichier)
+  - imports lourds pour comparaison (pandas, Playwright, scraper)
+  - premier passage complet du script app.py (AppTest, sans identifiants : pas de scraping),
+    avec les modules lourds qu'il a chargés
+  - délai avant que /_stcore/health réponde après `streamlit run app.py`
+"""
+import argparse
+import ast
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Premier démarrage : ni identifiants, ni base locale existante
+ENV_SANS_IDENTIFIANTS = {
+    **os.environ, "auchan_username": "", "auchan_password": "", "RAPTHOR_DB": "/tmp/rapthor_bench_absente.db",
+}
+
+# Modules qu'un premier passage sans identifiants ni base locale ne devrait pas charger
+MODULES_LOURDS = ("pandas", "pyarrow", "lxml", "playwright", "store", "scraper", "scheduler", "archive")
+
+
+def imports_app():
+    """Imports de niveau module de app.py (ceux exécutés avant le premier élément affiché)"""
+    with open(os.path.join(RACINE, "app.py"), encoding="utf-8") as f:
+        arbre = ast.parse(f.read())
+    return "; ".join(
+        ast.unparse(noeud) for noeud in arbre.body if isinstance(noeud, (ast.Import, ast.ImportFrom))
+    )
+
+
+IMPORTS = {
+    "imports du premier rendu": imports_app(),
+    "imports lourds (store, scheduler)": "import streamlit, store, scheduler",
+}
+
+PREMIER_PASSAGE = (
+    "from streamlit.testing.v1 import AppTest; "
+    "at = AppTest.from_file('app.py', default_timeout=120).run(); "
+    "assert not at.exception, at.exception"
+)
+
+MODULES_PREMIER_PASSAGE = (
+    f"import sys; {PREMIER_PASSAGE}; "
+    f"print(','.join(m for m in {MODULES_LOURDS!r} if m in sys.modules))"
+)
+
+
+def chronometrer_processus(code):
+    """Durée d'exécution de `python -c code` dans un interpréteur neuf, hors démarrage de Python"""
+    reference = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], cwd=RACINE, check=True)
+    a_vide = time.perf_counter() - reference
+
+    debut = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", code], cwd=RACINE, check=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env=ENV_SANS_IDENTIFIANTS,
+    )
+    return time.perf_counter() - debut - a_vide
+
+
+def modules_charges_premier_passage():
+    """Modules lourds présents dans sys.modules après un premier passage de app.py"""
+    sortie = subprocess.run(
+        [sys.executable, "-c", MODULES_PREMIER_PASSAGE], cwd=RACINE, check=True,
+        capture_output=True, text=True, env=ENV_SANS_IDENTIFIANTS,
+    ).stdout.strip().splitlines()
+    return sortie[-1] if sortie else ""
+
+
+def port_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def delai_healthcheck(port, timeout=60):
+    """Secondes entre le lancement de `streamlit run app.py` et la première réponse 200 de /_stcore/health"""
+    debut = time.perf_counter()
+    serveur = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py", f"--server.port={port}",
+         "--server.address=127.0.0.1", "--server.headless=true"],
+        cwd=RACINE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - debut < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as reponse:
+                    if reponse.status == 200:
+                        return time.perf_counter() - debut
+            except OSError:
+                time.sleep(0.05)
+        raise TimeoutError(f"/_stcore/health sans réponse après {timeout} s")
+    finally:
+        serveur.terminate()
+        serveur.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--port", type=int, default=None)
+    args = parser.parse_args()
+
+    mesures = {nom: lambda code=code: chronometrer_processus(code) for nom, code in IMPORTS.items()}
+    mesures["premier passage de app.py"] = lambda: chronometrer_processus(PREMIER_PASSAGE)
+    mesures["réponse de /_stcore/health"] = lambda: delai_healthcheck(args.port or port_libre())
+
+    print(f"{'mesure':<36} {'min (s)':>8} {'médiane (s)':>12}")
+    for nom, mesurer in mesures.items():
+        durees = sorted(mesurer() for _ in range(args.repetitions))
+        print(f"{nom:<36} {durees[0]:>8.3f} {durees[len(durees) // 2]:>12.3f}")
+    
+    print(f"modules lourds chargés au premier passage: {modules_charges_premier_passage() or 'aucun'}")
+
+
+if __name__ == "__main__":
+    main()
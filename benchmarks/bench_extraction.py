@@ -0,0 +1,103 @@
+"""
+Benchmark de l'extraction du tableau des commandes.
+
+    python -m benchmarks.bench_extraction --lignes 100 1000 5000
+    python -m benchmarks.bench_extraction --playwright   # compare aussi l'ancienne méthode cellule par cellule
+"""
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fixtures import generer_commandes, page_liste_html
+from scraper import AuchanScraper
+
+
+def extraction_bs4(html_content, scraper):
+    """Référence : parsing BeautifulSoup html.parser (ancienne _extraire_commandes_from_html)"""
+    soup = BeautifulSoup(html_content, "html.parser")
+    commandes = []
+    for row in soup.find("table", class_="VL").find("tbody").find_all("tr"):
+        cells = row.find_all("td")
+        if len(cells) < 8:
+            continue
+        commandes.append({
+            "numero": cells[1].get_text(strip=True),
+            "montant": scraper._parse_montant(cells[7].get_text(strip=True)),
+            "desadv": "desadv" in str(row).lower(),
+        })
+    return commandes
+
+
+def extraction_playwright_cellules(page, scraper):
+    """Référence : ancienne méthode, un aller-retour navigateur par cellule"""
+    commandes = []
+    for row in page.locator("table.VL tbody tr").all():
+        cells = row.locator("td").all()
+        if len(cells) < 7:
+            continue
+        textes = [c.inner_text().strip() for c in cells]
+        commandes.append({
+            "numero": textes[1],
+            "montant": scraper._parse_montant(textes[7]),
+            "desadv": "desadv" in row.inner_html().lower(),
+        })
+    return commandes
+
+
+def chronometrer(fonction, repetitions):
+    """Meilleur temps sur n répétitions"""
+    meilleur = None
+    resultat = None
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        duree = time.perf_counter() - debut
+        meilleur = duree if meilleur is None else min(meilleur, duree)
+    return meilleur, resultat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lignes", type=int, nargs="+", default=[100, 500, 2000, 10000])
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--playwright", action="store_true", help="mesurer aussi l'extraction cellule par cellule")
+    args = parser.parse_args()
+
+    scraper = AuchanScraper("benchmark", "benchmark")
+
+    page = None
+    if args.playwright:
+        from playwright.sync_api import sync_playwright
+        p = sync_playwright().start()
+        browser = p.firefox.launch(headless=True)
+        page = browser.new_page()
+
+    print(f"{'lignes':>8} {'méthode':<28} {'durée (s)':>10} {'lignes/s':>12} {'gain':>8}")
+    for nb in args.lignes:
+        commandes = generer_commandes(nb)
+        html_content = page_liste_html(commandes)
+        mesures = {}
+
+        mesures["bs4 html.parser"] = chronometrer(lambda: extraction_bs4(html_content, scraper), args.repetitions)
+        mesures["lxml (snapshot)"] = chronometrer(lambda: scraper._extraire_commandes_from_html(html_content), args.repetitions)
+
+        if page is not None:
+            page.set_content(html_content)
+            mesures["playwright cellule/cellule"] = chronometrer(lambda: extraction_playwright_cellules(page, scraper), 1)
+            mesures["playwright content + lxml"] = chronometrer(
+                lambda: scraper._extraire_commandes_from_html(page.content()), args.repetitions
+            )
+
+        reference = max(duree for duree, _ in mesures.values())
+        for methode, (duree, resultat) in mesures.items():
+            assert len(resultat) == nb, f"{methode}: {len(resultat)} lignes au lieu de {nb}"
+            print(f"{nb:>8} {methode:<28} {duree:>10.4f} {nb / duree:>12,.0f} {reference / duree:>7.1f}x")
+
+    if page is not None:
+        browser.close()
+        p.stop()
+
+
+if __name__ == "__main__":
+    main()
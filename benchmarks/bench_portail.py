@@ -0,0 +1,178 @@
+"""
+Benchmark de bout en bout contre le faux portail local (benchmarks.portail).
+
+    python -m benchmarks.bench_portail --lignes 100 1000 10000
+    python -m benchmarks.bench_portail --enregistrer benchmarks/reference.json   # fixe la référence
+    python -m benchmarks.bench_portail --reference benchmarks/reference.json     # échoue si régression
+
+Chaque mesure tourne dans un processus neuf (RSS max propre à la mesure) :
+  - http / playwright : AuchanScraper.scraper_commandes complet (login, gomme, filtre, pagination)
+  - lxml / bs4 : extraction seule d'une page contenant toutes les lignes
+Une mesure régresse si ses lignes/s baissent, ou son RSS max augmente, de plus de --tolerance.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from benchmarks.portail import PortailLocal
+
+METHODES = ("http", "playwright", "lxml", "bs4")
+
+
+def rss_max_mo(qui=resource.RUSAGE_SELF):
+    """RSS maximum du processus (ru_maxrss est en Ko sous Linux, en octets sous macOS)"""
+    rss = resource.getrusage(qui).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def mesurer(methode, url, nb, debut, fin, concurrence, details, attendues=None):
+    """
+    Exécuté dans un processus dédié : retourne durée, lignes extraites et RSS max.
+    attendues est le nombre de commandes du portail sur la période : un scraping complet qui en
+    rapporte un autre nombre échoue au lieu d'être mesuré.
+    """
+    os.environ["RAPTHOR_BASE_URL"] = url
+    os.environ["RAPTHOR_LOGIN_URL"] = f"{url}/login"
+    # Points de reprise propres à la mesure : une mesure en échec ne doit pas alimenter la suivante
+    os.environ["RAPTHOR_CHECKPOINTS_DIR"] = tempfile.mkdtemp(prefix="rapthor_bench_checkpoints_")
+
+    from scraper import AuchanScraper
+    from session_store import SessionStore
+
+    scraper = AuchanScraper(
+        "benchmark", "benchmark",
+        session_store=SessionStore(tempfile.mkdtemp(prefix="rapthor_bench_")),
+        backend=methode if methode in ("http", "playwright") else "http",
+        concurrence=concurrence,
+        details=details,
+    )
+
+    if methode in ("http", "playwright"):
+        chrono = time.perf_counter()
+        resultats = scraper.scraper_commandes(debut, fin)
+        duree = time.perf_counter() - chrono
+        if not resultats["success"]:
+            raise RuntimeError(f"{methode}: {resultats['message']}")
+        lignes = len(resultats["commandes"])
+        if attendues is not None and lignes != attendues:
+            raise RuntimeError(f"{methode}: {lignes} commandes extraites, {attendues} attendues sur la période")
+    else:
+        from benchmarks.bench_extraction import extraction_bs4
+        from benchmarks.fixtures import generer_commandes, page_liste_html
+
+        html_content = page_liste_html(generer_commandes(nb))
+        extraire = scraper._extraire_commandes_from_html if methode == "lxml" else (
+            lambda html_page: extraction_bs4(html_page, scraper)
+        )
+        chrono = time.perf_counter()
+        lignes = len(extraire(html_content))
+        duree = time.perf_counter() - chrono
+
+    return {
+        "methode": methode,
+        "lignes": lignes,
+        "duree_s": round(duree, 4),
+        "lignes_s": round(lignes / duree, 1) if duree else None,
+        "rss_max_mo": round(rss_max_mo(), 1),
+        "rss_enfants_mo": round(rss_max_mo(resource.RUSAGE_CHILDREN), 1),
+    }
+
+
+def mesurer_silencieux(*args):
+    """mesurer sans les messages de progression du scraper (le tableau des mesures reste lisible)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return mesurer(*args)
+
+
+def executer(methode, *args):
+    """Une mesure dans un processus neuf (spawn : rien n'est hérité du processus du benchmark)"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(mesurer_silencieux, methode, *args).result()
+
+
+def regressions(mesures, reference, tolerance, attendues=()):
+    """
+    Mesures dégradées de plus de tolerance par rapport à la référence (même méthode, même taille).
+    Une mesure attendue (méthode, taille) présente dans la référence mais en échec compte comme régression.
+    """
+    references = {(r["methode"], r["nb_commandes"]): r for r in reference}
+    faites = {(m["methode"], m["nb_commandes"]) for m in mesures}
+    degradees = [
+        f"{methode} {nb} lignes: en échec (référence {references[(methode, nb)]['lignes_s']:,.0f} lignes/s)"
+        for methode, nb in attendues
+        if (methode, nb) in references and (methode, nb) not in faites
+    ]
+    for m in mesures:
+        ref = references.get((m["methode"], m["nb_commandes"]))
+        if ref is None:
+            continue
+        if ref["lignes_s"] and m["lignes_s"] < ref["lignes_s"] * (1 - tolerance):
+            degradees.append(f"{m['methode']} {m['nb_commandes']} lignes: {m['lignes_s']:,.0f} lignes/s "
+                             f"(référence {ref['lignes_s']:,.0f})")
+        if ref["rss_max_mo"] and m["rss_max_mo"] > ref["rss_max_mo"] * (1 + tolerance):
+            degradees.append(f"{m['methode']} {m['nb_commandes']} lignes: RSS max {m['rss_max_mo']} Mo "
+                             f"(référence {ref['rss_max_mo']} Mo)")
+    return degradees
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lignes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--methodes", nargs="+", choices=METHODES, default=list(METHODES))
+    parser.add_argument("--taille-page", type=int, default=50)
+    parser.add_argument("--latence", type=float, default=0.0, help="délai ajouté par le portail à chaque réponse (s)")
+    parser.add_argument("--concurrence", type=int, default=4)
+    parser.add_argument("--details", action="store_true", help="inclure le détail des commandes DESADV")
+    parser.add_argument("--reference", help="fichier JSON de référence ; code retour 1 en cas de régression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="dégradation tolérée (0.25 = 25 %%)")
+    parser.add_argument("--enregistrer", help="écrit les mesures dans ce fichier JSON (nouvelle référence)")
+    args = parser.parse_args()
+
+    mesures = []
+    print(f"{'lignes':>8} {'méthode':<12} {'durée (s)':>10} {'lignes/s':>12} {'RSS max (Mo)':>13} {'enfants':>9}")
+    for nb in args.lignes:
+        with PortailLocal(nb, args.taille_page, args.latence) as portail:
+            debut, fin = portail.periode
+            attendues = len(portail.filtrer({
+                "date_livraison_du": f"{debut:%d/%m/%Y}", "date_livraison_au": f"{fin:%d/%m/%Y}",
+            }))
+            for methode in args.methodes:
+                try:
+                    mesure = executer(
+                        methode, portail.url, nb, debut, fin, args.concurrence, args.details, attendues,
+                    )
+                except Exception as e:
+                    print(f"{nb:>8} {methode:<12} indisponible: {str(e).splitlines()[0]}")
+                    continue
+                mesure["nb_commandes"] = nb
+                mesures.append(mesure)
+                print(f"{nb:>8} {methode:<12} {mesure['duree_s']:>10.4f} {mesure['lignes_s']:>12,.0f} "
+                      f"{mesure['rss_max_mo']:>13} {mesure['rss_enfants_mo']:>9}")
+
+    if args.enregistrer:
+        with open(args.enregistrer, "w", encoding="utf-8") as f:
+            json.dump(mesures, f, indent=2)
+        print(f"💾 Mesures enregistrées: {args.enregistrer}")
+
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            attendues = [(methode, nb) for nb in args.lignes for methode in args.methodes]
+            degradees = regressions(mesures, json.load(f), args.tolerance, attendues)
+        if degradees:
+            print(f"❌ {len(degradees)} régression(s) au-delà de {args.tolerance:.0%}:")
+            for ligne in degradees:
+                print(f"   - {ligne}")
+            sys.exit(1)
+        print(f"✅ Aucune régression au-delà de {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
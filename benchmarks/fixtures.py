@@ -0,0 +1,178 @@
+import random
+from datetime import date, timedelta
+from html import escape
+
+
+CLIENTS = [
+    "AUCHAN HYPER VELIZY", "AUCHAN SUPER LILLE", "AUCHAN DRIVE LYON",
+    "AUCHAN HYPER TOULOUSE", "AUCHAN PIETON PARIS 11", "AUCHAN ENTREPOT CRETEIL",
+]
+
+ENTETES = ["", "Numéro", "Client", "Livrer à", "Création le", "Livrer le", "GLN", "Montant", "Statut"]
+
+ENTETES_LIGNES = ["Ligne", "EAN", "Désignation", "Quantité", "Prix unitaire", "Montant"]
+
+ENTETES_DESADV = ["", "N° DESADV", "N° commande", "Client", "Expédié le", "Livrer le", "Statut"]
+
+ENTETES_FACTURES = ["", "N° facture", "N° commande", "Client", "Date", "Montant HT", "Montant TTC", "Statut"]
+
+
+def generer_commandes(nb, debut=None, graine=42):
+    """Commandes synthétiques réalistes (dates sur 8 semaines à partir de debut)"""
+    rng = random.Random(graine)
+    debut = debut or date.today() - timedelta(days=28)
+    commandes = []
+    for i in range(nb):
+        creation = debut + timedelta(days=rng.randrange(56))
+        livraison = creation + timedelta(days=rng.randrange(1, 6))
+        commandes.append({
+            "numero": f"{4500000000 + i}",
+            "client": rng.choice(CLIENTS),
+            "livrer_a": f"{rng.randrange(3010000000000, 3019999999999)}",
+            "date_creation": creation.strftime("%d/%m/%Y"),
+            "date_livraison": livraison.strftime("%d/%m/%Y"),
+            "gln": f"{rng.randrange(3020000000000, 3029999999999)}",
+            "montant": round(rng.uniform(50, 2500), 2),
+            "statut": rng.choice(["Nouvelle", "Lue", "Acceptée"]),
+            "desadv": rng.random() < 0.3,
+        })
+    return commandes
+
+
+def formater_montant(montant):
+    """1234.5 -> '1 234,50 €' comme sur le portail"""
+    return f"{montant:,.2f} €".replace(",", " ").replace(".", ",")
+
+
+def ligne_html(cmd):
+    """Une ligne <tr> du tableau VL (case à cocher + 8 colonnes + icônes)"""
+    icones = '<a href="gui.php?page=documents_desadv_creer&id={0}" title="Créer DESADV"><i class="fa fa-truck"></i></a>'
+    cellules = [
+        f'<input type="checkbox" name="ids[]" value="{cmd["numero"]}">',
+        f'<a href="gui.php?page=documents_commandes_voir&numero={cmd["numero"]}">{cmd["numero"]}</a>',
+        escape(cmd["client"]),
+        cmd["livrer_a"],
+        cmd["date_creation"],
+        cmd["date_livraison"],
+        cmd["gln"],
+        formater_montant(cmd["montant"]),
+        escape(cmd["statut"]) + (icones.format(cmd["numero"]) if cmd["desadv"] else ""),
+    ]
+    return "<tr>" + "".join(f"<td>{c}</td>" for c in cellules) + "</tr>"
+
+
+def table_html(commandes):
+    """Tableau VL complet avec entête"""
+    entete = "".join(f"<th>{escape(e)}</th>" for e in ENTETES)
+    corps = "\n".join(ligne_html(c) for c in commandes)
+    return f'<table class="VL"><thead><tr>{entete}</tr></thead><tbody>\n{corps}\n</tbody></table>'
+
+
+def page_liste_html(commandes, pagination=""):
+    """Page documents_commandes_liste minimale autour du tableau"""
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Commandes</title></head><body>"
+        "<div class='filtres'><a href='gui.php?page=documents_commandes_liste&effacer=1'>"
+        "<i class='fa fa-eraser'></i></a></div>"
+        f"{table_html(commandes)}{pagination}</body></html>"
+    )
+
+
+def generer_desadv(commandes, graine=42):
+    """DESADV déjà envoyés : environ 70 % des commandes qui n'ont plus de DESADV à faire"""
+    rng = random.Random(f"{graine}-desadv")
+    desadv = []
+    for cmd in commandes:
+        if cmd["desadv"] or rng.random() >= 0.7:
+            continue
+        livraison = date(*reversed([int(x) for x in cmd["date_livraison"].split("/")]))
+        desadv.append({
+            "numero": f"DSV{cmd['numero'][-7:]}",
+            "commande": cmd["numero"],
+            "client": cmd["client"],
+            "date_expedition": (livraison - timedelta(days=1)).strftime("%d/%m/%Y"),
+            "date_livraison": cmd["date_livraison"],
+            "statut": "Envoyé",
+        })
+    return desadv
+
+
+def generer_factures(desadv, commandes, graine=42):
+    """Factures : environ 80 % des commandes expédiées, émises 0 à 3 jours après la livraison"""
+    rng = random.Random(f"{graine}-factures")
+    par_numero = {c["numero"]: c for c in commandes}
+    factures = []
+    for expedition in desadv:
+        if rng.random() >= 0.8:
+            continue
+        cmd = par_numero[expedition["commande"]]
+        livraison = date(*reversed([int(x) for x in cmd["date_livraison"].split("/")]))
+        factures.append({
+            "numero": f"FA{cmd['numero'][-7:]}",
+            "commande": cmd["numero"],
+            "client": cmd["client"],
+            "date_facture": (livraison + timedelta(days=rng.randrange(4))).strftime("%d/%m/%Y"),
+            "montant_ht": cmd["montant"],
+            "montant_ttc": round(cmd["montant"] * 1.055, 2),
+            "statut": "Émise",
+        })
+    return factures
+
+
+def table_desadv_html(desadv):
+    """Tableau VL de la liste documents_desadv_liste"""
+    return _table_documents(ENTETES_DESADV, (
+        (d["numero"], d["commande"], escape(d["client"]), d["date_expedition"], d["date_livraison"], d["statut"])
+        for d in desadv
+    ))
+
+
+def table_factures_html(factures):
+    """Tableau VL de la liste documents_factures_liste"""
+    return _table_documents(ENTETES_FACTURES, (
+        (f["numero"], f["commande"], escape(f["client"]), f["date_facture"],
+         formater_montant(f["montant_ht"]), formater_montant(f["montant_ttc"]), escape(f["statut"]))
+        for f in factures
+    ))
+
+
+def _table_documents(entetes, lignes):
+    entete = "".join(f"<th>{escape(e)}</th>" for e in entetes)
+    corps = "\n".join(
+        "<tr><td><input type='checkbox'></td>" + "".join(f"<td>{c}</td>" for c in cellules) + "</tr>"
+        for cellules in lignes
+    )
+    return f'<table class="VL"><thead><tr>{entete}</tr></thead><tbody>\n{corps}\n</tbody></table>'
+
+
+def generer_lignes(cmd, graine=42):
+    """Lignes synthétiques d'une commande (1 à 12 articles), stables pour un même numéro"""
+    rng = random.Random(f"{graine}-{cmd['numero']}")
+    return [
+        {
+            "ean": f"{rng.randrange(3000000000000, 3999999999999)}",
+            "libelle": f"ARTICLE {rng.randrange(1000, 9999)}",
+            "quantite": rng.randrange(1, 48),
+            "prix_unitaire": round(rng.uniform(0.5, 40), 2),
+        }
+        for _ in range(rng.randrange(1, 13))
+    ]
+
+
+def page_detail_html(cmd, lignes):
+    """Page documents_commandes_voir : entête de la commande puis tableau des lignes avec total"""
+    entete = "".join(f"<th>{escape(e)}</th>" for e in ENTETES_LIGNES)
+    corps = "\n".join(
+        "<tr>" + "".join(f"<td>{c}</td>" for c in (
+            i + 1, l["ean"], escape(l["libelle"]), l["quantite"],
+            formater_montant(l["prix_unitaire"]), formater_montant(l["quantite"] * l["prix_unitaire"]),
+        )) + "</tr>"
+        for i, l in enumerate(lignes)
+    )
+    total = sum(l["quantite"] * l["prix_unitaire"] for l in lignes)
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Commande</title></head><body>"
+        f"<h1>Commande {cmd['numero']}</h1><p>{escape(cmd['client'])} - GLN {cmd['gln']}</p>"
+        f"<table class='lignes'><thead><tr>{entete}</tr></thead><tbody>\n{corps}\n"
+        f"<tr><td colspan='5'>Total</td><td>{formater_montant(total)}</td></tr></tbody></table></body></html>"
+    )
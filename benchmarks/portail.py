@@ -0,0 +1,256 @@
+"""
+Faux portail @GP local pour mesurer le scraper sans toucher auchan.atgpedi.net.
+
+    python -m benchmarks.portail --commandes 5000 --port 8765
+
+Reproduit le login (_username / _password, bouton "Se connecter", redirection), la liste
+gui.php?page=documents_commandes_liste (table.VL paginée, filtre de dates, gomme), le détail
+des commandes et les listes DESADV / factures qui leur correspondent. Le scraper s'y branche avec RAPTHOR_BASE_URL et RAPTHOR_LOGIN_URL.
+"""
+import argparse
+import random
+import secrets
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from benchmarks.fixtures import (
+    generer_commandes, generer_desadv, generer_factures, generer_lignes, page_detail_html, table_desadv_html,
+    table_factures_html, table_html,
+)
+
+LISTE = "documents_commandes_liste"
+DETAIL = "documents_commandes_voir"
+COOKIE = "PHPSESSID"
+
+# Listes servies : page gui.php -> (attribut du portail, champ de date filtré, rendu du tableau)
+LISTES = {
+    LISTE: ("commandes", "date_livraison", table_html),
+    "documents_desadv_liste": ("desadv", "date_livraison", table_desadv_html),
+    "documents_factures_liste": ("factures", "date_facture", table_factures_html),
+}
+
+
+def _date(texte):
+    try:
+        return datetime.strptime(texte, "%d/%m/%Y").date()
+    except (TypeError, ValueError):
+        return None
+
+
+class PortailLocal:
+    """
+    Serveur HTTP (thread) servant nb_commandes commandes synthétiques, taille_page par page.
+    Chaque session démarre avec un filtre actif (statut), comme le portail qui mémorise le dernier filtre :
+    la gomme doit donc être utilisée avant de filtrer sur les dates.
+    latence (s) est ajoutée à chaque réponse pour simuler le réseau, et taux_erreur est la part
+    des pages de la liste qui répondent 503 (portail instable).
+    """
+
+    def __init__(self, nb_commandes=1000, taille_page=50, latence=0.0, filtre_initial="Nouvelle", port=0, graine=42,
+                 taux_erreur=0.0):
+        if not 10 <= nb_commandes <= 100_000:
+            raise ValueError("nb_commandes doit être compris entre 10 et 100 000")
+        self.commandes = generer_commandes(nb_commandes, graine=graine)
+        self._livraisons = [_date(c["date_livraison"]) for c in self.commandes]
+        self.desadv = generer_desadv(self.commandes, graine=graine)
+        self.factures = generer_factures(self.desadv, self.commandes, graine=graine)
+        self._par_numero = {c["numero"]: c for c in self.commandes}
+        self.taille_page = taille_page
+        self.latence = latence
+        self.taux_erreur = taux_erreur
+        self._aleatoire = random.Random(graine)
+        self.filtre_initial = filtre_initial
+        self.identifiants = {"benchmark": "benchmark"}
+        self.sessions = {}
+        self.requetes = 0
+        self._verrou = threading.Lock()
+        self._serveur = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._serveur.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._serveur.server_address[1]}"
+
+    @property
+    def periode(self):
+        """Plage de livraison couvrant toutes les commandes générées"""
+        dates = [d for d in self._livraisons if d]
+        return min(dates), max(dates)
+
+    def demarrer(self):
+        self._thread = threading.Thread(target=self._serveur.serve_forever, name="portail-local", daemon=True)
+        self._thread.start()
+        return self
+
+    def arreter(self):
+        self._serveur.shutdown()
+        self._serveur.server_close()
+
+    def __enter__(self):
+        return self.demarrer()
+
+    def __exit__(self, *exc):
+        self.arreter()
+
+    def filtrer(self, filtres, liste=LISTE):
+        """Documents de la liste correspondant aux filtres de la session (statut, date du / au)"""
+        attribut, champ, _ = LISTES[liste]
+        du = _date(filtres.get(f"{champ}_du"))
+        au = _date(filtres.get(f"{champ}_au"))
+        statut = filtres.get("statut")
+        resultat = []
+        for document in getattr(self, attribut):
+            jour = _date(document[champ])
+            if ((not statut or document["statut"] == statut)
+                    and (du is None or (jour and jour >= du))
+                    and (au is None or (jour and jour <= au))):
+                resultat.append(document)
+        return resultat
+
+    def _handler(self):
+        portail = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _session(self):
+                for morceau in self.headers.get("Cookie", "").split(";"):
+                    nom, _, valeur = morceau.strip().partition("=")
+                    if nom == COOKIE and valeur in portail.sessions:
+                        return portail.sessions[valeur]
+                return None
+
+            def _repondre(self, statut, corps="", entetes=()):
+                if portail.latence:
+                    time.sleep(portail.latence)
+                with portail._verrou:
+                    portail.requetes += 1
+                contenu = corps.encode("utf-8")
+                self.send_response(statut)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(contenu)))
+                for nom, valeur in entetes:
+                    self.send_header(nom, valeur)
+                self.end_headers()
+                self.wfile.write(contenu)
+
+            def _rediriger(self, url, entetes=()):
+                self._repondre(302, "", [("Location", url), *entetes])
+
+            def do_GET(self):
+                morceaux = urlsplit(self.path)
+                params = dict(parse_qsl(morceaux.query))
+                if morceaux.path == "/login":
+                    return self._repondre(200, page_login())
+                if morceaux.path == "/gui.php":
+                    session = self._session()
+                    if session is None:
+                        return self._rediriger("/login")
+                    if params.get("page") in LISTES:
+                        return self._liste(session, params)
+                    if params.get("page") == DETAIL and params.get("numero") in portail._par_numero:
+                        commande = portail._par_numero[params["numero"]]
+                        return self._repondre(200, page_detail_html(commande, generer_lignes(commande)))
+                return self._repondre(404, "<html><body>Page introuvable</body></html>")
+
+            def do_POST(self):
+                if urlsplit(self.path).path != "/login":
+                    return self._repondre(404, "<html><body>Page introuvable</body></html>")
+                longueur = int(self.headers.get("Content-Length", "0"))
+                donnees = dict(parse_qsl(self.rfile.read(longueur).decode("utf-8")))
+                if portail.identifiants.get(donnees.get("_username")) != donnees.get("_password") or not donnees.get("_csrf_token"):
+                    return self._rediriger("/login?erreur=1")
+
+                jeton = secrets.token_hex(16)
+                # Filtres mémorisés par liste ; seule la liste des commandes démarre filtrée
+                portail.sessions[jeton] = {LISTE: {"statut": portail.filtre_initial} if portail.filtre_initial else {}}
+                self._rediriger(
+                    f"/gui.php?page={LISTE}",
+                    [("Set-Cookie", f"{COOKIE}={jeton}; Path=/; HttpOnly")],
+                )
+
+            def _liste(self, session, params):
+                if portail.taux_erreur and portail._aleatoire.random() < portail.taux_erreur:
+                    return self._repondre(503, "<html><body>Service indisponible</body></html>")
+                liste = params["page"]
+                filtres = session.setdefault(liste, {})
+                if params.get("effacer"):
+                    filtres.clear()
+                champ = LISTES[liste][1]
+                for nom in (f"{champ}_du", f"{champ}_au"):
+                    if nom in params:
+                        filtres[nom] = params[nom]
+
+                documents = portail.filtrer(filtres, liste)
+                nb_pages = max(1, -(-len(documents) // portail.taille_page))
+                numero_page = min(max(int(params.get("p", "1") or 1), 1), nb_pages)
+                debut = (numero_page - 1) * portail.taille_page
+                page = documents[debut:debut + portail.taille_page]
+                self._repondre(200, page_liste(page, filtres, numero_page, nb_pages, liste))
+
+        return Handler
+
+
+def page_login():
+    """Formulaire de connexion @GP (jeton CSRF caché, bouton "Se connecter")"""
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Connexion @GP</title></head><body>"
+        "<form method='post' action='/login'>"
+        f"<input type='hidden' name='_csrf_token' value='{secrets.token_hex(8)}'>"
+        "<input type='text' name='_username'><input type='password' name='_password'>"
+        "<button type='submit'>Se connecter</button></form></body></html>"
+    )
+
+
+def page_liste(documents, filtres, numero_page, nb_pages, liste=LISTE):
+    """Liste de documents : filtre de dates en GET, gomme si un filtre est actif, pagination ?p=N"""
+    _, champ, table = LISTES[liste]
+    gomme = f"<a href='gui.php?page={liste}&effacer=1'><i class='fa fa-eraser'></i></a>" if filtres else ""
+    formulaire = (
+        f"<form method='get' action='gui.php'><input type='hidden' name='page' value='{liste}'>"
+        f"<input type='text' name='{champ}_du' value='{filtres.get(f'{champ}_du', '')}'>"
+        f"<input type='text' name='{champ}_au' value='{filtres.get(f'{champ}_au', '')}'>"
+        "<button type='submit'>Filtrer</button></form>"
+    )
+    pagination = ""
+    if nb_pages > 1:
+        liens = "".join(
+            f"<a href='gui.php?{urlencode({'page': liste, 'p': n})}'>{n}</a>"
+            for n in range(1, nb_pages + 1) if n != numero_page
+        )
+        pagination = f"<div class='pagination'><span>Page {numero_page} sur {nb_pages}</span>{liens}</div>"
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Commandes</title></head><body>"
+        f"<div class='filtres'>{formulaire}{gomme}</div>"
+        f"{table(documents)}{pagination}</body></html>"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commandes", type=int, default=1000, help="nombre de commandes (10 à 100 000)")
+    parser.add_argument("--taille-page", type=int, default=50)
+    parser.add_argument("--latence", type=float, default=0.0, help="délai ajouté à chaque réponse (s)")
+    parser.add_argument("--taux-erreur", type=float, default=0.0, help="part des pages de liste en erreur 503")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    portail = PortailLocal(
+        args.commandes, args.taille_page, args.latence, port=args.port, taux_erreur=args.taux_erreur
+    ).demarrer()
+    debut, fin = portail.periode
+    print(f"🦅 Portail local sur {portail.url} ({args.commandes} commandes, livraisons du {debut:%d/%m/%Y} au {fin:%d/%m/%Y})")
+    print(f"   RAPTHOR_BASE_URL={portail.url} RAPTHOR_LOGIN_URL={portail.url}/login  (identifiants: benchmark / benchmark)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        portail.arreter()
+
+
+if __name__ == "__main__":
+    main()
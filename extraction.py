@@ -0,0 +1,268 @@
+import unicodedata
+
+from lxml import etree, html as lxml_html
+
+
+# Correspondance entête du tableau -> champ de la commande (entêtes normalisées, sans accents)
+COLONNES_COMMANDES = {
+    "numero": ("numero", "n°", "no commande", "commande"),
+    "client": ("client",),
+    "livrer_a": ("livrer a", "lieu de livraison"),
+    "date_creation": ("creation", "cree le", "date de creation"),
+    "date_livraison": ("livrer le", "livraison", "date de livraison"),
+    "gln": ("gln",),
+    "montant": ("montant", "total"),
+    "statut": ("statut", "etat"),
+}
+
+# Lignes du détail d'une commande (page ouverte depuis le numéro dans la liste)
+COLONNES_LIGNES = {
+    "ean": ("ean", "gtin", "code ean", "ean13"),
+    "libelle": ("libelle", "designation", "article", "produit"),
+    "quantite": ("quantite", "qte", "quantite commandee"),
+    "prix_unitaire": ("prix unitaire", "pu", "prix unitaire net", "prix"),
+}
+
+# Ordre des colonnes utilisé quand le tableau n'a pas d'entête exploitable
+ORDRE_PAR_DEFAUT = ["numero", "client", "livrer_a", "date_creation", "date_livraison", "gln", "montant", "statut"]
+
+COLONNES_DESADV = {
+    "numero": ("numero", "n° desadv", "no desadv", "desadv", "avis d'expedition"),
+    "commande": ("commande", "n° commande", "no commande", "numero commande", "reference commande"),
+    "client": ("client",),
+    "livrer_a": ("livrer a", "lieu de livraison"),
+    "date_expedition": ("expedition", "expedie le", "date d'expedition"),
+    "date_livraison": ("livrer le", "livraison", "date de livraison"),
+    "statut": ("statut", "etat"),
+}
+
+COLONNES_FACTURES = {
+    "numero": ("numero", "n° facture", "no facture", "facture"),
+    "commande": ("commande", "n° commande", "no commande", "numero commande", "reference commande"),
+    "client": ("client",),
+    "date_facture": ("date", "date de facture", "facture le", "emise le"),
+    "montant_ht": ("montant ht", "total ht", "ht"),
+    "montant_ttc": ("montant ttc", "total ttc", "ttc", "montant"),
+    "statut": ("statut", "etat"),
+}
+
+# Listes de documents du portail : page gui.php, colonnes (par entête), champs sans lesquels
+# le tableau n'est pas reconnu, colonnes de montants et date servant au filtrage sur la période
+DOCUMENTS = {
+    "commandes": {
+        "page": "documents_commandes_liste",
+        "colonnes": COLONNES_COMMANDES,
+        "obligatoires": ("numero", "montant"),
+        "montants": ("montant",),
+        "date_periode": "date_livraison",
+        "ordre_par_defaut": ORDRE_PAR_DEFAUT,
+        "min_cellules": 7,
+    },
+    "desadv": {
+        "page": "documents_desadv_liste",
+        "colonnes": COLONNES_DESADV,
+        "obligatoires": ("numero", "commande"),
+        "montants": (),
+        "date_periode": "date_livraison",
+    },
+    "factures": {
+        "page": "documents_factures_liste",
+        "colonnes": COLONNES_FACTURES,
+        "obligatoires": ("numero",),
+        "montants": ("montant_ht", "montant_ttc"),
+        "date_periode": "date_facture",
+    },
+}
+
+_TABLE_XPATH = etree.XPath("//table[contains(concat(' ', normalize-space(@class), ' '), ' VL ')]")
+
+# DESADV : uniquement les liens / icônes / boutons dont un attribut mentionne desadv
+_DESADV_XPATH = etree.XPath(
+    ".//*[self::a or self::i or self::img or self::span or self::button]"
+    "[@*[contains(translate(., 'DESADV', 'desadv'), 'desadv')]]"
+)
+
+
+def normaliser(texte):
+    """Minuscules, sans accents, espaces compactés"""
+    texte = unicodedata.normalize("NFKD", texte or "")
+    texte = "".join(c for c in texte if not unicodedata.combining(c))
+    return " ".join(texte.lower().split())
+
+
+def texte_cellule(cellule):
+    """Texte visible d'une cellule, espaces compactés"""
+    return " ".join(cellule.text_content().split())
+
+
+def mapper_colonnes(entetes, colonnes=COLONNES_COMMANDES):
+    """
+    Associe chaque champ à l'index de la colonne dont l'entête correspond.
+    Les alias exacts sont prioritaires sur les correspondances partielles.
+    """
+    entetes = [normaliser(e) for e in entetes]
+    mapping = {}
+
+    for exact in (True, False):
+        for champ, alias in colonnes.items():
+            if champ in mapping:
+                continue
+            for i, entete in enumerate(entetes):
+                if not entete or i in mapping.values():
+                    continue
+                if any(entete == a if exact else a in entete for a in alias):
+                    mapping[champ] = i
+                    break
+
+    return mapping
+
+
+def trouver_table(arbre):
+    """Premier tableau de classe VL du document, ou None"""
+    tables = _TABLE_XPATH(arbre)
+    return tables[0] if tables else None
+
+
+def lignes_table(table):
+    """Lignes de données du tableau (tbody si présent, sinon toutes les tr avec des td)"""
+    lignes = table.xpath("./tbody/tr")
+    if not lignes:
+        lignes = table.xpath(".//tr[td]")
+    return lignes
+
+
+def entetes_table(table):
+    """Textes des entêtes (thead, sinon première ligne de th)"""
+    cellules = table.xpath("./thead/tr[last()]/th|./thead/tr[last()]/td")
+    if not cellules:
+        cellules = table.xpath(".//tr[th][1]/th")
+    return [texte_cellule(c) for c in cellules]
+
+
+def mapping_par_defaut(nb_cellules, colonnes=ORDRE_PAR_DEFAUT):
+    """Mapping positionnel ; une colonne de plus que prévu = case à cocher en tête de ligne"""
+    decalage = 1 if nb_cellules > len(colonnes) else 0
+    return {champ: i + decalage for i, champ in enumerate(colonnes)}
+
+
+def ligne_desadv(ligne):
+    """True si la ligne porte un lien ou une icône DESADV"""
+    return bool(_DESADV_XPATH(ligne))
+
+
+def lignes_document(html_content, schema):
+    """
+    Parcourt le tableau VL d'une liste @GP selon son schéma (voir DOCUMENTS), depuis un seul snapshot HTML.
+    Produit (valeurs texte par champ, lien du numéro, élément tr) pour chaque ligne exploitable.
+    """
+    arbre = lxml_html.fromstring(html_content)
+    table = trouver_table(arbre)
+    if table is None:
+        print("❌ Tableau non trouvé dans le HTML")
+        return
+
+    lignes = lignes_table(table)
+    print(f"✓ {len(lignes)} lignes trouvées dans le tableau")
+
+    mapping = mapper_colonnes(entetes_table(table), schema["colonnes"])
+    if not all(champ in mapping for champ in schema["obligatoires"]):
+        mapping = None
+        if not schema.get("ordre_par_defaut"):
+            print(f"❌ Colonnes {', '.join(schema['obligatoires'])} introuvables dans l'entête")
+            return
+
+    for i, ligne in enumerate(lignes):
+        try:
+            cellules = ligne.xpath("./td")
+
+            # Ignorer les lignes vides ou de regroupement
+            if len(cellules) < schema.get("min_cellules", len(schema["obligatoires"])):
+                continue
+
+            colonnes = mapping or mapping_par_defaut(len(cellules), schema["ordre_par_defaut"])
+            valeurs = {
+                champ: texte_cellule(cellules[index]) if index < len(cellules) else ""
+                for champ, index in colonnes.items()
+            }
+
+            # Lien vers le détail du document (relatif à la page de la liste)
+            liens = cellules[colonnes["numero"]].xpath(".//a/@href") if colonnes["numero"] < len(cellules) else []
+
+            yield valeurs, liens[0] if liens else None, ligne
+
+        except Exception as e:
+            print(f"  ⚠️ Erreur ligne {i+1}: {e}")
+            continue
+
+
+def extraire_documents(html_content, schema, parse_montant):
+    """Documents d'une liste @GP : un dict par ligne avec les champs du schéma, montants convertis en float"""
+    documents = []
+    for valeurs, lien, _ in lignes_document(html_content, schema):
+        document = {champ: valeurs.get(champ, "") for champ in schema["colonnes"]}
+        for champ in schema.get("montants", ()):
+            document[champ] = parse_montant(document[champ])
+        document["lien"] = lien
+        documents.append(document)
+    return documents
+
+
+def extraire_commandes(html_content, parse_montant):
+    """
+    Extrait toutes les commandes du tableau VL depuis un seul snapshot HTML.
+    parse_montant convertit le texte de la colonne montant en float.
+    """
+    commandes = []
+    for valeurs, lien, ligne in lignes_document(html_content, DOCUMENTS["commandes"]):
+        statut = valeurs.get("statut", "")
+        commandes.append({
+            "numero": valeurs.get("numero", ""),
+            "client": valeurs.get("client", ""),
+            "livrer_a": valeurs.get("livrer_a", ""),
+            "date_creation": valeurs.get("date_creation", ""),
+            "date_livraison": valeurs.get("date_livraison", ""),
+            "gln": valeurs.get("gln", ""),
+            "montant": parse_montant(valeurs.get("montant", "")),
+            "statut": statut,
+            "desadv": ligne_desadv(ligne) or "desadv" in statut.lower(),
+            "lien": lien,
+        })
+    return commandes
+
+
+def extraire_lignes_commande(html_content, parse_montant):
+    """
+    Lignes d'une page de détail de commande : EAN, libellé, quantité et prix unitaire.
+    Le tableau retenu est le premier dont l'entête contient au moins l'EAN et la quantité.
+    """
+    arbre = lxml_html.fromstring(html_content)
+    for table in arbre.xpath("//table"):
+        mapping = mapper_colonnes(entetes_table(table), COLONNES_LIGNES)
+        if "ean" in mapping and "quantite" in mapping:
+            break
+    else:
+        print("❌ Tableau des lignes non trouvé dans le détail de la commande")
+        return []
+
+    nb_colonnes = len(entetes_table(table))
+    lignes = []
+    for ligne in lignes_table(table):
+        cellules = ligne.xpath("./td")
+        # Lignes de total ou de regroupement : cellules fusionnées, les positions ne suivent plus l'entête
+        if len(cellules) < nb_colonnes or ligne.xpath("./td[@colspan]"):
+            continue
+        valeurs = {
+            champ: texte_cellule(cellules[index]) if index < len(cellules) else ""
+            for champ, index in mapping.items()
+        }
+        # Un EAN / GTIN est purement numérique
+        if not valeurs["ean"].isdigit():
+            continue
+        lignes.append({
+            "ean": valeurs["ean"],
+            "libelle": valeurs.get("libelle", ""),
+            "quantite": parse_montant(valeurs["quantite"]),
+            "prix_unitaire": parse_montant(valeurs.get("prix_unitaire", "")),
+        })
+
+    return lignes
@@ -0,0 +1,89 @@
+import os
+import re
+from datetime import date, datetime, timedelta
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+# lxml est importé au premier usage (formulaire_filtre_dates) : app.py importe ce module pour son premier rendu
+
+
+# Bornes "du" / "au" d'un champ de filtre de dates (date_livraison_du, livraisonFrom, facture[au]...)
+_BORNE_DEBUT = re.compile(r"debut|_du|\[du\]|from|min|start", re.IGNORECASE)
+_BORNE_FIN = re.compile(r"fin|_au|\[au\]|to|max|end", re.IGNORECASE)
+
+
+def _radical(champ):
+    """Racine cherchée dans les noms des champs du formulaire : date_livraison -> livr, date_facture -> fact"""
+    return champ.lower().removeprefix("date_")[:4]
+
+
+def semaine_courante(aujourd_hui=None):
+    """Lundi et dimanche de la semaine ISO en cours"""
+    aujourd_hui = aujourd_hui or date.today()
+    lundi = aujourd_hui - timedelta(days=aujourd_hui.weekday())
+    return lundi, lundi + timedelta(days=6)
+
+
+def seuil_par_defaut():
+    """Seuil des grosses commandes, configurable par RAPTHOR_SEUIL"""
+    return float(os.getenv("RAPTHOR_SEUIL", "850"))
+
+
+def parse_date(texte):
+    """Date du portail (JJ/MM/AAAA) -> date, None si illisible"""
+    try:
+        return datetime.strptime(texte.strip(), "%d/%m/%Y").date()
+    except (AttributeError, ValueError):
+        return None
+
+
+def formulaire_filtre_dates(html_content, url_page, champ="date_livraison"):
+    """
+    Repère le formulaire de filtre de la liste qui porte une plage sur la date champ
+    (DOCUMENTS[type]["date_periode"]). Retourne un dict (action, methode, donnees, debut, fin, format) ou None.
+    Une plage sur une autre date (création...) n'est jamais utilisée : le portail écarterait des documents
+    de la période que filtrer_periode ne pourrait pas rattraper.
+    """
+    from lxml import html as lxml_html
+
+    radical = _radical(champ)
+    arbre = lxml_html.fromstring(html_content)
+    for formulaire in arbre.xpath("//form[.//input[@name]]"):
+        champs = formulaire.xpath(".//input[@name]")
+        noms = [i.get("name") for i in champs if radical in i.get("name").lower()]
+        debut = next((n for n in noms if _BORNE_DEBUT.search(n)), None)
+        fin = next((n for n in noms if _BORNE_FIN.search(n) and n != debut), None)
+        if not debut or not fin:
+            continue
+
+        type_debut = next(i.get("type", "text").lower() for i in champs if i.get("name") == debut)
+        return {
+            "action": urljoin(url_page, formulaire.get("action") or url_page),
+            "methode": (formulaire.get("method") or "get").lower(),
+            "donnees": {
+                i.get("name"): i.get("value", "")
+                for i in champs
+                if i.get("type", "text").lower() not in ("submit", "button", "checkbox", "radio")
+            },
+            "debut": debut,
+            "fin": fin,
+            # input type=date attend le format ISO, les champs texte le format du portail
+            "format": "%Y-%m-%d" if type_debut == "date" else "%d/%m/%Y",
+        }
+
+    return None
+
+
+def donnees_filtre(formulaire, debut, fin):
+    """Données du formulaire avec la plage de dates renseignée"""
+    return dict(formulaire["donnees"], **{
+        formulaire["debut"]: debut.strftime(formulaire["format"]),
+        formulaire["fin"]: fin.strftime(formulaire["format"]),
+    })
+
+
+def url_filtre_get(formulaire, debut, fin):
+    """URL de la liste filtrée pour un formulaire en GET"""
+    morceaux = urlsplit(formulaire["action"])
+    params = dict(parse_qsl(morceaux.query))
+    params.update(donnees_filtre(formulaire, debut, fin))
+    return urlunsplit(morceaux._replace(query=urlencode(params), fragment=""))
@@ -0,0 +1,132 @@
+from urllib.parse import urljoin
+
+import requests
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+
+from extraction import trouver_table
+from filtres import donnees_filtre, url_filtre_get
+
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"
+
+
+class JavascriptRequis(Exception):
+    """Le portail ne peut pas être utilisé sans navigateur (formulaire ou tableau rendu en JS)"""
+
+
+class ConnexionRefusee(Exception):
+    """Le portail a refusé les identifiants"""
+
+
+class HttpBackend:
+    """
+    Accès au portail @GP en HTTP pur (requests), sans lancer de navigateur.
+    Une seule requests.Session avec pool de connexions est réutilisée pour toutes les pages.
+    """
+
+    def __init__(self, base_url, login_url, timeout=30, pool_size=8):
+        self.base_url = base_url
+        self.login_url = login_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": USER_AGENT,
+            "Accept-Language": "fr-FR,fr;q=0.9",
+        })
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def charger_cookies(self, cookies):
+        """Injecte des cookies au format storage_state Playwright"""
+        for c in cookies:
+            self.session.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+
+    def exporter_cookies(self):
+        """Cookies de la session au format storage_state Playwright"""
+        return [
+            {
+                "name": c.name,
+                "value": c.value,
+                "domain": c.domain,
+                "path": c.path,
+                "expires": c.expires if c.expires is not None else -1,
+                "httpOnly": bool(c.has_nonstandard_attr("HttpOnly")),
+                "secure": c.secure,
+                "sameSite": "Lax",
+            }
+            for c in self.session.cookies
+        ]
+
+    def get(self, url, **kwargs):
+        """GET avec timeout par défaut, lève une exception sur les codes HTTP d'erreur"""
+        reponse = self.session.get(url, timeout=self.timeout, **kwargs)
+        reponse.raise_for_status()
+        return reponse
+
+    def se_connecter(self, username, password):
+        """Poste le formulaire de login @GP (champs cachés compris, ex. jeton CSRF)"""
+        reponse = self.get(self.login_url)
+        arbre = lxml_html.fromstring(reponse.text)
+
+        formulaires = arbre.xpath("//form[.//input[@name='_username']]")
+        if not formulaires:
+            raise JavascriptRequis("Formulaire de login absent du HTML (rendu en JavaScript)")
+        formulaire = formulaires[0]
+
+        donnees = {
+            champ.get("name"): champ.get("value", "")
+            for champ in formulaire.xpath(".//input[@name]")
+            if champ.get("type", "text").lower() not in ("submit", "button", "checkbox")
+        }
+        donnees["_username"] = username
+        donnees["_password"] = password
+
+        action = urljoin(reponse.url, formulaire.get("action") or reponse.url)
+        reponse = self.session.post(action, data=donnees, timeout=self.timeout)
+        reponse.raise_for_status()
+
+        if "login" in reponse.url.lower():
+            raise ConnexionRefusee("Échec de connexion - Vérifiez vos identifiants")
+        return reponse
+
+    def page_liste(self, url_liste):
+        """HTML de la liste ; lève JavascriptRequis si le tableau n'est pas dans la réponse serveur"""
+        return self._verifier_liste(self.get(url_liste))
+
+    def page(self, url):
+        """HTML d'une page quelconque du portail connecté (ex. détail d'une commande)"""
+        reponse = self.get(url)
+        if "login" in reponse.url.lower():
+            raise ConnexionRefusee("Session refusée par le portail")
+        return reponse.text
+
+    def appliquer_filtre_dates(self, formulaire, debut, fin):
+        """Soumet le filtre de dates du portail ; retourne (html, url de la liste filtrée)"""
+        if formulaire["methode"] == "post":
+            reponse = self.session.post(
+                formulaire["action"], data=donnees_filtre(formulaire, debut, fin), timeout=self.timeout
+            )
+            reponse.raise_for_status()
+            return self._verifier_liste(reponse), reponse.url
+
+        url = url_filtre_get(formulaire, debut, fin)
+        return self.page_liste(url), url
+
+    def _verifier_liste(self, reponse):
+        if "login" in reponse.url.lower():
+            raise ConnexionRefusee("Session refusée par le portail")
+        if trouver_table(lxml_html.fromstring(reponse.text)) is None:
+            raise JavascriptRequis("Tableau des commandes absent du HTML (chargé en JavaScript)")
+        return reponse.text
+
+    def effacer_filtres(self, html_content, url_page):
+        """Suit le lien de la gomme s'il existe ; retourne le HTML à jour ou None"""
+        liens = lxml_html.fromstring(html_content).xpath("//a[.//*[contains(@class, 'fa-eraser')]]/@href")
+        if not liens or liens[0].startswith(("#", "javascript")):
+            return None
+        return self.page_liste(urljoin(url_page, liens[0]))
+
+    def fermer(self):
+        self.session.close()
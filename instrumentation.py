@@ -0,0 +1,87 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+logger = logging.getLogger("rapthor.phases")
+
+
+class Span:
+    """Mesure d'une phase du scraping : durée, nombre de tentatives et issue"""
+
+    def __init__(self, nom, **attributs):
+        self.nom = nom
+        self.attributs = attributs
+        self.debut = datetime.now()
+        self.duree = None
+        self.tentatives = 1
+        self.statut = "en_cours"
+        self.erreur = None
+
+    def nouvelle_tentative(self):
+        self.tentatives += 1
+
+    def en_dict(self):
+        return {
+            "phase": self.nom,
+            "debut": self.debut.isoformat(timespec="milliseconds"),
+            "duree_s": round(self.duree, 3) if self.duree is not None else None,
+            "tentatives": self.tentatives,
+            "statut": self.statut,
+            "erreur": self.erreur,
+            **self.attributs,
+        }
+
+
+class Trace:
+    """Ensemble des spans d'un run, exposé dans le dict de résultats et dans les logs"""
+
+    def __init__(self, rappel=None):
+        self.spans = []
+        # rappel(span) est appelé au début et à la fin de chaque phase (suivi de progression)
+        self.rappel = rappel
+
+    def _notifier(self, span):
+        if self.rappel is not None:
+            try:
+                self.rappel(span)
+            except Exception as e:
+                logger.warning(f"Rappel de progression en erreur: {e}")
+
+    @contextmanager
+    def span(self, nom, **attributs):
+        """Mesure le bloc ; une exception marque le span en erreur et est propagée"""
+        span = Span(nom, **attributs)
+        self.spans.append(span)
+        self._notifier(span)
+        chrono = time.perf_counter()
+        try:
+            yield span
+            if span.statut == "en_cours":
+                span.statut = "ok"
+        except BaseException as e:
+            span.statut = "erreur"
+            span.erreur = str(e)
+            raise
+        finally:
+            span.duree = time.perf_counter() - chrono
+            logger.info(json.dumps(span.en_dict(), ensure_ascii=False, default=str))
+            self._notifier(span)
+
+    def ignorer(self, nom, raison, **attributs):
+        """Enregistre une phase qui n'a pas eu besoin d'être exécutée (ex. login évité)"""
+        span = Span(nom, raison=raison, **attributs)
+        span.duree = 0.0
+        span.tentatives = 0
+        span.statut = "evitee"
+        self.spans.append(span)
+        logger.info(json.dumps(span.en_dict(), ensure_ascii=False, default=str))
+        self._notifier(span)
+
+    def resume(self):
+        return [s.en_dict() for s in self.spans]
+
+    def duree_totale(self):
+        return round(sum(s.duree or 0.0 for s in self.spans), 3)
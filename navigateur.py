@@ -0,0 +1,113 @@
+import os
+import threading
+
+from playwright.sync_api import sync_playwright
+
+
+# Types de ressources chargés par défaut : on ne lit que le texte du DOM
+RESSOURCES_AUTORISEES = ("document", "script", "xhr", "fetch")
+
+
+def ressources_autorisees():
+    """Liste blanche des types de ressources (RAPTHOR_RESSOURCES, séparés par des virgules)"""
+    valeur = os.getenv("RAPTHOR_RESSOURCES")
+    if not valeur:
+        return RESSOURCES_AUTORISEES
+    return tuple(t.strip() for t in valeur.split(",") if t.strip())
+
+
+def bloquer_ressources(context, autorisees=None):
+    """Annule les requêtes dont le type n'est pas autorisé (images, polices, CSS...)"""
+    autorisees = set(autorisees or ressources_autorisees())
+
+    def filtrer(route):
+        if route.request.resource_type in autorisees:
+            route.continue_()
+        else:
+            route.abort()
+
+    context.route("**/*", filtrer)
+
+
+async def bloquer_ressources_async(context, autorisees=None):
+    """Même filtrage que bloquer_ressources, pour un contexte de l'API async"""
+    autorisees = set(autorisees or ressources_autorisees())
+
+    async def filtrer(route):
+        if route.request.resource_type in autorisees:
+            await route.continue_()
+        else:
+            await route.abort()
+
+    await context.route("**/*", filtrer)
+
+
+class NavigateurPartage:
+    """
+    Firefox headless gardé ouvert entre deux scrapings pour éviter le coût de démarrage.
+    Vérifié avant chaque utilisation, relancé s'il a planté et recyclé après N utilisations.
+    L'API sync de Playwright est liée à son thread : chaque thread a donc son propre navigateur
+    (en pratique un seul, celui du worker du ScrapeScheduler).
+    """
+
+    def __init__(self, utilisations_max=None):
+        self.utilisations_max = utilisations_max or int(os.getenv("RAPTHOR_RECYCLAGE", "20"))
+        self._local = threading.local()
+
+    def obtenir(self):
+        """Navigateur prêt à l'emploi pour le thread courant"""
+        etat = self._local
+        browser = getattr(etat, "browser", None)
+
+        if browser is not None and not browser.is_connected():
+            print("💥 Navigateur déconnecté, relance")
+            self._fermer()
+        elif browser is not None and etat.utilisations >= self.utilisations_max:
+            print(f"♻️ Navigateur recyclé après {etat.utilisations} utilisations")
+            self._fermer()
+
+        if getattr(etat, "browser", None) is None:
+            print("🦊 Lancement de Firefox (navigateur partagé)...")
+            etat.playwright = sync_playwright().start()
+            # Firefox en mode headless (plus stable que Chromium sur serveurs)
+            etat.browser = etat.playwright.firefox.launch(headless=True)
+            etat.utilisations = 0
+
+        etat.utilisations += 1
+        return etat.browser
+
+    def prechauffer(self):
+        """
+        Lance Firefox et ouvre puis ferme un contexte, pour que le premier scraping n'attende pas
+        le démarrage du navigateur. À appeler dans le thread qui fera les scrapings.
+        """
+        browser = self.obtenir()
+        self._local.utilisations -= 1
+        try:
+            browser.new_context().close()
+            print("🔥 Navigateur préchauffé")
+        except Exception as e:
+            print(f"⚠️ Préchauffage du navigateur impossible: {e}")
+            self.liberer(panne=True)
+
+    def liberer(self, panne=False):
+        """Fin d'utilisation ; en cas de panne le navigateur est fermé pour être relancé au prochain usage"""
+        browser = getattr(self._local, "browser", None)
+        if browser is not None and (panne or not browser.is_connected()):
+            print("💥 Panne du navigateur, il sera relancé au prochain scraping")
+            self._fermer()
+
+    def _fermer(self):
+        etat = self._local
+        try:
+            if getattr(etat, "browser", None) is not None:
+                etat.browser.close()
+        except Exception:
+            pass
+        try:
+            if getattr(etat, "playwright", None) is not None:
+                etat.playwright.stop()
+        except Exception:
+            pass
+        etat.browser = None
+        etat.playwright = None
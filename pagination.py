@@ -0,0 +1,308 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from lxml import html as lxml_html
+
+
+# Liens de pagination : conteneur .pagination/.pager, ou liens dont le texte est un numéro
+_LIENS_XPATH = (
+    "//*[contains(@class, 'pagination') or contains(@class, 'pager')]//a[@href]"
+    " | //a[@href][string(number(normalize-space(.))) != 'NaN'][not(ancestor::table)]"
+)
+
+# "Page 1 sur 12", "Page 1 / 12", "1/12"
+_TOTAL_PAGES = re.compile(r"page\s*\d+\s*(?:/|sur|de)\s*(\d+)", re.IGNORECASE)
+
+
+def _parametres_entiers(url):
+    return {k: int(v) for k, v in parse_qsl(urlsplit(url).query) if v.isdigit()}
+
+
+def _parametres_fixes(url):
+    return {k: v for k, v in parse_qsl(urlsplit(url).query) if not v.isdigit()}
+
+
+def _avec_parametre(url, cle, valeur):
+    morceaux = urlsplit(url)
+    params = dict(parse_qsl(morceaux.query))
+    params[cle] = str(valeur)
+    return urlunsplit(morceaux._replace(query=urlencode(params)))
+
+
+def urls_pages_suivantes(html_content, url_page):
+    """
+    Détecte la pagination de la liste et retourne les URL de toutes les autres pages.
+    Gère les numéros de page (p=2, 3... ou pg=1, 2... en base 0) comme les décalages (start=50, 100...).
+    Seules les pages annoncées par cette page sont connues : un simple lien "Suivant" ne donne que la page
+    d'après (Pagination relance la détection sur chaque page chargée).
+    """
+    return _pagination(html_content, url_page)[1]
+
+
+def _pagination(html_content, url_page):
+    """(URL de la page courante telle que les autres pages la désignent, URL des autres pages)"""
+    arbre = lxml_html.fromstring(html_content)
+    liens = [
+        (urljoin(url_page, a.get("href")), a.text_content().strip())
+        for a in arbre.xpath(_LIENS_XPATH)
+        if not a.get("href").startswith(("#", "javascript"))
+    ]
+    # Même page du portail (gui.php?page=documents_commandes_liste), seul un numéro change ;
+    # un paramètre absent de l'URL courante (tri=numero...) ne disqualifie pas le lien
+    chemin_page = urlsplit(url_page).path
+    fixes_page = _parametres_fixes(url_page)
+    liens = [
+        (url, texte) for url, texte in liens
+        if urlsplit(url).path == chemin_page
+        and all(fixes_page.get(k, v) == v for k, v in _parametres_fixes(url).items())
+    ]
+    if not liens:
+        return url_page, []
+
+    # Le paramètre de pagination est celui qui prend le plus de valeurs différentes
+    valeurs = {}
+    for url, _ in liens:
+        for cle, valeur in _parametres_entiers(url).items():
+            valeurs.setdefault(cle, set()).add(valeur)
+    if not valeurs:
+        return url_page, []
+    cle = max(valeurs, key=lambda k: len(valeurs[k]))
+    vues = sorted(valeurs[cle])
+
+    # Liens numérotés (texte "3" -> valeur) : numéro de page (p=3), base 0 (pg=2) ou décalage (start=100)
+    numeros = {}
+    for url, texte in liens:
+        valeur = _parametres_entiers(url).get(cle)
+        if texte.isdigit() and valeur is not None:
+            numeros.setdefault(int(texte), valeur)
+    if len(numeros) >= 2:
+        (n1, v1), (n2, v2) = min(numeros.items()), max(numeros.items())
+        pas = max(1, (v2 - v1) // (n2 - n1))
+    elif numeros and min(numeros) > 1 and numeros[min(numeros)] != min(numeros):
+        pas = max(1, numeros[min(numeros)] // (min(numeros) - 1))
+    else:
+        pas = 1
+    if numeros:
+        numero = min(numeros)
+        premiere = numeros[numero] - (numero - 1) * pas
+    else:
+        premiere = 0 if pas > 1 else 1
+    actuelle = _parametres_entiers(url_page).get(cle, premiere)
+
+    dernier = max(vues)
+    # Nœud par nœud : "Page 1 sur 4" suivi des liens "2" "3" "4" ne doit pas donner 4234
+    totaux = (_TOTAL_PAGES.search(texte) for texte in arbre.xpath("//body//text()"))
+    total = next((t for t in totaux if t), None)
+    if total:
+        dernier = max(dernier, premiere + (int(total.group(1)) - 1) * pas)
+
+    return _avec_parametre(url_page, cle, actuelle), [
+        _avec_parametre(url_page, cle, valeur)
+        for valeur in range(premiere, dernier + 1, pas)
+        if valeur != actuelle
+    ]
+
+
+def recuperer_pages_http(backend, urls, concurrence=4, rappel=None, charger=None):
+    """
+    Télécharge les pages en parallèle via la session HTTP partagée (ordre conservé).
+    rappel(url, html) est appelé dans le thread appelant dès qu'une page arrive ; en cas d'échec,
+    toutes les pages arrivées sont transmises avant que la première erreur soit levée.
+    charger(url) remplace backend.page_liste pour les pages qui ne sont pas la liste des commandes.
+    """
+    if not urls:
+        return []
+    charger = charger or backend.page_liste
+    with ThreadPoolExecutor(max_workers=max(1, concurrence)) as pool:
+        futures = {pool.submit(charger, url): url for url in urls}
+        if rappel is not None:
+            erreur = None
+            for future in as_completed(futures):
+                try:
+                    html_page = future.result()
+                except Exception as e:
+                    erreur = erreur or e
+                    continue
+                rappel(futures[future], html_page)
+            if erreur is not None:
+                raise erreur
+        return [f.result() for f in futures]
+
+
+def recuperer_pages_playwright(context, urls, concurrence=4, rappel=None, timeout=30000, selecteur="table.VL",
+                               sur_erreur=None):
+    """
+    Charge les pages en parallèle dans plusieurs onglets du même contexte (ordre conservé).
+    La navigation est déclenchée sur tous les onglets d'un lot avant d'attendre le premier.
+    rappel(url, html) est appelé dès qu'une page est chargée (selecteur présent).
+    Sans sur_erreur, la première page en échec interrompt tout ; sinon sur_erreur(url, erreur)
+    donne le résultat de cette page (ex. None) et les autres onglets continuent.
+    """
+    if not urls:
+        return []
+
+    onglets = [context.new_page() for _ in range(min(max(1, concurrence), len(urls)))]
+    resultats = []
+    try:
+        for debut in range(0, len(urls), len(onglets)):
+            lot = list(zip(onglets, urls[debut:debut + len(onglets)]))
+            erreurs = {}
+            for onglet, url in lot:
+                try:
+                    onglet.evaluate("url => { window.location.href = url }", url)
+                except Exception as e:
+                    if sur_erreur is None:
+                        raise
+                    erreurs[onglet] = e
+            for onglet, url in lot:
+                try:
+                    if onglet in erreurs:
+                        raise erreurs[onglet]
+                    onglet.wait_for_url(url, wait_until="domcontentloaded", timeout=timeout)
+                    onglet.wait_for_selector(selecteur, timeout=timeout)
+                    html_page = onglet.content()
+                except Exception as e:
+                    if sur_erreur is None:
+                        raise
+                    resultats.append(sur_erreur(url, e))
+                    continue
+                resultats.append(html_page)
+                if rappel is not None:
+                    rappel(url, html_page)
+    finally:
+        for onglet in onglets:
+            onglet.close()
+
+    return resultats
+
+
+async def recuperer_pages_playwright_async(context, urls, concurrence=4, rappel=None, timeout=30000,
+                                          selecteur="table.VL", sur_erreur=None):
+    """Même chargement par onglets que recuperer_pages_playwright, pour un contexte de l'API async"""
+    if not urls:
+        return []
+
+    onglets = [await context.new_page() for _ in range(min(max(1, concurrence), len(urls)))]
+    resultats = []
+    try:
+        for debut in range(0, len(urls), len(onglets)):
+            lot = list(zip(onglets, urls[debut:debut + len(onglets)]))
+            erreurs = {}
+            for onglet, url in lot:
+                try:
+                    await onglet.evaluate("url => { window.location.href = url }", url)
+                except Exception as e:
+                    if sur_erreur is None:
+                        raise
+                    erreurs[onglet] = e
+            for onglet, url in lot:
+                try:
+                    if onglet in erreurs:
+                        raise erreurs[onglet]
+                    await onglet.wait_for_url(url, wait_until="domcontentloaded", timeout=timeout)
+                    await onglet.wait_for_selector(selecteur, timeout=timeout)
+                    html_page = await onglet.content()
+                except Exception as e:
+                    if sur_erreur is None:
+                        raise
+                    resultats.append(sur_erreur(url, e))
+                    continue
+                resultats.append(html_page)
+                if rappel is not None:
+                    rappel(url, html_page)
+    finally:
+        for onglet in onglets:
+            await onglet.close()
+
+    return resultats
+
+
+def fusionner_commandes(*listes):
+    """Fusionne plusieurs listes de commandes en supprimant les doublons par numéro"""
+    vues = set()
+    fusion = []
+    for commandes in listes:
+        for cmd in commandes:
+            if cmd["numero"] in vues:
+                continue
+            vues.add(cmd["numero"])
+            fusion.append(cmd)
+    return fusion
+
+
+class Pagination:
+    """
+    Pages d'une liste @GP pendant l'extraction : la première est extraite tout de suite, les suivantes
+    sont relues depuis le point de reprise (Checkpoint) ou restent à charger. Chaque page extraite est
+    enregistrée dans le point de reprise puis transmise à publier(lot, pages_faites, nb_pages).
+    Les pages annoncées par une page chargée (ou relue) et encore inconnues sont ajoutées à la file :
+    un lien "Suivant" seul suffit à parcourir toute la liste.
+    """
+
+    def __init__(self, html_content, url_page, extraire, checkpoint, publier=None):
+        self.extraire = extraire
+        self.checkpoint = checkpoint
+        self.publier = publier
+        self.lots = []
+        self.urls = []
+        self.reprises = []
+        premiere = extraire(html_content)
+        url_page, suivantes = _pagination(html_content, url_page) if premiere else (url_page, [])
+        self.vues = {url_page}
+        self._ajouter(premiere)
+        self._decouvrir(suivantes)
+
+    @property
+    def nb_pages(self):
+        return len(self.urls) + 1
+
+    def _ajouter(self, lot):
+        self.lots.append(lot)
+        if self.publier is not None:
+            self.publier(lot, len(self.lots), self.nb_pages)
+
+    def _decouvrir(self, urls):
+        """Ajoute les pages encore inconnues ; celles du point de reprise sont relues avec leurs suivantes"""
+        file = list(urls)
+        while file:
+            url = file.pop(0)
+            if url in self.vues:
+                continue
+            self.vues.add(url)
+            self.urls.append(url)
+            lot = self.checkpoint.page(url)
+            if lot is not None:
+                self.reprises.append(url)
+                self._ajouter(lot)
+                file.extend(self.checkpoint.suivantes(url))
+
+    def restantes(self):
+        """Pages ni extraites ni reprises : ce qu'un nouvel essai doit encore charger"""
+        return [url for url in self.urls if self.checkpoint.page(url) is None]
+
+    def sur_page(self, url, html_page):
+        """Rappel des fonctions recuperer_pages_* : extrait, enregistre et publie la page, note ses suivantes"""
+        lot = self.extraire(html_page)
+        suivantes = urls_pages_suivantes(html_page, url) if lot else []
+        self.checkpoint.enregistrer_page(url, lot, suivantes)
+        self._ajouter(lot)
+        self._decouvrir(suivantes)
+
+    def charger(self, recuperer):
+        """Un essai : recuperer(urls, rappel) charge les pages manquantes, puis celles qu'elles annoncent"""
+        restantes = self.restantes()
+        while restantes:
+            recuperer(restantes, self.sur_page)
+            restantes = self.restantes()
+
+    async def charger_async(self, recuperer):
+        """Un essai avec une coroutine recuperer(urls, rappel)"""
+        restantes = self.restantes()
+        while restantes:
+            await recuperer(restantes, self.sur_page)
+            restantes = self.restantes()
+
+    def resultat(self):
+        """Lignes de toutes les pages, sans doublon"""
+        return fusionner_commandes(*self.lots)
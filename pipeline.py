@@ -0,0 +1,125 @@
+import pandas as pd
+
+from filtres import seuil_par_defaut
+
+
+COLONNES = ["numero", "client", "livrer_a", "date_creation", "date_livraison", "gln", "montant", "statut", "desadv"]
+
+COLONNES_LIGNES = ["numero", "ean", "libelle", "quantite", "prix_unitaire"]
+
+FORMAT_DATE = "%d/%m/%Y"
+
+
+def commandes_dataframe(commandes):
+    """
+    DataFrame typé à partir des commandes extraites (liste de dicts ou DataFrame brut) :
+    client catégoriel, dates datetime64, montant float64, desadv booléen.
+    """
+    df = pd.DataFrame(commandes, columns=COLONNES)
+    return df.assign(
+        numero=df["numero"].astype("string"),
+        client=df["client"].astype("category"),
+        livrer_a=df["livrer_a"].astype("string"),
+        date_creation=_dates(df["date_creation"]),
+        date_livraison=_dates(df["date_livraison"]),
+        gln=df["gln"].astype("string"),
+        montant=pd.to_numeric(df["montant"], errors="coerce").fillna(0.0).astype("float64"),
+        statut=df["statut"].fillna("").astype("string"),
+        desadv=df["desadv"].fillna(False).astype(bool),
+    )
+
+
+def lignes_dataframe(lignes):
+    """DataFrame typé des lignes de commandes (détail des DESADV), avec le montant de chaque ligne"""
+    df = pd.DataFrame(lignes, columns=COLONNES_LIGNES)
+    df = df.assign(
+        numero=df["numero"].astype("string"),
+        ean=df["ean"].astype("string"),
+        libelle=df["libelle"].fillna("").astype("string"),
+        quantite=pd.to_numeric(df["quantite"], errors="coerce").fillna(0.0).astype("float64"),
+        prix_unitaire=pd.to_numeric(df["prix_unitaire"], errors="coerce").fillna(0.0).astype("float64"),
+    )
+    return df.assign(montant_ligne=df["quantite"] * df["prix_unitaire"])
+
+
+def documents_dataframe(documents, schema):
+    """
+    DataFrame typé d'une liste de documents extraite selon un schéma (extraction.DOCUMENTS) :
+    montants float64, champs date_* en datetime64, le reste en texte.
+    """
+    champs = list(schema["colonnes"])
+    df = pd.DataFrame(documents, columns=champs)
+    return df.assign(**{
+        champ: (
+            pd.to_numeric(df[champ], errors="coerce").fillna(0.0).astype("float64")
+            if champ in schema.get("montants", ())
+            else _dates(df[champ]) if champ.startswith("date_")
+            else df[champ].fillna("").astype("string")
+        )
+        for champ in champs
+    })
+
+
+def _dates(serie):
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    return pd.to_datetime(serie, format=FORMAT_DATE, errors="coerce")
+
+
+def filtrer_periode(df, debut, fin, colonne="date_livraison"):
+    """Lignes dont la date (livraison par défaut) est entre debut et fin inclus ; les dates illisibles sont écartées"""
+    illisibles = int(df[colonne].isna().sum())
+    if illisibles:
+        print(f"⚠️ {illisibles} ligne(s) écartée(s): {colonne} illisible")
+    masque = df[colonne].between(pd.Timestamp(debut), pd.Timestamp(fin))
+    return df[masque].reset_index(drop=True)
+
+
+def total_par_client(df):
+    """Montant total, nombre et numéros des commandes par client"""
+    return (
+        df.groupby("client", observed=True, sort=True)
+        .agg(montant_total=("montant", "sum"), nb_commandes=("numero", "size"), commandes=("numero", list))
+    )
+
+
+def vues(df, seuil=None):
+    """Vues du tableau de bord, calculées par masques et groupby sur le même DataFrame"""
+    seuil = seuil_par_defaut() if seuil is None else seuil
+    return {
+        "commandes": df,
+        "desadv_a_faire": df[df["desadv"]],
+        "commandes_sup_seuil": df[df["montant"] > seuil],
+        "total_par_client": total_par_client(df),
+        "seuil": seuil,
+    }
+
+
+def rapprocher(commandes, desadv=None, factures=None):
+    """
+    Rapprochement des commandes avec les DESADV (expéditions) et les factures, par numéro de commande.
+    Ajoute expediee / desadv_envoyes et facturee / montant_facture_ht selon les listes fournies.
+    """
+    df = commandes[["numero", "client", "date_livraison", "montant", "desadv"]].copy()
+    if desadv is not None:
+        envoyes = desadv.groupby("commande", observed=True)["numero"].agg(list)
+        df["expediee"] = df["numero"].isin(envoyes.index)
+        df["desadv_envoyes"] = df["numero"].map(envoyes)
+    if factures is not None:
+        facture = factures.groupby("commande", observed=True)["montant_ht"].sum()
+        df["facturee"] = df["numero"].isin(facture.index)
+        df["montant_facture_ht"] = df["numero"].map(facture)
+    return df
+
+
+def vers_enregistrements(df):
+    """Retour au format de l'extraction (dates JJ/MM/AAAA), pour le stockage SQLite"""
+    brut = df.assign(
+        client=df["client"].astype(str),
+        date_creation=df["date_creation"].dt.strftime(FORMAT_DATE).fillna(""),
+        date_livraison=df["date_livraison"].dt.strftime(FORMAT_DATE).fillna(""),
+    )
+    return [
+        {**ligne, "montant": float(ligne["montant"]), "desadv": bool(ligne["desadv"])}
+        for ligne in brut.astype(object).to_dict("records")
+    ]
@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+from http_backend import ConnexionRefusee, JavascriptRequis
+
+
+class PortailIndisponible(Exception):
+    """Le disjoncteur est ouvert : trop d'échecs consécutifs, on laisse le portail tranquille"""
+
+
+# Erreurs qu'un nouvel essai ne corrigera pas
+ERREURS_DEFINITIVES = (ConnexionRefusee, JavascriptRequis, PortailIndisponible)
+
+
+class Disjoncteur:
+    """
+    Coupe-circuit sur le portail : ouvert après `seuil` échecs consécutifs, il refuse toute requête
+    pendant `delai` secondes, puis laisse passer un essai (semi-ouvert) qui le referme s'il réussit.
+    """
+
+    def __init__(self, seuil=None, delai=None):
+        self.seuil = seuil or int(os.getenv("RAPTHOR_DISJONCTEUR_SEUIL", "5"))
+        self.delai = delai or float(os.getenv("RAPTHOR_DISJONCTEUR_DELAI", "300"))
+        self._verrou = threading.Lock()
+        self.echecs = 0
+        self.ouvert_le = None
+
+    def verifier(self):
+        """Lève PortailIndisponible tant que le disjoncteur est ouvert"""
+        with self._verrou:
+            if self.ouvert_le is None:
+                return
+            restant = self.delai - (time.monotonic() - self.ouvert_le)
+        if restant > 0:
+            raise PortailIndisponible(f"Portail indisponible, prochain essai dans {restant:.0f} s")
+
+    def succes(self):
+        with self._verrou:
+            if self.ouvert_le is not None:
+                print("🔌 Portail de nouveau joignable, disjoncteur refermé")
+            self.echecs = 0
+            self.ouvert_le = None
+
+    def echec(self):
+        with self._verrou:
+            self.echecs += 1
+            # En semi-ouvert (délai écoulé), un seul échec suffit à rouvrir
+            if self.echecs >= self.seuil or self.ouvert_le is not None:
+                print(f"🔌 {self.echecs} échec(s) consécutif(s), disjoncteur ouvert pour {self.delai:.0f} s")
+                self.ouvert_le = time.monotonic()
+
+
+_disjoncteurs = {}
+_verrou_disjoncteurs = threading.Lock()
+
+
+def disjoncteur(hote):
+    """Disjoncteur partagé par tous les scrapings d'un même portail (tous threads confondus)"""
+    with _verrou_disjoncteurs:
+        return _disjoncteurs.setdefault(hote, Disjoncteur())
+
+
+def delai_backoff(tentative, base=None, plafond=None):
+    """Backoff exponentiel avec jitter complet : aléatoire entre 0 et min(plafond, base * 2^(n-1))"""
+    base = base if base is not None else float(os.getenv("RAPTHOR_BACKOFF_BASE", "1"))
+    plafond = plafond if plafond is not None else float(os.getenv("RAPTHOR_BACKOFF_MAX", "30"))
+    return random.uniform(0, min(plafond, base * 2 ** (tentative - 1)))
+
+
+def reessayer(fonction, *args, span=None, tentatives=None, coupe_circuit=None, **kwargs):
+    """
+    Appelle fonction(*args, **kwargs) jusqu'à `tentatives` fois (RAPTHOR_TENTATIVES, 3 par défaut).
+    Chaque nouvel essai est compté sur le span ; les erreurs définitives ne sont pas retentées.
+    """
+    tentatives = tentatives or int(os.getenv("RAPTHOR_TENTATIVES", "3"))
+    for tentative in range(1, tentatives + 1):
+        if coupe_circuit is not None:
+            coupe_circuit.verifier()
+        try:
+            resultat = fonction(*args, **kwargs)
+        except Exception as e:
+            time.sleep(_apres_echec(e, fonction, tentative, tentatives, span, coupe_circuit))
+        else:
+            if coupe_circuit is not None:
+                coupe_circuit.succes()
+            return resultat
+
+
+async def reessayer_async(fonction, *args, span=None, tentatives=None, coupe_circuit=None, **kwargs):
+    """Même politique que reessayer pour une coroutine : await fonction(*args, **kwargs)"""
+    tentatives = tentatives or int(os.getenv("RAPTHOR_TENTATIVES", "3"))
+    for tentative in range(1, tentatives + 1):
+        if coupe_circuit is not None:
+            coupe_circuit.verifier()
+        try:
+            resultat = await fonction(*args, **kwargs)
+        except Exception as e:
+            await asyncio.sleep(_apres_echec(e, fonction, tentative, tentatives, span, coupe_circuit))
+        else:
+            if coupe_circuit is not None:
+                coupe_circuit.succes()
+            return resultat
+
+
+def _apres_echec(erreur, fonction, tentative, tentatives, span, coupe_circuit):
+    """Compte un essai en échec et retourne le délai avant le suivant (relève l'erreur s'il n'y en a plus)"""
+    if isinstance(erreur, ERREURS_DEFINITIVES):
+        raise erreur
+    if coupe_circuit is not None:
+        coupe_circuit.echec()
+    if tentative == tentatives:
+        raise erreur
+    delai = delai_backoff(tentative)
+    nom = span.nom if span is not None else getattr(fonction, "__name__", "étape")
+    print(f"🔁 {nom}: {erreur} - nouvelle tentative dans {delai:.1f} s ({tentative + 1}/{tentatives})")
+    if span is not None:
+        span.nouvelle_tentative()
+    return delai
+
+
+class Checkpoint:
+    """
+    Points de reprise d'un scraping (compte + période), en JSONL ajouté au fil de l'eau :
+    les lignes de chaque page de liste déjà parsée et les pages qu'elle annonçait. Un run en échec
+    ne recharge que les pages manquantes ; le fichier est supprimé quand le run aboutit.
+    """
+
+    def __init__(self, username, debut, fin, dossier=None, duree_max=None):
+        self.dossier = dossier or os.getenv("RAPTHOR_CHECKPOINTS_DIR", "/tmp/rapthor_checkpoints")
+        self.duree_max = duree_max or int(os.getenv("RAPTHOR_CHECKPOINT_TTL", "1800"))
+        cle = hashlib.sha256(f"{username}|{debut}|{fin}".encode("utf-8")).hexdigest()[:16]
+        self.chemin = os.path.join(self.dossier, f"checkpoint_{cle}.jsonl")
+        self.pages = {}
+        self._suivantes = {}
+        self._verrou = threading.Lock()
+        self._charger()
+
+    def _charger(self):
+        if not os.path.exists(self.chemin):
+            return
+        if time.time() - os.path.getmtime(self.chemin) > self.duree_max:
+            print("⌛ Point de reprise trop ancien, scraping complet")
+            self.effacer()
+            return
+        try:
+            with open(self.chemin, encoding="utf-8") as f:
+                for ligne in f:
+                    entree = json.loads(ligne)
+                    if entree["type"] == "page":
+                        self.pages[entree["url"]] = entree["commandes"]
+                        self._suivantes[entree["url"]] = entree.get("suivantes", [])
+        except Exception as e:
+            # Une ligne tronquée (arrêt brutal pendant l'écriture) : on garde ce qui a été lu
+            print(f"⚠️ Point de reprise partiellement illisible: {e}")
+        if self.pages:
+            print(f"♻️ Reprise: {len(self.pages)} page(s) déjà extraite(s) lors du run précédent")
+
+    def _ajouter(self, entree):
+        with self._verrou:
+            os.makedirs(self.dossier, mode=0o700, exist_ok=True)
+            with open(self.chemin, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entree, ensure_ascii=False, default=str) + "\n")
+
+    def page(self, url):
+        """Commandes déjà extraites pour cette page, None si elle reste à faire"""
+        return self.pages.get(url)
+
+    def suivantes(self, url):
+        """Pages annoncées par cette page quand elle a été extraite"""
+        return self._suivantes.get(url, [])
+
+    def enregistrer_page(self, url, commandes, suivantes=()):
+        self.pages[url] = commandes
+        self._suivantes[url] = list(suivantes)
+        self._ajouter({"type": "page", "url": url, "commandes": commandes, "suivantes": list(suivantes)})
+
+    def effacer(self):
+        self.pages.clear()
+        self._suivantes.clear()
+        try:
+            os.remove(self.chemin)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,171 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from filtres import semaine_courante
+from async_engine import scraper_comptes_sync
+from scraper import AuchanScraper
+
+
+class ScrapeScheduler:
+    """
+    Rafraîchit les commandes en arrière-plan à intervalle régulier.
+    Un seul scraping tourne à la fois (un seul Firefox sur le conteneur) et les demandes
+    simultanées pour la même période partagent le même job au lieu d'en lancer un autre.
+    """
+
+    def __init__(self, username, password, store, intervalle=None, scraper_factory=AuchanScraper, prechauffage=None,
+                 archive=None, comptes=None):
+        self.username = username
+        self.password = password
+        self.store = store
+        self.intervalle = intervalle or int(os.getenv("RAPTHOR_INTERVALLE", "900"))
+        self.scraper_factory = scraper_factory
+        # Exécuté en premier sur le thread de scraping (ex. NavigateurPartage.prechauffer)
+        self.prechauffage = prechauffage
+        # Historique Parquet (ArchiveParquet) alimenté à chaque synchronisation réussie
+        self.archive = archive
+        # Plusieurs comptes @GP (RAPTHOR_COMPTES) : scrapés ensemble par le moteur async, un seul Firefox
+        self.comptes = comptes or [{"username": username, "password": password}]
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rapthor-scrape")
+        self._verrou = threading.Lock()
+        self._en_cours = {}
+        self._snapshots = {}
+        self._abonnes = {}
+        self._historique = {}
+        self._arret = threading.Event()
+        self._thread = None
+
+    def demarrer(self):
+        """Lance la boucle de rafraîchissement périodique (semaine en cours)"""
+        if self._thread is None:
+            if self.prechauffage is not None:
+                self._executor.submit(self._prechauffer)
+            self._thread = threading.Thread(target=self._boucle, name="rapthor-scheduler", daemon=True)
+            self._thread.start()
+            print(f"⏰ Rafraîchissement automatique toutes les {self.intervalle} s")
+        return self
+
+    def _prechauffer(self):
+        try:
+            self.prechauffage()
+        except Exception as e:
+            print(f"⚠️ Préchauffage en échec: {e}")
+
+    def _boucle(self):
+        while not self._arret.is_set():
+            try:
+                self.rafraichir(*semaine_courante()).result()
+            except Exception as e:
+                print(f"❌ Rafraîchissement automatique en échec: {e}")
+            self._arret.wait(self.intervalle)
+
+    def rafraichir(self, debut, fin):
+        """
+        Demande un rafraîchissement de la période. Retourne le Future du job :
+        celui déjà en cours pour cette période s'il existe, sinon un nouveau.
+        """
+        with self._verrou:
+            return self._job(debut, fin)
+
+    def suivre(self, debut, fin):
+        """
+        Rafraîchit la période et s'abonne à son job : (Future du job, file des événements).
+        La file (queue.Queue) reçoit les phases, les lots de commandes puis {"type": "fin"} de ce job-là :
+        le job est choisi et la file inscrite sous le même verrou, la fin d'un job précédent ne peut pas s'y glisser.
+        Un abonné arrivé en cours de route reçoit d'abord l'historique.
+        """
+        cle = (debut, fin)
+        file = queue.Queue()
+        with self._verrou:
+            job = self._job(debut, fin)
+            for evenement in self._historique.get(cle, []):
+                file.put(evenement)
+            self._abonnes.setdefault(cle, []).append(file)
+        return job, file
+
+    def _job(self, debut, fin):
+        """Job en cours pour la période, ou nouveau job (appelé sous self._verrou)"""
+        cle = (debut, fin)
+        job = self._en_cours.get(cle)
+        if job is None:
+            self._historique[cle] = []
+            job = self._executor.submit(self._executer, debut, fin)
+            self._en_cours[cle] = job
+        else:
+            print("🔗 Scraping déjà en cours pour cette période, on le rejoint")
+        return job
+
+    def _publier(self, cle, evenement):
+        with self._verrou:
+            self._historique.setdefault(cle, []).append(evenement)
+            abonnes = list(self._abonnes.get(cle, []))
+        for file in abonnes:
+            file.put(evenement)
+
+    def _executer(self, debut, fin):
+        cle = (debut, fin)
+        snapshot = None
+        try:
+            publier = lambda e: self._publier(cle, e)
+            if len(self.comptes) > 1:
+                resultats = scraper_comptes_sync(self.comptes, debut, fin, rappel=publier, store=self.store)
+                reussis = {u: r["commandes"] for u, r in resultats["comptes"].items() if r["success"]}
+            else:
+                scraper = self.scraper_factory(self.username, self.password, store=self.store)
+                resultats = scraper.scraper_commandes(debut, fin, rappel=publier)
+                reussis = {self.username: resultats["commandes"]} if resultats["success"] else {}
+            rapport = None
+            if resultats["success"]:
+                # Un compte en échec ne doit pas faire passer ses commandes pour disparues
+                rapport = self.store.synchroniser(
+                    resultats["commandes"], debut, fin, disparues=len(reussis) == len(self.comptes),
+                )
+                for compte, commandes in reussis.items():
+                    self._archiver(commandes, compte, rapport)
+
+            snapshot = {
+                "horodatage": datetime.now(),
+                "debut": debut,
+                "fin": fin,
+                "success": resultats["success"],
+                "message": resultats["message"],
+                "rapport": rapport,
+                "phases": resultats.get("phases", []),
+                "duree_totale_s": resultats.get("duree_totale_s"),
+                "rapprochement": resultats.get("rapprochement"),
+            }
+            with self._verrou:
+                self._snapshots[cle] = snapshot
+            return snapshot
+        finally:
+            self._publier(cle, {"type": "fin", "snapshot": snapshot})
+            with self._verrou:
+                self._en_cours.pop(cle, None)
+                self._abonnes.pop(cle, None)
+                self._historique.pop(cle, None)
+
+    def _archiver(self, df, compte, rapport):
+        """L'archive est un historique : son échec ne remet pas en cause la synchronisation"""
+        if self.archive is None:
+            return
+        try:
+            self.archive.ajouter(df, compte, rapport)
+        except Exception as e:
+            print(f"⚠️ Archivage Parquet en échec: {e}")
+
+    def snapshot(self, debut, fin):
+        """Dernier résultat publié pour la période (None si jamais rafraîchie)"""
+        with self._verrou:
+            return self._snapshots.get((debut, fin))
+
+    def en_cours(self, debut, fin):
+        with self._verrou:
+            return (debut, fin) in self._en_cours
+
+    def arreter(self):
+        self._arret.set()
+        self._executor.shutdown(wait=False)
@@ -1,292 +1,731 @@
 from playwright.sync_api import sync_playwright
-from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
-import pandas as pd
-import time
+from datetime import datetime
+from urllib.parse import urljoin, urlsplit
+import os
+
+from extraction import DOCUMENTS, extraire_commandes, extraire_documents, extraire_lignes_commande
+from filtres import donnees_filtre, formulaire_filtre_dates, semaine_courante, url_filtre_get
+from http_backend import ConnexionRefusee, HttpBackend, JavascriptRequis
+from instrumentation import Trace
+from navigateur import bloquer_ressources
+from pagination import Pagination, recuperer_pages_http, recuperer_pages_playwright
+from pipeline import (
+    commandes_dataframe, documents_dataframe, filtrer_periode, lignes_dataframe, rapprocher, seuil_par_defaut,
+    vers_enregistrements, vues,
+)
+from reprise import Checkpoint, PortailIndisponible, disjoncteur, reessayer
+from session_store import SessionStore
+from store import empreinte
+
+BACKENDS = ("auto", "http", "playwright")
+
+# Nombre de commandes maximum par lot publié pendant l'extraction
+TAILLE_LOT = 200
+
 
 class AuchanScraper:
-    def __init__(self, username, password):
+    def __init__(self, username, password, session_store=None, backend=None, concurrence=None, navigateur=None,
+                 seuil=None, debug=None, store=None, details=None, concurrence_details=None, documents=None):
         self.username = username
         self.password = password
-        self.base_url = "https://auchan.atgpedi.net"
+        # Surchargeables pour pointer vers un autre portail (ex. benchmarks.portail en local)
+        self.base_url = os.getenv("RAPTHOR_BASE_URL", "https://auchan.atgpedi.net")
+        self.login_url = os.getenv("RAPTHOR_LOGIN_URL", "https://accounts.atgpedi.net/login")
+        self.session_store = session_store or SessionStore()
+        
+        # auto : HTTP pur, puis Playwright seulement si le portail exige JavaScript
+        self.backend = backend or os.getenv("RAPTHOR_BACKEND", "auto")
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Backend inconnu: {self.backend} (attendu: {', '.join(BACKENDS)})")
+        
+        # Nombre maximum de pages de la liste chargées en parallèle
+        self.concurrence = concurrence or int(os.getenv("RAPTHOR_CONCURRENCE", "4"))
+        
+        # Navigateur long-vivant (NavigateurPartage) ; sinon un Firefox est lancé à chaque run
+        self.navigateur = navigateur
+        
+        # Seuil des grosses commandes (850 € par défaut, RAPTHOR_SEUIL)
+        self.seuil = seuil_par_defaut() if seuil is None else seuil
+        
+        # Captures d'écran et dumps HTML : désactivés par défaut (RAPTHOR_DEBUG=1 pour les activer)
+        self.debug = debug if debug is not None else os.getenv("RAPTHOR_DEBUG", "0") == "1"
+        self.debug_dir = os.getenv("RAPTHOR_DEBUG_DIR", "/tmp")
+        
+        # Détail des commandes DESADV (EAN, quantités, prix), mis en cache dans le CommandeStore
+        self.store = store
+        self.details = details if details is not None else os.getenv("RAPTHOR_DETAILS", "1") == "1"
+        self.concurrence_details = concurrence_details or int(os.getenv("RAPTHOR_DETAILS_CONCURRENCE", "8"))
+        
+        # Autres listes @GP lues dans la même session que les commandes (RAPTHOR_DOCUMENTS=desadv,factures)
+        if documents is None:
+            documents = [d.strip() for d in os.getenv("RAPTHOR_DOCUMENTS", "").split(",") if d.strip()]
+        inconnus = [d for d in documents if d not in DOCUMENTS or d == "commandes"]
+        if inconnus:
+            raise ValueError(f"Document(s) inconnu(s): {', '.join(inconnus)} "
+                             f"(attendu: {', '.join(d for d in DOCUMENTS if d != 'commandes')})")
+        self.documents = list(documents)
+        
+        # Suivi de progression du run en cours (voir scraper_commandes)
+        self.rappel = None
+        self.progression = 0.0
+        self.trace = Trace()
         
-    def scraper_commandes(self):
+        # Reprise après échec : pages déjà extraites (par compte et période) et disjoncteur du portail
+        self.checkpoint = None
+        self.disjoncteur = disjoncteur(urlsplit(self.base_url).netloc)
+    
+    @property
+    def url_liste_commandes(self):
+        return self.url_liste("commandes")
+    
+    @property
+    def hotes_portail(self):
+        """Hôtes du portail et de la page de login : les cookies de session qui comptent"""
+        return {urlsplit(url).hostname for url in (self.base_url, self.login_url)}
+    
+    def url_liste(self, type_document):
+        return f"{self.base_url}/gui.php?page={DOCUMENTS[type_document]['page']}"
+        
+    def scraper_commandes(self, debut=None, fin=None, rappel=None):
         """
-        Se connecte au site Auchan et récupère les commandes de la semaine en cours
+        Se connecte au site Auchan et récupère les commandes livrées entre debut et fin
+        (dates incluses, par défaut la semaine ISO en cours).
+        rappel(evenement) reçoit au fil de l'eau les phases et les lots de commandes extraites.
         """
-        resultats = {
+        semaine = semaine_courante()
+        debut = debut or semaine[0]
+        fin = fin or semaine[1]
+        
+        # Une span par phase : durée, tentatives et issue, exposées dans les résultats et les logs
+        self.rappel = rappel
+        self.progression = 0.0
+        self.trace = Trace(rappel=self._publier_phase)
+        self.checkpoint = Checkpoint(self.username, debut, fin)
+        resultats = None
+        
+        # Portail en panne : on ne le relance pas avant la fin du délai du disjoncteur
+        try:
+            self.disjoncteur.verifier()
+        except PortailIndisponible as e:
+            resultats = self._resultats_vides()
+            resultats["message"] = f"Erreur: {e}"
+            print(f"🔌 {e}")
+        
+        if resultats is None and self.backend in ("auto", "http"):
+            try:
+                resultats = self._scraper_http(debut, fin)
+            except JavascriptRequis as e:
+                if self.backend == "http":
+                    resultats = self._resultats_vides()
+                    resultats["message"] = f"Erreur: {e}"
+                else:
+                    print(f"🌐 {e} - bascule sur Playwright")
+        
+        if resultats is None:
+            resultats = self._scraper_playwright(debut, fin)
+        
+        # Run abouti : plus rien à reprendre
+        if resultats["success"]:
+            self.checkpoint.effacer()
+        
+        resultats["phases"] = self.trace.resume()
+        resultats["duree_totale_s"] = self.trace.duree_totale()
+        return resultats
+    
+    def _reessayer(self, span, fonction, *args, **kwargs):
+        """Étape réseau avec backoff exponentiel + jitter, sous le contrôle du disjoncteur du portail"""
+        return reessayer(fonction, *args, span=span, coupe_circuit=self.disjoncteur, **kwargs)
+    
+    def _message_erreur(self, erreur):
+        """Message d'échec, en signalant les pages conservées pour le prochain run"""
+        message = f"Erreur: {erreur}"
+        if self.checkpoint is not None and self.checkpoint.pages:
+            message += f" ({len(self.checkpoint.pages)} page(s) conservée(s) pour la reprise)"
+        return message
+    
+    def _resultats_vides(self):
+        return {
             "success": False,
             "message": "",
-            "commandes": [],
-            "desadv_a_faire": [],
-            "commandes_sup_850": [],
-            "total_par_client": {}
+            **vues(commandes_dataframe([]), self.seuil),
+            "lignes_desadv": lignes_dataframe([]),
+            "documents": {},
+            "rapprochement": None,
+        }
+    
+    def _scraper_http(self, debut, fin):
+        """Backend HTTP pur : aucun navigateur lancé. Lève JavascriptRequis si le portail l'exige."""
+        resultats = self._resultats_vides()
+        backend = HttpBackend(self.base_url, self.login_url)
+        
+        try:
+            html_content = None
+            
+            # Réutiliser les cookies de la session enregistrée si possible
+            cookies = self.session_store.charger_cookies(self.username, self.hotes_portail)
+            if cookies:
+                print("♻️ [HTTP] Session enregistrée trouvée, accès direct aux commandes...")
+                backend.charger_cookies(cookies)
+                with self.trace.span("5_liste_commandes", backend="http", session="reprise") as span:
+                    try:
+                        html_content = self._reessayer(span, backend.page_liste, self.url_liste_commandes)
+                        print("✅ [1-5/7] Session réutilisée, connexion évitée")
+                    except ConnexionRefusee:
+                        span.statut = "session_expiree"
+                        print("⌛ Session expirée côté portail, reconnexion complète")
+                        self.session_store.invalider(self.username)
+            
+            if html_content is None:
+                with self.trace.span("1-4_connexion", backend="http") as span:
+                    print("🔑 [HTTP 1-4/7] Connexion au portail @GP...")
+                    self._reessayer(span, backend.se_connecter, self.username, self.password)
+                    self.session_store.sauvegarder_cookies(self.username, backend.exporter_cookies())
+                    print("✅ Connexion réussie!")
+                
+                with self.trace.span("5_liste_commandes", backend="http") as span:
+                    print("📋 [HTTP 5/7] Chargement de la liste des commandes...")
+                    html_content = self._reessayer(span, backend.page_liste, self.url_liste_commandes)
+            else:
+                self.trace.ignorer("1-4_connexion", "session réutilisée", backend="http")
+            
+            with self.trace.span("6_filtres", backend="http") as span:
+                print("🔍 [HTTP 6/7] Vérification des filtres...")
+                html_sans_filtre = self._reessayer(span, backend.effacer_filtres, html_content, self.url_liste_commandes)
+                if html_sans_filtre is not None:
+                    print("✅ Filtres effacés")
+                    html_content = html_sans_filtre
+                
+                # Demander au portail de ne renvoyer que la période voulue
+                url_courante = self.url_liste_commandes
+                formulaire = formulaire_filtre_dates(html_content, url_courante)
+                if formulaire:
+                    print(f"📅 Filtre portail: livraison du {debut:%d/%m/%Y} au {fin:%d/%m/%Y}")
+                    html_content, url_courante = self._reessayer(
+                        span, backend.appliquer_filtre_dates, formulaire, debut, fin
+                    )
+                else:
+                    print("ℹ️ Pas de filtre de dates sur le portail, filtrage après extraction")
+            
+            with self.trace.span("7_extraction", backend="http") as span:
+                print("📊 [HTTP 7/7] Extraction des commandes...")
+                commandes, nb_pages = self._extraire_toutes_pages(
+                    html_content, url_courante, debut, fin,
+                    lambda urls, rappel: recuperer_pages_http(backend, urls, self.concurrence, rappel),
+                    span,
+                )
+                span.attributs.update(pages=nb_pages, lignes=len(commandes))
+            
+            self._construire_resultats(resultats, commandes, debut, fin)
+            
+            def page_detail(url):
+                try:
+                    return backend.page(url)
+                except Exception as e:
+                    return self._detail_non_recupere(url, e)
+            
+            self._recuperer_details(
+                resultats, commandes, url_courante, "http",
+                lambda urls: recuperer_pages_http(backend, urls, self.concurrence_details, charger=page_detail),
+            )
+            
+            self._recuperer_documents(
+                resultats, "http",
+                lambda type_document, span: self._extraire_document_http(backend, type_document, debut, fin, span),
+            )
+        
+        except JavascriptRequis:
+            raise
+        except Exception as e:
+            resultats["message"] = self._message_erreur(e)
+            print(f"❌ Erreur durant le scraping HTTP: {e}")
+        finally:
+            backend.fermer()
+        
+        return resultats
+    
+    def _extraire_toutes_pages(self, html_content, url_page, debut, fin, recuperer, span=None, extraire=None,
+                               publier=True):
+        """
+        Extrait la première page puis les suivantes (recuperer(urls, rappel) les charge),
+        en publiant chaque page comme un lot dès qu'elle est parsée.
+        Les pages déjà extraites par un run interrompu sont relues depuis le point de reprise,
+        et seules les pages manquantes sont rechargées en cas de nouvel essai : c'est le seul niveau
+        de nouvel essai de la pagination (recuperer ne réessaie pas page par page).
+        extraire(html) remplace l'extraction des commandes pour les autres listes (publier=False).
+        Retourne les lignes fusionnées et le nombre de pages.
+        """
+        pagination = self._paginer(html_content, url_page, debut, fin, span, extraire, publier)
+        if pagination.restantes():
+            print(f"📑 {len(pagination.restantes())} page(s) supplémentaire(s), chargement par {self.concurrence}...")
+            self._reessayer(span, pagination.charger, recuperer)
+        return pagination.resultat(), pagination.nb_pages
+    
+    def _paginer(self, html_content, url_page, debut, fin, span, extraire=None, publier=True):
+        """Pagination de la liste (première page extraite, pages du point de reprise relues)"""
+        publier_lot = (lambda lot, faites, nb_pages: self._publier_lot(lot, debut, fin, faites, nb_pages)) \
+            if publier else None
+        pagination = Pagination(
+            html_content, url_page, extraire or self._extraire_commandes_from_html, self.checkpoint, publier_lot,
+        )
+        if span is not None:
+            span.attributs.update(pages_reprises=len(pagination.reprises))
+        return pagination
+    
+    def _publier(self, evenement):
+        """Transmet un événement de progression au rappel (s'il y en a un) sans jamais casser le scraping"""
+        if self.rappel is None:
+            return
+        # Les phases 1-4 évitées sont publiées après la phase 5 quand la session est réutilisée :
+        # la barre ne doit pas reculer pour autant
+        self.progression = max(self.progression, evenement["progression"])
+        evenement["progression"] = self.progression
+        try:
+            self.rappel(evenement)
+        except Exception as e:
+            print(f"⚠️ Rappel de progression en erreur: {e}")
+    
+    def _publier_phase(self, span):
+        """Les phases 1 à 6 couvrent la première moitié de la progression, l'extraction la seconde"""
+        numero = int(span.nom.split("_")[0].split("-")[-1])
+        termine = span.statut != "en_cours"
+        # La fin de l'extraction (7) et les phases suivantes arrivent après le dernier lot : la barre reste pleine
+        if numero > 7 or (numero == 7 and termine):
+            progression = 1.0
+        else:
+            progression = min(numero - (0 if termine else 1), 6) / 12
+        self._publier({
+            "type": "phase",
+            "phase": span.nom,
+            "statut": span.statut,
+            "duree_s": span.duree,
+            "progression": progression,
+        })
+    
+    def _publier_lot(self, commandes, debut, fin, pages_faites, nb_pages):
+        """Publie les commandes d'une page (par lots de TAILLE_LOT lignes, déjà filtrées sur la période)"""
+        if self.rappel is None:
+            return
+        for i in range(0, max(len(commandes), 1), TAILLE_LOT):
+            lot = commandes[i:i + TAILLE_LOT]
+            self._publier({
+                "type": "commandes",
+                "commandes": filtrer_periode(commandes_dataframe(lot), debut, fin),
+                "pages_faites": pages_faites,
+                "nb_pages": nb_pages,
+                "progression": 0.5 + 0.5 * pages_faites / nb_pages,
+            })
+    
+    def _construire_resultats(self, resultats, commandes, debut, fin):
+        """Remplit le dict de résultats à partir des commandes extraites (un seul DataFrame typé)"""
+        resultats["debut"] = debut
+        resultats["fin"] = fin
+        if commandes:
+            # Filet de sécurité : le filtre du portail peut porter sur une autre date
+            df = filtrer_periode(commandes_dataframe(commandes), debut, fin)
+            periode = f"du {debut:%d/%m/%Y} au {fin:%d/%m/%Y}"
+            
+            resultats.update(vues(df, self.seuil))
+            resultats["success"] = True
+            resultats["message"] = f"{len(df)} commandes trouvées pour la période {periode}"
+            print(f"✅ {len(df)} commandes extraites pour la période {periode}")
+        else:
+            resultats["message"] = "Aucune commande trouvée"
+            print("⚠️ Aucune commande trouvée")
+        return resultats
+    
+    def _recuperer_details(self, resultats, commandes, url_page, backend, recuperer):
+        """
+        8. Lignes des commandes DESADV de la période : lues dans le cache quand la commande n'a pas
+        changé (même numéro, même empreinte), sinon téléchargées par recuperer(urls) en parallèle.
+        """
+        a_faire = self._details_a_faire(resultats, commandes, url_page)
+        if a_faire is None:
+            return
+        empreintes, en_cache, urls = a_faire
+        
+        with self.trace.span("8_details", backend=backend, en_cache=len(en_cache), a_recuperer=len(urls)) as span:
+            pages = []
+            if urls:
+                print(f"🔎 [8] Détail de {len(urls)} commande(s) DESADV ({len(en_cache)} en cache), "
+                      f"par {self.concurrence_details}...")
+                try:
+                    pages = recuperer(list(urls.values()))
+                except Exception as e:
+                    self._details_indisponibles(span, e)
+            else:
+                print(f"✅ [8] Détail des {len(en_cache)} commande(s) DESADV déjà en cache")
+            self._enregistrer_details(resultats, empreintes, dict(zip(urls, pages)), span)
+    
+    def _details_a_faire(self, resultats, commandes, url_page):
+        """
+        (empreintes, numéros en cache, {numéro: url du détail à télécharger}) des commandes DESADV,
+        None si le détail n'est pas demandé pour ce run.
+        """
+        if not self.details or not resultats["success"] or resultats["desadv_a_faire"].empty:
+            return None
+        
+        liens = {c["numero"]: c.get("lien") for c in commandes}
+        empreintes = {c["numero"]: empreinte(c) for c in vers_enregistrements(resultats["desadv_a_faire"])}
+        en_cache = self.store.details_a_jour(empreintes) if self.store is not None else set()
+        urls = {n: urljoin(url_page, liens[n]) for n in empreintes if n not in en_cache and liens.get(n)}
+        return empreintes, en_cache, urls
+    
+    def _detail_non_recupere(self, url, erreur):
+        """Une page de détail en échec n'emporte pas les autres : la commande reste sans détail (None)"""
+        print(f"  ⚠️ Détail non récupéré ({url}): {erreur}")
+        return None
+    
+    def _details_indisponibles(self, span, erreur):
+        # Les commandes restent exploitables sans leur détail
+        span.statut = "erreur"
+        span.erreur = str(erreur)
+        print(f"⚠️ Détail des commandes indisponible: {erreur}")
+    
+    def _enregistrer_details(self, resultats, empreintes, pages, span):
+        """Parse les pages de détail téléchargées ({numéro: html ou None}), les met en cache et remplit les résultats"""
+        details = {
+            numero: (empreintes[numero], extraire_lignes_commande(html_page, self._parse_montant))
+            for numero, html_page in pages.items() if html_page is not None
         }
+        if self.store is not None:
+            self.store.enregistrer_details(details)
+            resultats["lignes_desadv"] = self.store.lignes_commandes(empreintes)
+        else:
+            resultats["lignes_desadv"] = lignes_dataframe([
+                {"numero": numero, **ligne} for numero, (_, lignes) in details.items() for ligne in lignes
+            ])
+        span.attributs.update(lignes=len(resultats["lignes_desadv"]))
+    
+    def _recuperer_documents(self, resultats, backend, extraire_liste):
+        """
+        9. Autres listes @GP (DESADV, factures) dans la session déjà ouverte : extraire_liste(type, span)
+        retourne les documents de la période. Une liste indisponible n'empêche pas le reste du run.
+        Les commandes sont ensuite rapprochées des documents par numéro de commande.
+        """
+        if not self.documents or not resultats["success"]:
+            return
+        
+        for type_document in self.documents:
+            with self.trace.span(f"9_liste_{type_document}", backend=backend) as span:
+                print(f"📄 [9] Liste {type_document}...")
+                try:
+                    documents = extraire_liste(type_document, span)
+                except Exception as e:
+                    self._liste_indisponible(span, type_document, e)
+                    continue
+                self._integrer_documents(resultats, type_document, documents, span)
+        
+        self._rapprocher(resultats)
+    
+    def _liste_indisponible(self, span, type_document, erreur):
+        span.statut = "erreur"
+        span.erreur = str(erreur)
+        print(f"⚠️ Liste {type_document} indisponible: {erreur}")
+    
+    def _integrer_documents(self, resultats, type_document, documents, span):
+        """DataFrame typé des documents extraits, restreint à la période quand la liste porte une date"""
+        schema = DOCUMENTS[type_document]
+        df = documents_dataframe(documents, schema)
+        colonne = schema.get("date_periode")
+        if colonne and df[colonne].notna().any():
+            df = filtrer_periode(df, resultats["debut"], resultats["fin"], colonne)
+        resultats["documents"][type_document] = df
+        span.attributs.update(lignes=len(df))
+        print(f"✅ {len(df)} document(s) {type_document}")
+    
+    def _rapprocher(self, resultats):
+        """Commandes rapprochées des DESADV et factures par numéro de commande"""
+        resultats["rapprochement"] = rapprocher(
+            resultats["commandes"], resultats["documents"].get("desadv"), resultats["documents"].get("factures"),
+        )
+    
+    def _extraire_document_http(self, backend, type_document, debut, fin, span):
+        """Une liste de documents via la session HTTP des commandes : gomme, filtre de dates, pagination"""
+        url_courante = self.url_liste(type_document)
+        # Première page hors disjoncteur : une liste absente du portail n'est pas une panne
+        html_content = backend.page_liste(url_courante)
+        
+        html_sans_filtre = self._reessayer(span, backend.effacer_filtres, html_content, url_courante)
+        if html_sans_filtre is not None:
+            html_content = html_sans_filtre
+        formulaire = formulaire_filtre_dates(html_content, url_courante, DOCUMENTS[type_document]["date_periode"])
+        if formulaire:
+            html_content, url_courante = self._reessayer(span, backend.appliquer_filtre_dates, formulaire, debut, fin)
+        
+        documents, nb_pages = self._extraire_toutes_pages(
+            html_content, url_courante, debut, fin,
+            lambda urls, rappel: recuperer_pages_http(backend, urls, self.concurrence, rappel),
+            span,
+            extraire=lambda html_page: self._extraire_documents_from_html(html_page, type_document),
+            publier=False,
+        )
+        span.attributs.update(pages=nb_pages)
+        return documents
+    
+    def _extraire_document_playwright(self, context, page, type_document, debut, fin, span):
+        """Une liste de documents dans l'onglet des commandes (même contexte, donc même session)"""
+        page.goto(self.url_liste(type_document), timeout=30000, wait_until="domcontentloaded")
+        page.wait_for_selector('table.VL', timeout=30000)
+        
+        self._effacer_filtres(page)
+        self._reessayer(span, self._appliquer_filtre_dates, page, debut, fin, type_document)
+        
+        html_content = self._snapshot_liste(page)
+        if not html_content:
+            return []
+        documents, nb_pages = self._extraire_toutes_pages(
+            html_content, page.url, debut, fin,
+            lambda urls, rappel: recuperer_pages_playwright(context, urls, self.concurrence, rappel),
+            span,
+            extraire=lambda html_page: self._extraire_documents_from_html(html_page, type_document),
+            publier=False,
+        )
+        span.attributs.update(pages=nb_pages)
+        return documents
+    
+    def _scraper_playwright(self, debut, fin):
+        """Backend navigateur (Firefox headless), partagé entre les runs si un NavigateurPartage est fourni"""
+        if self.navigateur is not None:
+            browser = self.navigateur.obtenir()
+            try:
+                return self._scraper_navigateur(browser, debut, fin)
+            finally:
+                self.navigateur.liberer(panne=not browser.is_connected())
         
         with sync_playwright() as p:
             # Lancer Firefox en mode headless (plus stable que Chromium sur serveurs)
             browser = p.firefox.launch(
                 headless=True
             )
+            try:
+                return self._scraper_navigateur(browser, debut, fin)
+            finally:
+                browser.close()
+    
+    def _scraper_navigateur(self, browser, debut, fin):
+        """Scraping dans un contexte isolé du navigateur (fermé à la fin, le navigateur reste ouvert)"""
+        resultats = self._resultats_vides()
+        
+        # Réutiliser la session @GP enregistrée si elle existe encore
+        storage_state = self.session_store.charger(self.username, self.hotes_portail)
+        if storage_state:
+            context = browser.new_context(storage_state=storage_state)
+        else:
             context = browser.new_context()
-            page = context.new_page()
+        bloquer_ressources(context)
+        page = context.new_page()
+        
+        try:
+            session_reprise = False
+            if storage_state:
+                print("♻️ Session enregistrée trouvée, accès direct aux commandes...")
+                with self.trace.span("5_liste_commandes", backend="playwright", session="reprise") as span:
+                    self._reessayer(span, self._ouvrir_liste_commandes, page)
+                    if self._est_page_login(page.url):
+                        span.statut = "session_expiree"
+                        print("⌛ Session expirée côté portail, reconnexion complète")
+                        self.session_store.invalider(self.username)
+                    else:
+                        session_reprise = True
+                        print("✅ [1-5/7] Session réutilisée, connexion évitée")
             
-            try:
-                # 1. Aller directement sur la page de connexion @GP
-                print(f"📡 [1/7] Connexion à la page de login @GP...")
-                page.goto("https://accounts.atgpedi.net/login", timeout=30000)
-                page.wait_for_load_state('networkidle')
-                time.sleep(2)
-                print("✅ Page de login chargée")
-                
-                # 2. Remplir les champs de connexion
-                print("🔑 [2/7] Saisie des identifiants...")
-                page.fill('input[name="_username"]', self.username)
-                page.fill('input[name="_password"]', self.password)
-                print("✅ Identifiants saisis")
-                
-                # 3. Cliquer sur le bouton "Se connecter"
-                print("✅ [3/7] Validation de la connexion...")
-                page.click('button:has-text("Se connecter")')
-                
-                # Attendre que la connexion soit effective
-                page.wait_for_load_state('networkidle', timeout=30000)
-                time.sleep(3)
-                print(f"✅ Redirection effectuée vers: {page.url}")
-                
-                # 4. Vérifier qu'on est bien connecté
-                if "login" in page.url.lower():
-                    raise Exception("Échec de connexion - Vérifiez vos identifiants")
-                
-                print("✅ [4/7] Connexion réussie!")
+            if not session_reprise:
+                self._se_connecter(page)
+                self.session_store.sauvegarder(self.username, context)
                 
                 # 5. Aller sur la page Commandes
-                print("📋 [5/7] Navigation vers la liste des commandes...")
-                page.goto(f"{self.base_url}/gui.php?page=documents_commandes_liste", timeout=30000)
-                page.wait_for_load_state('networkidle', timeout=30000)
-                time.sleep(3)
-                print("✅ Page commandes chargée")
-                
-                # 6. Vérifier s'il y a des filtres actifs et les effacer si nécessaire
+                with self.trace.span("5_liste_commandes", backend="playwright") as span:
+                    print("📋 [5/7] Navigation vers la liste des commandes...")
+                    self._reessayer(span, self._ouvrir_liste_commandes, page)
+                    print("✅ Page commandes chargée")
+            else:
+                for phase in ("1_page_login", "2_identifiants", "3_validation", "4_verification"):
+                    self.trace.ignorer(phase, "session réutilisée", backend="playwright")
+            
+            # 6. Vérifier s'il y a des filtres actifs et les effacer si nécessaire
+            with self.trace.span("6_filtres", backend="playwright") as span:
                 print("🔍 [6/7] Vérification des filtres...")
-                try:
-                    # Chercher le bouton "Effacer" (gomme)
-                    eraser_button = page.locator('.fa.fa-eraser').first
-                    if eraser_button.is_visible(timeout=2000):
-                        print("🧹 Filtres détectés, effacement en cours...")
-                        eraser_button.click()
-                        page.wait_for_load_state('networkidle', timeout=15000)
-                        time.sleep(2)
-                        print("✅ Filtres effacés")
-                    else:
-                        print("ℹ️ Pas de bouton effacer visible")
-                except Exception as e:
-                    print(f"ℹ️ Pas de filtres actifs ou erreur: {e}")
-                
-                # 7. Extraire les données du tableau (toutes les commandes visibles)
+                self._effacer_filtres(page)
+                self._reessayer(span, self._appliquer_filtre_dates, page, debut, fin)
+            
+            # 7. Extraire les données du tableau (toutes les commandes visibles)
+            with self.trace.span("7_extraction", backend="playwright") as span:
                 print("📊 [7/7] Extraction des commandes...")
                 
-                # DEBUG: Prendre une capture d'écran de la page
-                try:
-                    screenshot_path = f"/tmp/page_commandes.png"
-                    page.screenshot(path=screenshot_path, full_page=True)
-                    print(f"📸 Capture d'écran sauvegardée: {screenshot_path}")
-                except Exception as e:
-                    print(f"⚠️ Impossible de prendre la capture: {e}")
-                
-                commandes = self._extraire_commandes(page)
-                
-                if commandes:
-                    # Filtrer pour garder seulement la semaine en cours (24/11 au 30/11)
-                    commandes_semaine = self._filtrer_semaine_courante(commandes)
-                    
-                    resultats["commandes"] = commandes_semaine
-                    resultats["desadv_a_faire"] = self._filtrer_desadv(commandes_semaine)
-                    resultats["commandes_sup_850"] = self._filtrer_montant_sup_850(commandes_semaine)
-                    resultats["total_par_client"] = self._calculer_total_par_client(commandes_semaine)
-                    resultats["success"] = True
-                    resultats["message"] = f"{len(commandes_semaine)} commandes trouvées pour la semaine du 24/11 au 30/11"
-                    print(f"✅ {len(commandes_semaine)} commandes extraites pour cette semaine")
-                else:
-                    resultats["message"] = "Aucune commande trouvée"
-                    print("⚠️ Aucune commande trouvée")
-                
-            except Exception as e:
-                resultats["message"] = f"Erreur: {str(e)}"
-                print(f"❌ Erreur durant le scraping: {e}")
+                self._sauvegarder_debug(page, "page_commandes", full_page=True)
                 
-                # Prendre une capture d'écran pour déboguer
-                try:
-                    screenshot_path = f"/tmp/error_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                    page.screenshot(path=screenshot_path)
-                    print(f"📸 Capture d'écran sauvegardée: {screenshot_path}")
-                except:
-                    pass
-                
-            finally:
+                html_content = self._snapshot_liste(page)
+                commandes, nb_pages = [], 0
+                if html_content:
+                    commandes, nb_pages = self._extraire_toutes_pages(
+                        html_content, page.url, debut, fin,
+                        lambda urls, rappel: recuperer_pages_playwright(context, urls, self.concurrence, rappel),
+                        span,
+                    )
+                span.attributs.update(pages=nb_pages, lignes=len(commandes))
+            
+            self._construire_resultats(resultats, commandes, debut, fin)
+            
+            self._recuperer_details(
+                resultats, commandes, page.url, "playwright",
+                lambda urls: recuperer_pages_playwright(
+                    context, urls, self.concurrence_details, selecteur="table", sur_erreur=self._detail_non_recupere,
+                ),
+            )
+            
+            self._recuperer_documents(
+                resultats, "playwright",
+                lambda type_document, span: self._extraire_document_playwright(
+                    context, page, type_document, debut, fin, span
+                ),
+            )
+            
+        except Exception as e:
+            resultats["message"] = self._message_erreur(e)
+            print(f"❌ Erreur durant le scraping: {e}")
+            
+            self._sauvegarder_debug(page, f"error_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+            
+        finally:
+            try:
                 context.close()
-                browser.close()
+            except Exception as e:
+                # Navigateur planté : le NavigateurPartage le relancera au prochain run
+                print(f"⚠️ Fermeture du contexte impossible: {e}")
         
         return resultats
     
-    def _extraire_commandes_from_html(self, html_content):
-        """Extrait les données du tableau depuis le HTML brut"""
-        commandes = []
-        
+    def _sauvegarder_debug(self, page, nom, full_page=False):
+        """Capture d'écran + HTML de la page, uniquement en mode debug"""
+        if not self.debug:
+            return
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Trouver le tableau
-            table = soup.find('table', class_='VL')
-            
-            if not table:
-                print("❌ Tableau non trouvé dans le HTML")
-                return []
-            
-            # Trouver toutes les lignes du tbody
-            tbody = table.find('tbody')
-            if not tbody:
-                print("❌ tbody non trouvé")
-                return []
-            
-            rows = tbody.find_all('tr')
-            print(f"✓ {len(rows)} lignes trouvées dans le tableau")
+            screenshot_path = os.path.join(self.debug_dir, f"{nom}.png")
+            page.screenshot(path=screenshot_path, full_page=full_page)
+            print(f"📸 Capture d'écran sauvegardée: {screenshot_path}")
             
-            for i, row in enumerate(rows):
+            html_path = os.path.join(self.debug_dir, f"{nom}.html")
+            with open(html_path, "w", encoding="utf-8") as f:
+                f.write(page.content())
+            print(f"📄 HTML sauvegardé: {html_path}")
+        except Exception as e:
+            print(f"⚠️ Impossible de sauvegarder les traces de debug: {e}")
+    
+    def _se_connecter(self, page):
+        """Connexion complète via le formulaire de login @GP (étapes 1 à 4)"""
+        # 1. Aller directement sur la page de connexion @GP
+        with self.trace.span("1_page_login", backend="playwright") as span:
+            print(f"📡 [1/7] Connexion à la page de login @GP...")
+            self._reessayer(span, self._ouvrir_login, page)
+            print("✅ Page de login chargée")
+        
+        # 2. Remplir les champs de connexion
+        with self.trace.span("2_identifiants", backend="playwright"):
+            print("🔑 [2/7] Saisie des identifiants...")
+            page.fill('input[name="_username"]', self.username)
+            page.fill('input[name="_password"]', self.password)
+            print("✅ Identifiants saisis")
+        
+        # 3. Cliquer sur le bouton "Se connecter" et attendre la redirection
+        with self.trace.span("3_validation", backend="playwright"):
+            print("✅ [3/7] Validation de la connexion...")
+            with page.expect_navigation(wait_until="domcontentloaded", timeout=30000):
+                page.click('button:has-text("Se connecter")')
+            print(f"✅ Redirection effectuée vers: {page.url}")
+        
+        # 4. Vérifier qu'on est bien connecté (une redirection JS peut encore suivre)
+        with self.trace.span("4_verification", backend="playwright"):
+            if self._est_page_login(page.url):
                 try:
-                    cells = row.find_all('td')
-                    
-                    # Ignorer les lignes avec trop peu de colonnes
-                    if len(cells) < 8:
-                        continue
-                    
-                    # Extraire les données
-                    numero = cells[1].get_text(strip=True)
-                    client = cells[2].get_text(strip=True)
-                    livrer_a = cells[3].get_text(strip=True)
-                    creation = cells[4].get_text(strip=True)
-                    livraison = cells[5].get_text(strip=True)
-                    gln = cells[6].get_text(strip=True)
-                    montant_str = cells[7].get_text(strip=True)
-                    statut = cells[8].get_text(strip=True) if len(cells) > 8 else ""
-                    
-                    # Parser le montant
-                    montant = self._parse_montant(montant_str)
-                    
-                    # Vérifier si DESADV nécessaire
-                    row_html = str(row)
-                    desadv = "desadv" in row_html.lower()
-                    
-                    commande = {
-                        "numero": numero,
-                        "client": client,
-                        "livrer_a": livrer_a,
-                        "date_creation": creation,
-                        "date_livraison": livraison,
-                        "gln": gln,
-                        "montant": montant,
-                        "statut": statut,
-                        "desadv": desadv
-                    }
-                    
-                    commandes.append(commande)
-                    
-                except Exception as e:
-                    print(f"  ⚠️ Erreur ligne {i+1}: {e}")
-                    continue
+                    page.wait_for_url(lambda url: not self._est_page_login(url), timeout=5000)
+                except Exception:
+                    raise ConnexionRefusee("Échec de connexion - Vérifiez vos identifiants")
+            
+            print("✅ [4/7] Connexion réussie!")
+    
+    def _ouvrir_login(self, page):
+        page.goto(self.login_url, timeout=30000, wait_until="domcontentloaded")
+        page.wait_for_selector('input[name="_username"]', timeout=30000)
+    
+    def _ouvrir_liste_commandes(self, page):
+        """Navigue vers la liste des commandes et attend le tableau (ou le login si la session a expiré)"""
+        page.goto(self.url_liste_commandes, timeout=30000, wait_until="domcontentloaded")
+        page.wait_for_selector('table.VL, input[name="_username"]', timeout=30000)
+    
+    def _effacer_filtres(self, page):
+        """Suit le lien de la gomme si un filtre est actif sur la liste"""
+        try:
+            # Chercher le bouton "Effacer" (gomme) par sa présence : sans CSS ni polices (bloquer_ressources),
+            # l'icône n'a pas de taille et is_visible() la dirait absente
+            gomme = page.locator('.fa.fa-eraser')
+            if gomme.count():
+                print("🧹 Filtres détectés, effacement en cours...")
+                lien = page.locator('a[href]:has(.fa-eraser)')
+                href = lien.first.get_attribute("href") if lien.count() else None
+                if href and not href.startswith(("#", "javascript")):
+                    page.goto(urljoin(page.url, href), timeout=15000, wait_until="domcontentloaded")
+                else:
+                    # Attendre la nouvelle page : le document courant est déjà "domcontentloaded"
+                    # et son ancien tableau satisferait wait_for_selector tout de suite
+                    with page.expect_navigation(wait_until="domcontentloaded", timeout=15000):
+                        gomme.first.dispatch_event("click")
+                page.wait_for_selector('table.VL', timeout=15000)
+                print("✅ Filtres effacés")
+            else:
+                print("ℹ️ Pas de bouton effacer sur la liste")
+        except Exception as e:
+            print(f"ℹ️ Pas de filtres actifs ou erreur: {e}")
+    
+    def _appliquer_filtre_dates(self, page, debut, fin, type_document="commandes"):
+        """Renseigne la plage de dates dans le filtre de la liste, si le portail en propose un sur sa date"""
+        formulaire = formulaire_filtre_dates(page.content(), page.url, DOCUMENTS[type_document]["date_periode"])
+        if not formulaire:
+            print("ℹ️ Pas de filtre de dates sur le portail, filtrage après extraction")
+            return
         
+        print(f"📅 Filtre portail: {formulaire['debut']} / {formulaire['fin']} du {debut:%d/%m/%Y} au {fin:%d/%m/%Y}")
+        if formulaire["methode"] == "get":
+            page.goto(url_filtre_get(formulaire, debut, fin), timeout=30000)
+        else:
+            valeurs = donnees_filtre(formulaire, debut, fin)
+            page.fill(f'input[name="{formulaire["debut"]}"]', valeurs[formulaire["debut"]])
+            page.fill(f'input[name="{formulaire["fin"]}"]', valeurs[formulaire["fin"]])
+            with page.expect_navigation(wait_until="domcontentloaded", timeout=30000):
+                page.locator(f'input[name="{formulaire["fin"]}"]').press("Enter")
+        page.wait_for_selector('table.VL', timeout=30000)
+    
+    def _est_page_login(self, url):
+        """True si le portail nous a renvoyé sur la page de connexion"""
+        return "login" in url.lower()
+    
+    def _extraire_commandes_from_html(self, html_content):
+        """Extrait les données du tableau depuis le HTML brut (colonnes repérées par l'entête)"""
+        try:
+            return extraire_commandes(html_content, self._parse_montant)
         except Exception as e:
             print(f"❌ Erreur parsing HTML: {e}")
-        
-        return commandes
+            return []
     
-    def _extraire_commandes(self, page):
-        """ANCIENNE METHODE - Extrait les données du tableau de commandes"""
-        commandes = []
-        
+    def _extraire_documents_from_html(self, html_content, type_document):
+        """Documents d'une autre liste @GP (DESADV, factures), colonnes repérées par l'entête"""
+        try:
+            return extraire_documents(html_content, DOCUMENTS[type_document], self._parse_montant)
+        except Exception as e:
+            print(f"❌ Erreur parsing HTML ({type_document}): {e}")
+            return []
+    
+    def _snapshot_liste(self, page):
+        """HTML de la liste une fois le tableau présent (None si le tableau n'apparaît pas)"""
         try:
             # Attendre que le tableau soit présent (classe "VL" avec V et L majuscules!)
             print("Attente du tableau...")
             page.wait_for_selector('table.VL tbody tr', timeout=10000)
-            
-            # Extraire toutes les lignes du tableau (tbody tr)
-            rows = page.locator('table.VL tbody tr').all()
-            
-            print(f"✓ Nombre de lignes trouvées dans le tableau: {len(rows)}")
-            
-            for i, row in enumerate(rows):
-                try:
-                    cells = row.locator('td').all()
-                    
-                    # Vérifier qu'on a assez de colonnes (ignorer les lignes vides ou de header)
-                    if len(cells) < 7:
-                        continue
-                    
-                    # Colonnes: Numéro, Client, Livrer à, Création le, Livrer le, GLN, Montant, Statut
-                    numero = cells[0].inner_text().strip()
-                    client = cells[1].inner_text().strip()
-                    livrer_a = cells[2].inner_text().strip()
-                    creation = cells[3].inner_text().strip()
-                    livraison = cells[4].inner_text().strip()
-                    gln = cells[5].inner_text().strip()
-                    montant_str = cells[6].inner_text().strip()
-                    
-                    # Le statut et les icônes sont dans la dernière colonne
-                    statut_cell = cells[7].inner_text().strip() if len(cells) > 7 else ""
-                    
-                    # Parser le montant
-                    montant = self._parse_montant(montant_str)
-                    
-                    # Vérifier si DESADV nécessaire (chercher dans toute la ligne ou dans les attributs)
-                    row_html = row.inner_html()
-                    desadv = "desadv" in row_html.lower()
-                    
-                    commande = {
-                        "numero": numero,
-                        "client": client,
-                        "livrer_a": livrer_a,
-                        "date_creation": creation,
-                        "date_livraison": livraison,
-                        "gln": gln,
-                        "montant": montant,
-                        "statut": statut_cell,
-                        "desadv": desadv
-                    }
-                    
-                    commandes.append(commande)
-                    
-                except Exception as e:
-                    print(f"  ⚠️ Erreur ligne {i+1}: {e}")
-                    continue
-        
         except Exception as e:
             print(f"❌ Erreur extraction tableau: {e}")
+            return None
         
-        return commandes
-    
-    def _filtrer_semaine_courante(self, commandes):
-        """Filtre les commandes pour garder seulement celles de la semaine du 24/11 au 30/11"""
-        commandes_semaine = []
-        
-        # Dates de la semaine courante
-        debut_semaine = datetime(2025, 11, 24)
-        fin_semaine = datetime(2025, 11, 30)
-        
-        for cmd in commandes:
-            try:
-                # Parser la date de livraison (format DD/MM/YYYY)
-                date_liv_str = cmd["date_livraison"]
-                date_liv = datetime.strptime(date_liv_str, "%d/%m/%Y")
-                
-                # Vérifier si la date est dans la semaine
-                if debut_semaine <= date_liv <= fin_semaine:
-                    commandes_semaine.append(cmd)
-            except:
-                # Si erreur de parsing, on garde quand même la commande
-                commandes_semaine.append(cmd)
-        
-        print(f"📅 {len(commandes_semaine)} commandes filtrées pour la semaine du 24/11 au 30/11")
-        return commandes_semaine
+        # Un seul aller-retour navigateur, tout le parsing se fait côté Python
+        return page.content()
     
     def _parse_montant(self, montant_str):
         """Convertit un montant string en float"""
@@ -298,29 +737,3 @@ class AuchanScraper:
             return float(montant_clean)
         except Exception as e:
             return 0.0
-    
-    def _filtrer_desadv(self, commandes):
-        """Filtre les commandes qui nécessitent un DESADV"""
-        return [cmd for cmd in commandes if cmd.get("desadv", False)]
-    
-    def _filtrer_montant_sup_850(self, commandes):
-        """Filtre les commandes avec montant > 850€"""
-        return [cmd for cmd in commandes if cmd["montant"] > 850]
-    
-    def _calculer_total_par_client(self, commandes):
-        """Calcule le total des commandes par client"""
-        totaux = {}
-        for cmd in commandes:
-            client = cmd["client"]
-            if client in totaux:
-                totaux[client]["montant_total"] += cmd["montant"]
-                totaux[client]["nb_commandes"] += 1
-                totaux[client]["commandes"].append(cmd["numero"])
-            else:
-                totaux[client] = {
-                    "montant_total": cmd["montant"],
-                    "nb_commandes": 1,
-                    "commandes": [cmd["numero"]]
-                }
-        
-        return totaux
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import time
+
+
+def cookie_du_portail(cookie, hotes):
+    """True si le cookie est envoyé à l'un des hôtes (domaine identique ou parent : .atgpedi.net)"""
+    domaine = cookie.get("domain", "").lstrip(".").lower()
+    return bool(domaine) and any(hote == domaine or hote.endswith("." + domaine) for hote in hotes)
+
+
+class SessionStore:
+    """
+    Persiste le storage_state Playwright (cookies + local storage) sur disque,
+    un fichier par identifiant @GP, pour éviter de se reconnecter à chaque run.
+    """
+
+    def __init__(self, dossier=None, duree_max=12 * 3600):
+        self.dossier = dossier or os.getenv("RAPTHOR_SESSIONS_DIR", "/tmp/rapthor_sessions")
+        self.duree_max = duree_max
+
+    def chemin(self, username):
+        """Chemin du fichier de session (nom haché pour ne pas exposer l'identifiant)"""
+        cle = hashlib.sha256(username.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.dossier, f"session_{cle}.json")
+
+    def charger(self, username, hotes=None):
+        """
+        Retourne le chemin du storage_state si une session exploitable existe, sinon None.
+        Vérification peu coûteuse (âge du fichier + expiration des cookies), sans réseau.
+        hotes : hôtes du portail (base_url, login_url) ; seuls leurs cookies comptent pour la validité.
+        """
+        chemin = self.chemin(username)
+        if not os.path.exists(chemin):
+            return None
+
+        if time.time() - os.path.getmtime(chemin) > self.duree_max:
+            print("⌛ Session enregistrée trop ancienne, reconnexion nécessaire")
+            self.invalider(username)
+            return None
+
+        try:
+            with open(chemin, encoding="utf-8") as f:
+                etat = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Session illisible, suppression: {e}")
+            self.invalider(username)
+            return None
+
+        # Un cookie du portail doit être soit de session (-1), soit encore valide
+        maintenant = time.time()
+        cookies = [c for c in etat.get("cookies", []) if hotes is None or cookie_du_portail(c, hotes)]
+        if not any(c.get("expires", -1) == -1 or c["expires"] > maintenant for c in cookies):
+            print("⌛ Cookies de session expirés, reconnexion nécessaire")
+            self.invalider(username)
+            return None
+
+        return chemin
+
+    def charger_cookies(self, username, hotes=None):
+        """Cookies de la session enregistrée (format storage_state), liste vide si aucune"""
+        chemin = self.charger(username, hotes)
+        if not chemin:
+            return []
+        with open(chemin, encoding="utf-8") as f:
+            return json.load(f).get("cookies", [])
+
+    def sauvegarder(self, username, context):
+        """Enregistre le storage_state du contexte Playwright"""
+        self._ecrire(username, lambda chemin: context.storage_state(path=chemin))
+
+    def sauvegarder_cookies(self, username, cookies):
+        """Enregistre des cookies HTTP au format storage_state (réutilisable par Playwright)"""
+        self.sauvegarder_etat(username, {"cookies": cookies, "origins": []})
+
+    def sauvegarder_etat(self, username, etat):
+        """Enregistre un storage_state déjà récupéré (ex. via l'API async de Playwright)"""
+        def ecrire(chemin):
+            with open(chemin, "w", encoding="utf-8") as f:
+                json.dump(etat, f)
+
+        self._ecrire(username, ecrire)
+
+    def _ecrire(self, username, ecrire):
+        """Écriture atomique dans un fichier privé"""
+        try:
+            os.makedirs(self.dossier, mode=0o700, exist_ok=True)
+            chemin = self.chemin(username)
+            temporaire = f"{chemin}.tmp"
+            ecrire(temporaire)
+            os.chmod(temporaire, 0o600)
+            os.replace(temporaire, chemin)
+            print(f"💾 Session enregistrée: {chemin}")
+        except Exception as e:
+            print(f"⚠️ Impossible d'enregistrer la session: {e}")
+
+    def invalider(self, username):
+        """Supprime la session enregistrée (expirée ou refusée par le portail)"""
+        try:
+            os.remove(self.chemin(username))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from filtres import parse_date
+from pipeline import COLONNES_LIGNES, commandes_dataframe, lignes_dataframe, vers_enregistrements, vues
+
+
+CHAMPS = ["numero", "client", "livrer_a", "date_creation", "date_livraison", "gln", "montant", "statut", "desadv"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS commandes (
+    numero TEXT PRIMARY KEY,
+    client TEXT NOT NULL,
+    livrer_a TEXT,
+    date_creation TEXT,
+    date_livraison TEXT,
+    gln TEXT,
+    montant REAL NOT NULL DEFAULT 0,
+    statut TEXT,
+    desadv INTEGER NOT NULL DEFAULT 0,
+    livraison TEXT,
+    empreinte TEXT NOT NULL,
+    vu_le TEXT NOT NULL,
+    modifie_le TEXT NOT NULL,
+    disparu INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_commandes_livraison ON commandes (livraison, disparu);
+
+-- Détail des commandes DESADV, valable tant que l'empreinte de la commande ne change pas
+CREATE TABLE IF NOT EXISTS details_commandes (
+    numero TEXT PRIMARY KEY,
+    empreinte TEXT NOT NULL,
+    recupere_le TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lignes_commandes (
+    numero TEXT NOT NULL,
+    rang INTEGER NOT NULL,
+    ean TEXT,
+    libelle TEXT,
+    quantite REAL NOT NULL DEFAULT 0,
+    prix_unitaire REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (numero, rang)
+);
+"""
+
+
+def empreinte(commande):
+    """Hash du contenu d'une commande, pour ne réécrire que ce qui a changé"""
+    contenu = json.dumps([commande.get(c) for c in CHAMPS], ensure_ascii=False, default=str)
+    return hashlib.sha1(contenu.encode("utf-8")).hexdigest()
+
+
+class CommandeStore:
+    """
+    Stockage local des commandes (SQLite en mode WAL), clé = numéro de commande.
+    Les synchronisations sont incrémentales : seules les commandes nouvelles ou modifiées sont écrites.
+    """
+
+    def __init__(self, chemin=None):
+        self.chemin = chemin or os.getenv("RAPTHOR_DB", "/tmp/rapthor.db")
+        self._verrou = threading.Lock()
+        self._connexion = sqlite3.connect(self.chemin, check_same_thread=False)
+        self._connexion.row_factory = sqlite3.Row
+        self._connexion.execute("PRAGMA journal_mode=WAL")
+        self._connexion.execute("PRAGMA synchronous=NORMAL")
+        self._connexion.executescript(_SCHEMA)
+
+        # Change à chaque synchronisation : sert de clé d'invalidation aux caches de l'UI
+        self.version = self.derniere_synchro()
+
+    def synchroniser(self, df, debut, fin, disparues=True):
+        """
+        Intègre le DataFrame d'un scraping couvrant la période [debut, fin].
+        Retourne les numéros nouveaux, modifiés et disparus (absents du portail sur la période).
+        disparues=False quand le scraping est partiel (un compte en échec) : rien n'est marqué disparu.
+        """
+        commandes = vers_enregistrements(df)
+        maintenant = datetime.now().isoformat(timespec="seconds")
+        rapport = {"nouvelles": [], "modifiees": [], "disparues": [], "inchangees": 0}
+
+        with self._verrou, self._connexion:
+            connues = dict(self._connexion.execute(
+                "SELECT numero, empreinte FROM commandes WHERE livraison BETWEEN ? AND ? AND disparu = 0",
+                (debut.isoformat(), fin.isoformat()),
+            ).fetchall())
+
+            a_ecrire = []
+            inchangees = []
+            vues = set()
+            for cmd in commandes:
+                vues.add(cmd["numero"])
+                hash_cmd = empreinte(cmd)
+                ancien = connues.get(cmd["numero"])
+                if ancien == hash_cmd:
+                    inchangees.append((maintenant, cmd["numero"]))
+                    continue
+
+                if ancien is None and not self._existe(cmd["numero"]):
+                    rapport["nouvelles"].append(cmd["numero"])
+                else:
+                    rapport["modifiees"].append(cmd["numero"])
+
+                livraison = parse_date(cmd["date_livraison"])
+                a_ecrire.append((
+                    *(cmd.get(c) for c in CHAMPS[:-1]), int(bool(cmd.get("desadv"))),
+                    livraison.isoformat() if livraison else None, hash_cmd, maintenant, maintenant,
+                ))
+
+            self._connexion.executemany(
+                f"""INSERT INTO commandes ({", ".join(CHAMPS)}, livraison, empreinte, vu_le, modifie_le)
+                    VALUES ({", ".join("?" * (len(CHAMPS) + 4))})
+                    ON CONFLICT(numero) DO UPDATE SET
+                        {", ".join(f"{c} = excluded.{c}" for c in CHAMPS[1:])},
+                        livraison = excluded.livraison, empreinte = excluded.empreinte,
+                        vu_le = excluded.vu_le, modifie_le = excluded.modifie_le, disparu = 0""",
+                a_ecrire,
+            )
+
+            # Les commandes inchangées sont seulement marquées comme vues
+            self._connexion.executemany("UPDATE commandes SET vu_le = ? WHERE numero = ?", inchangees)
+            rapport["inchangees"] = len(inchangees)
+
+            rapport["disparues"] = sorted(set(connues) - vues) if disparues else []
+            self._connexion.executemany(
+                "UPDATE commandes SET disparu = 1, modifie_le = ? WHERE numero = ?",
+                [(maintenant, n) for n in rapport["disparues"]],
+            )
+
+        self.version = datetime.now().isoformat()
+        print(
+            f"🗄️ Synchronisation: {len(rapport['nouvelles'])} nouvelle(s), "
+            f"{len(rapport['modifiees'])} modifiée(s), {len(rapport['disparues'])} disparue(s), "
+            f"{rapport['inchangees']} inchangée(s)"
+        )
+        return rapport
+
+    def _existe(self, numero):
+        return self._connexion.execute("SELECT 1 FROM commandes WHERE numero = ?", (numero,)).fetchone() is not None
+
+    def _requete(self, sql, parametres):
+        with self._verrou:
+            return self._connexion.execute(sql, parametres).fetchall()
+
+    def dataframe(self, debut, fin):
+        """Commandes de la période en un seul DataFrame typé (lecture par l'index sur la livraison)"""
+        with self._verrou:
+            df = pd.read_sql_query(
+                f"""SELECT {", ".join(CHAMPS)} FROM commandes
+                    WHERE livraison BETWEEN ? AND ? AND disparu = 0
+                    ORDER BY livraison, numero""",
+                self._connexion,
+                params=(debut.isoformat(), fin.isoformat()),
+            )
+        return commandes_dataframe(df)
+
+    def details_a_jour(self, empreintes):
+        """Numéros dont le détail est déjà en cache pour la même empreinte (empreintes = {numero: hash})"""
+        if not empreintes:
+            return set()
+        lignes = self._requete(
+            f"""SELECT numero, empreinte FROM details_commandes
+                WHERE numero IN ({", ".join("?" * len(empreintes))})""",
+            tuple(empreintes),
+        )
+        return {l["numero"] for l in lignes if empreintes.get(l["numero"]) == l["empreinte"]}
+
+    def enregistrer_details(self, details):
+        """Remplace le détail des commandes : details = {numero: (empreinte, [lignes])}"""
+        maintenant = datetime.now().isoformat(timespec="seconds")
+        with self._verrou, self._connexion:
+            numeros = [(n,) for n in details]
+            self._connexion.executemany("DELETE FROM lignes_commandes WHERE numero = ?", numeros)
+            self._connexion.executemany(
+                """INSERT INTO details_commandes (numero, empreinte, recupere_le) VALUES (?, ?, ?)
+                   ON CONFLICT(numero) DO UPDATE SET
+                       empreinte = excluded.empreinte, recupere_le = excluded.recupere_le""",
+                [(n, hash_cmd, maintenant) for n, (hash_cmd, _) in details.items()],
+            )
+            self._connexion.executemany(
+                f"""INSERT INTO lignes_commandes (numero, rang, {", ".join(COLONNES_LIGNES[1:])})
+                    VALUES (?, ?, ?, ?, ?, ?)""",
+                [
+                    (n, rang, *(ligne.get(c) for c in COLONNES_LIGNES[1:]))
+                    for n, (_, lignes) in details.items()
+                    for rang, ligne in enumerate(lignes)
+                ],
+            )
+
+    def lignes_commandes(self, numeros):
+        """Lignes en cache des commandes demandées, en un DataFrame typé"""
+        numeros = list(numeros)
+        if not numeros:
+            return lignes_dataframe([])
+        with self._verrou:
+            df = pd.read_sql_query(
+                f"""SELECT {", ".join(COLONNES_LIGNES)} FROM lignes_commandes
+                    WHERE numero IN ({", ".join("?" * len(numeros))})
+                    ORDER BY numero, rang""",
+                self._connexion,
+                params=numeros,
+            )
+        return lignes_dataframe(df)
+
+    def derniere_synchro(self):
+        """Date de la dernière commande vue, None si le stockage est vide"""
+        return self._requete("SELECT MAX(vu_le) FROM commandes", ())[0][0]
+
+    def resultats(self, debut, fin, seuil=None):
+        """Même dict que AuchanScraper.scraper_commandes, lu depuis le stockage"""
+        df = self.dataframe(debut, fin)
+        return {
+            "success": not df.empty,
+            "message": f"{len(df)} commandes en stock pour la période du {debut:%d/%m/%Y} au {fin:%d/%m/%Y}",
+            "debut": debut,
+            "fin": fin,
+            **vues(df, seuil),
+            "lignes_desadv": self.lignes_commandes(df.loc[df["desadv"], "numero"]),
+        }
+
+    def fermer(self):
+        self._connexion.close()
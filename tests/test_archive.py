@@ -0,0 +1,58 @@
+import pandas as pd
+
+from benchmarks.fixtures import generer_commandes
+from archive import ArchiveParquet
+from pipeline import commandes_dataframe
+
+
+def test_compte_avec_caracteres_encodes(tmp_path):
+    """pyarrow encode les valeurs de partition (compta%40x.fr) : comptes() et les filtres doivent suivre"""
+    archive = ArchiveParquet(str(tmp_path))
+    df = commandes_dataframe(generer_commandes(50))
+    debut, fin = df["date_livraison"].min().date(), df["date_livraison"].max().date()
+
+    assert archive.ajouter(df, "compta@x.fr") == 50
+    assert archive.comptes() == ["compta@x.fr"]
+    assert len(archive.lire(debut, fin, ["montant"], tuple(archive.comptes()))) == 50
+
+
+def test_synchronisation_sans_changement_n_ecrit_rien(tmp_path):
+    archive = ArchiveParquet(str(tmp_path))
+    df = commandes_dataframe(generer_commandes(50))
+    archive.ajouter(df, "compta@x.fr")
+
+    assert archive.ajouter(df, "compta@x.fr", {"nouvelles": [], "modifiees": []}) == 0
+
+    modifiee = df.assign(montant=df["montant"].where(df.index != 0, 99999.0))
+    numero = modifiee.loc[0, "numero"]
+    assert archive.ajouter(modifiee, "compta@x.fr", {"nouvelles": [], "modifiees": [numero]}) == 1
+
+    debut, fin = df["date_livraison"].min().date(), df["date_livraison"].max().date()
+    lues = archive.lire(debut, fin, ["montant"])
+    assert len(lues) == 50
+    assert lues.loc[lues["numero"] == numero, "montant"].item() == 99999.0
+
+
+def test_commande_disparue_masquee_a_la_lecture(tmp_path):
+    """Une commande annulée (disparue du portail) ne compte plus dans l'historique, jusqu'à sa réapparition"""
+    archive = ArchiveParquet(str(tmp_path))
+    df = commandes_dataframe(generer_commandes(50))
+    debut, fin = df["date_livraison"].min().date(), df["date_livraison"].max().date()
+    archive.ajouter(df, "compta@x.fr")
+    numero = df.iloc[-1]["numero"]
+
+    rapport = {"nouvelles": [], "modifiees": [], "disparues": [numero]}
+    assert archive.ajouter(df.iloc[:-1], "compta@x.fr", rapport) == 1
+
+    lues = archive.lire(debut, fin, ["montant"])
+    assert len(lues) == 49 and numero not in set(lues["numero"])
+    assert "disparu" not in lues.columns
+    export = pd.read_csv(archive.exporter_csv(debut, fin))
+    assert len(export) == 49 and numero not in set(export["numero"])
+    assert archive.evolution_hebdomadaire(debut, fin, 850)["nb_commandes"].sum() == 49
+
+    # Déjà marquée : une seconde synchronisation n'écrit pas de nouveau marqueur
+    assert archive.ajouter(df.iloc[:-1], "compta@x.fr", rapport) == 0
+
+    assert archive.ajouter(df, "compta@x.fr", {"nouvelles": [], "modifiees": [numero], "disparues": []}) == 1
+    assert len(archive.lire(debut, fin, ["montant"])) == 50
@@ -0,0 +1,27 @@
+from benchmarks.fixtures import generer_commandes, generer_lignes, page_detail_html
+from extraction import extraire_lignes_commande
+from scraper import AuchanScraper
+
+parse_montant = AuchanScraper("test", "test")._parse_montant
+
+
+def test_lignes_commande_sans_ligne_de_total():
+    """La ligne Total (colspan) du détail ne doit pas devenir une ligne de commande"""
+    for commande in generer_commandes(20):
+        lignes = generer_lignes(commande)
+        extraites = extraire_lignes_commande(page_detail_html(commande, lignes), parse_montant)
+
+        assert [l["ean"] for l in extraites] == [l["ean"] for l in lignes]
+        assert [l["quantite"] for l in extraites] == [float(l["quantite"]) for l in lignes]
+        assert [l["prix_unitaire"] for l in extraites] == [l["prix_unitaire"] for l in lignes]
+
+
+def test_lignes_commande_ean_non_numerique_ignore():
+    html_content = (
+        "<table><tr><th>EAN</th><th>Désignation</th><th>Quantité</th><th>Prix unitaire</th></tr>"
+        "<tr><td>3012345678901</td><td>ARTICLE</td><td>2</td><td>1,50 €</td></tr>"
+        "<tr><td>Sous-total</td><td></td><td>2</td><td>3,00 €</td></tr></table>"
+    )
+    extraites = extraire_lignes_commande(html_content, parse_montant)
+
+    assert extraites == [{"ean": "3012345678901", "libelle": "ARTICLE", "quantite": 2.0, "prix_unitaire": 1.5}]
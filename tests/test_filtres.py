@@ -0,0 +1,76 @@
+from datetime import date
+
+from filtres import donnees_filtre, formulaire_filtre_dates, semaine_courante, url_filtre_get
+
+URL = "https://portail.test/gui.php?page=documents_commandes_liste"
+
+
+def test_formulaire_get_champs_texte():
+    html_content = (
+        "<html><body><form method='get' action='gui.php'>"
+        "<input type='hidden' name='page' value='documents_commandes_liste'>"
+        "<input type='text' name='date_livraison_du'><input type='text' name='date_livraison_au'>"
+        "<input type='submit' name='ok' value='Filtrer'></form></body></html>"
+    )
+    formulaire = formulaire_filtre_dates(html_content, URL)
+
+    assert formulaire["action"] == "https://portail.test/gui.php"
+    assert formulaire["methode"] == "get"
+    assert (formulaire["debut"], formulaire["fin"]) == ("date_livraison_du", "date_livraison_au")
+    assert formulaire["format"] == "%d/%m/%Y"
+    assert "ok" not in formulaire["donnees"]
+    assert url_filtre_get(formulaire, date(2026, 10, 12), date(2026, 10, 18)) == (
+        "https://portail.test/gui.php?page=documents_commandes_liste"
+        "&date_livraison_du=12%2F10%2F2026&date_livraison_au=18%2F10%2F2026"
+    )
+
+
+def test_dates_de_livraison_avant_les_autres_dates():
+    """Un formulaire qui porte aussi la date de création doit filtrer sur la livraison, au format ISO en type=date"""
+    html_content = (
+        "<html><body><form method='post'>"
+        "<input type='date' name='date_creation_debut'><input type='date' name='date_creation_fin'>"
+        "<input type='date' name='livraison_debut'><input type='date' name='livraison_fin'>"
+        "</form></body></html>"
+    )
+    formulaire = formulaire_filtre_dates(html_content, URL)
+
+    assert formulaire["action"] == URL
+    assert formulaire["methode"] == "post"
+    assert (formulaire["debut"], formulaire["fin"]) == ("livraison_debut", "livraison_fin")
+    donnees = donnees_filtre(formulaire, date(2026, 10, 12), date(2026, 10, 18))
+    assert (donnees["livraison_debut"], donnees["livraison_fin"]) == ("2026-10-12", "2026-10-18")
+
+
+def test_plage_sur_une_autre_date_ignoree():
+    """Seule la date de création est filtrable : la période de livraison ne doit pas y être envoyée"""
+    html_content = (
+        "<html><body><form method='get' action='gui.php'>"
+        "<input type='text' name='date_creation_du'><input type='text' name='date_creation_au'>"
+        "</form></body></html>"
+    )
+
+    assert formulaire_filtre_dates(html_content, URL) is None
+
+
+def test_plage_sur_la_date_de_la_liste():
+    """Liste des factures : la plage de livraison du même formulaire est ignorée au profit de date_facture"""
+    html_content = (
+        "<html><body><form method='get' action='gui.php'>"
+        "<input type='text' name='date_livraison_du'><input type='text' name='date_livraison_au'>"
+        "<input type='text' name='date_facture_du'><input type='text' name='date_facture_au'>"
+        "</form></body></html>"
+    )
+    formulaire = formulaire_filtre_dates(html_content, URL, "date_facture")
+
+    assert (formulaire["debut"], formulaire["fin"]) == ("date_facture_du", "date_facture_au")
+
+
+def test_pas_de_plage_de_dates():
+    html_content = "<html><body><form><input type='text' name='recherche'></form></body></html>"
+
+    assert formulaire_filtre_dates(html_content, URL) is None
+
+
+def test_semaine_courante_du_lundi_au_dimanche():
+    assert semaine_courante(date(2026, 10, 18)) == (date(2026, 10, 12), date(2026, 10, 18))
@@ -0,0 +1,156 @@
+from datetime import date
+
+from pagination import Pagination, fusionner_commandes, recuperer_pages_playwright, urls_pages_suivantes
+from reprise import Checkpoint
+
+URL = "https://portail.test/gui.php?page=documents_commandes_liste"
+
+
+def _page(liens, texte="", numero="1"):
+    ancres = "".join(f"<a href='{href}'>{libelle}</a>" for href, libelle in liens)
+    return (
+        f"<html><body><table class='VL'><tr><td>{numero}</td></tr></table>"
+        f"<div class='pagination'>{texte}{ancres}</div></body></html>"
+    )
+
+
+def test_numeros_de_page():
+    html_content = _page([(f"gui.php?page=documents_commandes_liste&p={n}", n) for n in (2, 3)], "Page 1 sur 5")
+
+    assert urls_pages_suivantes(html_content, URL) == [f"{URL}&p={n}" for n in (2, 3, 4, 5)]
+
+
+def test_numeros_de_page_en_base_zero():
+    """Lien "2" -> pg=1 : la première page est pg=0, pg=1 est bien la page 2"""
+    html_content = _page([(f"gui.php?page=documents_commandes_liste&pg={n - 1}", n) for n in (2, 3)])
+
+    assert urls_pages_suivantes(html_content, URL) == [f"{URL}&pg=1", f"{URL}&pg=2"]
+
+
+def test_numeros_de_page_en_base_zero_avec_total():
+    html_content = _page([(f"gui.php?page=documents_commandes_liste&pg={n - 1}", n) for n in (2, 3)], "Page 1 sur 4")
+
+    assert urls_pages_suivantes(html_content, URL) == [f"{URL}&pg={n}" for n in (1, 2, 3)]
+
+
+def _liste_suivant_seul(nb_pages):
+    """Pages d'une liste qui n'affiche qu'un lien "Suivant" (ni numéros ni total)"""
+    pages = {}
+    for n in range(1, nb_pages + 1):
+        suivant = [(f"gui.php?page=documents_commandes_liste&p={n + 1}", "Suivant")] if n < nb_pages else []
+        pages[URL if n == 1 else f"{URL}&p={n}"] = _page(suivant, numero=f"C{n}")
+    return pages
+
+
+def _extraire(html_content):
+    return [{"numero": html_content.split("<td>")[1].split("<")[0]}]
+
+
+def test_lien_suivant_seul_parcourt_toute_la_liste(tmp_path):
+    pages = _liste_suivant_seul(5)
+    checkpoint = Checkpoint("compte", date(2026, 10, 12), date(2026, 10, 18), dossier=str(tmp_path))
+    pagination = Pagination(pages[URL], URL, _extraire, checkpoint)
+    chargees = []
+
+    def recuperer(urls, rappel):
+        for url in urls:
+            chargees.append(url)
+            rappel(url, pages[url])
+
+    pagination.charger(recuperer)
+
+    assert [c["numero"] for c in pagination.resultat()] == [f"C{n}" for n in range(1, 6)]
+    assert chargees == [f"{URL}&p={n}" for n in range(2, 6)]
+    assert pagination.nb_pages == 5
+
+
+def test_lien_suivant_seul_reprise(tmp_path):
+    """Une page relue du point de reprise annonce toujours la suivante"""
+    pages = _liste_suivant_seul(4)
+    debut, fin = date(2026, 10, 12), date(2026, 10, 18)
+    Checkpoint("compte", debut, fin, dossier=str(tmp_path)).enregistrer_page(
+        f"{URL}&p=2", [{"numero": "C2"}], [f"{URL}&p=1", f"{URL}&p=3"],
+    )
+    pagination = Pagination(pages[URL], URL, _extraire, Checkpoint("compte", debut, fin, dossier=str(tmp_path)))
+
+    assert pagination.reprises == [f"{URL}&p=2"]
+    assert pagination.restantes() == [f"{URL}&p=3"]
+
+    pagination.charger(lambda urls, rappel: [rappel(url, pages[url]) for url in urls])
+
+    assert [c["numero"] for c in pagination.resultat()] == ["C1", "C2", "C3", "C4"]
+
+
+def test_decalages_avec_total_de_pages():
+    """Seuls 2 liens de décalage visibles : "Page 1 sur 10" donne les 9 pages suivantes"""
+    html_content = _page(
+        [(f"gui.php?page=documents_commandes_liste&start={50 * (n - 1)}", n) for n in (2, 3)], "Page 1 sur 10",
+    )
+
+    assert urls_pages_suivantes(html_content, URL) == [f"{URL}&start={50 * n}" for n in range(1, 10)]
+
+
+def test_parametre_en_plus_sur_les_liens():
+    """Un lien qui ajoute tri=numero reste un lien de pagination de la même liste"""
+    html_content = _page([(f"gui.php?page=documents_commandes_liste&tri=numero&p={n}", n) for n in (2, 3)])
+
+    assert urls_pages_suivantes(html_content, URL) == [f"{URL}&p=2", f"{URL}&p=3"]
+
+
+def test_autre_liste_ignoree():
+    html_content = _page([(f"gui.php?page=documents_factures_liste&p={n}", n) for n in (2, 3)])
+
+    assert urls_pages_suivantes(html_content, URL) == []
+
+
+def test_page_courante_exclue():
+    html_content = _page([(f"gui.php?page=documents_commandes_liste&p={n}", n) for n in (1, 3)])
+
+    assert urls_pages_suivantes(html_content, f"{URL}&p=2") == [f"{URL}&p=1", f"{URL}&p=3"]
+
+
+def test_fusion_sans_doublon():
+    premiere = [{"numero": "A"}, {"numero": "B"}]
+    seconde = [{"numero": "B"}, {"numero": "C"}]
+
+    assert [c["numero"] for c in fusionner_commandes(premiere, seconde)] == ["A", "B", "C"]
+
+
+class _Onglet:
+    """Onglet Playwright minimal : la page /lente n'affiche jamais son tableau"""
+
+    def __init__(self):
+        self.url = None
+
+    def evaluate(self, script, url):
+        self.url = url
+
+    def wait_for_url(self, url, **options):
+        pass
+
+    def wait_for_selector(self, selecteur, **options):
+        if self.url.endswith("/lente"):
+            raise TimeoutError("Timeout 30000ms exceeded")
+
+    def content(self):
+        return f"<html>{self.url}</html>"
+
+    def close(self):
+        pass
+
+
+class _Contexte:
+    def new_page(self):
+        return _Onglet()
+
+
+def test_onglet_en_erreur_sans_perdre_les_autres():
+    urls = ["https://portail.test/1", "https://portail.test/lente", "https://portail.test/3"]
+    erreurs = []
+
+    pages = recuperer_pages_playwright(
+        _Contexte(), urls, concurrence=2, sur_erreur=lambda url, e: erreurs.append(url),
+    )
+
+    assert pages == ["<html>https://portail.test/1</html>", None, "<html>https://portail.test/3</html>"]
+    assert erreurs == ["https://portail.test/lente"]
@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from http_backend import ConnexionRefusee
+from instrumentation import Span
+from reprise import Disjoncteur, reessayer_async
+
+
+def test_reessayer_async_meme_politique_que_reessayer(monkeypatch):
+    monkeypatch.setenv("RAPTHOR_BACKOFF_BASE", "0")
+    disjoncteur = Disjoncteur(seuil=10)
+    span = Span("5_liste_commandes")
+    essais = []
+
+    async def instable():
+        essais.append(1)
+        if len(essais) < 3:
+            raise TimeoutError("portail lent")
+        return "ok"
+
+    assert asyncio.run(reessayer_async(instable, span=span, tentatives=3, coupe_circuit=disjoncteur)) == "ok"
+    assert len(essais) == 3
+    assert span.tentatives == 3
+    assert disjoncteur.echecs == 0
+
+
+def test_reessayer_async_erreur_definitive(monkeypatch):
+    monkeypatch.setenv("RAPTHOR_BACKOFF_BASE", "0")
+    disjoncteur = Disjoncteur(seuil=10)
+    essais = []
+
+    async def refusee():
+        essais.append(1)
+        raise ConnexionRefusee("Échec de connexion - Vérifiez vos identifiants")
+
+    with pytest.raises(ConnexionRefusee):
+        asyncio.run(reessayer_async(refusee, tentatives=3, coupe_circuit=disjoncteur))
+    assert len(essais) == 1
+    assert disjoncteur.echecs == 0
@@ -0,0 +1,93 @@
+import json
+import threading
+from datetime import date
+
+import pytest
+
+import scheduler
+from archive import ArchiveParquet
+from async_engine import comptes_configures
+from benchmarks.fixtures import generer_commandes
+from pipeline import commandes_dataframe
+from scheduler import ScrapeScheduler
+from store import CommandeStore
+
+COMPTES = [{"username": "compta@a.fr", "password": "a"}, {"username": "compta@b.fr", "password": "b"}]
+
+
+def test_plusieurs_comptes_un_compte_en_echec(tmp_path, monkeypatch):
+    """RAPTHOR_COMPTES : un compte en échec ne fait pas disparaître ses commandes, chaque compte est archivé à part"""
+    df = commandes_dataframe(generer_commandes(100))
+    compte_a, compte_b = df.iloc[:50], df.iloc[50:]
+    debut, fin = df["date_livraison"].min().date(), df["date_livraison"].max().date()
+    store = CommandeStore(str(tmp_path / "rapthor.db"))
+    store.synchroniser(df, debut, fin)
+    archive = ArchiveParquet(str(tmp_path / "archive"))
+
+    appels = []
+
+    def scraper_comptes_sync(comptes, debut, fin, rappel=None, store=None):
+        appels.append([c["username"] for c in comptes])
+        return {
+            "success": True,
+            "message": "50 commandes sur 1/2 compte(s)",
+            "commandes": compte_a.assign(compte="compta@a.fr"),
+            "comptes": {
+                "compta@a.fr": {"success": True, "commandes": compte_a},
+                "compta@b.fr": {"success": False, "commandes": compte_b.iloc[:0]},
+            },
+        }
+
+    monkeypatch.setattr(scheduler, "scraper_comptes_sync", scraper_comptes_sync)
+    ordonnanceur = ScrapeScheduler("compta@a.fr", "a", store, archive=archive, comptes=COMPTES)
+    snapshot = ordonnanceur.rafraichir(debut, fin).result()
+    ordonnanceur.arreter()
+
+    assert appels == [["compta@a.fr", "compta@b.fr"]]
+    assert snapshot["success"]
+    assert snapshot["rapport"]["disparues"] == []
+    assert len(store.resultats(debut, fin)["commandes"]) == 100
+    assert archive.comptes() == ["compta@a.fr"]
+
+
+@pytest.mark.parametrize("valeur", ["[]", "{not json", json.dumps({"username": "a", "password": "a"}),
+                                    json.dumps([{"username": "compta@a.fr"}])])
+def test_comptes_configures_invalides(monkeypatch, valeur):
+    """RAPTHOR_COMPTES vide ou mal formé : ValueError (affichée par l'UI) plutôt qu'IndexError au chargement"""
+    monkeypatch.setenv("RAPTHOR_COMPTES", valeur)
+
+    with pytest.raises(ValueError, match="RAPTHOR_COMPTES"):
+        comptes_configures()
+
+
+def test_comptes_configures(monkeypatch):
+    monkeypatch.setenv("RAPTHOR_COMPTES", json.dumps(COMPTES))
+
+    assert comptes_configures() == COMPTES
+
+
+def test_suivre_ne_recoit_que_la_fin_de_son_job(tmp_path):
+    """La fin d'un job terminé ne doit pas arriver dans la file du suivant"""
+    debut, fin = date(2026, 10, 12), date(2026, 10, 18)
+    libere = threading.Event()
+
+    class Scraper:
+        def __init__(self, username, password, store=None):
+            pass
+
+        def scraper_commandes(self, debut, fin, rappel=None):
+            libere.wait(5)
+            return {"success": False, "message": "Portail indisponible"}
+
+    ordonnanceur = ScrapeScheduler("compta@a.fr", "a", CommandeStore(str(tmp_path / "rapthor.db")),
+                                   scraper_factory=Scraper)
+    premier = ordonnanceur.rafraichir(debut, fin)
+    job, file = ordonnanceur.suivre(debut, fin)
+    assert job is premier
+    libere.set()
+    assert file.get(timeout=5)["snapshot"] is job.result()
+
+    job, file = ordonnanceur.suivre(debut, fin)
+    assert job is not premier
+    assert file.get(timeout=5)["snapshot"] is job.result()
+    ordonnanceur.arreter()
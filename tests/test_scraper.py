@@ -0,0 +1,96 @@
+import pytest
+from playwright.sync_api import sync_playwright
+
+from benchmarks.portail import PortailLocal
+from reprise import Disjoncteur
+from scraper import AuchanScraper
+from session_store import SessionStore
+
+
+@pytest.fixture(scope="module")
+def firefox():
+    """Les tests du backend Playwright demandent un Firefox installé (playwright install firefox)"""
+    try:
+        with sync_playwright() as p:
+            p.firefox.launch(headless=True).close()
+    except Exception as e:
+        pytest.skip(f"Firefox indisponible: {e}")
+
+
+@pytest.fixture
+def portail_local(tmp_path, monkeypatch):
+    """
+    (portail, nouveau_scraper) : portail local de 200 commandes (50 par page), points de reprise isolés.
+    nouveau_scraper(**options) crée un AuchanScraper HTTP branché dessus, sans détail ni autre liste,
+    avec un SessionStore partagé par tous les scrapers du test.
+    """
+    monkeypatch.setenv("RAPTHOR_CHECKPOINTS_DIR", str(tmp_path / "checkpoints"))
+    sessions = SessionStore(str(tmp_path / "sessions"))
+    with PortailLocal(200, taille_page=50) as portail:
+        monkeypatch.setenv("RAPTHOR_BASE_URL", portail.url)
+        monkeypatch.setenv("RAPTHOR_LOGIN_URL", f"{portail.url}/login")
+
+        def nouveau_scraper(**options):
+            options = {"session_store": sessions, "backend": "http", "details": False, "documents": [], **options}
+            return AuchanScraper("benchmark", "benchmark", **options)
+
+        yield portail, nouveau_scraper
+
+
+def test_progression_ne_recule_jamais(portail_local):
+    """
+    La fin de la phase 7 arrive après le dernier lot de commandes : elle ne doit pas ramener la barre à 50 %.
+    Au second run la session est réutilisée et les phases 1-4 évitées sont publiées après la phase 5.
+    """
+    portail, nouveau_scraper = portail_local
+    runs = []
+    for _ in range(2):
+        evenements = []
+        runs.append((nouveau_scraper().scraper_commandes(*portail.periode, rappel=evenements.append), evenements))
+
+    assert {p["phase"]: p["statut"] for p in runs[1][0]["phases"]}["1-4_connexion"] == "evitee"
+    for resultats, evenements in runs:
+        assert resultats["success"]
+        progressions = [e["progression"] for e in evenements]
+        assert progressions == sorted(progressions)
+        assert progressions[-1] == 1.0
+
+
+def test_un_seul_niveau_de_nouvel_essai(portail_local, monkeypatch):
+    """Portail instable : chaque essai compte une fois, sur le span comme sur le disjoncteur"""
+    portail, nouveau_scraper = portail_local
+    monkeypatch.setenv("RAPTHOR_BACKOFF_BASE", "0")
+    monkeypatch.setenv("RAPTHOR_TENTATIVES", "5")
+    portail.taille_page = 10
+    portail.taux_erreur = 0.3
+    scraper = nouveau_scraper()
+    scraper.disjoncteur = Disjoncteur(seuil=1000)
+    echecs = []
+    echec = scraper.disjoncteur.echec
+    monkeypatch.setattr(scraper.disjoncteur, "echec", lambda: echecs.append(1) or echec())
+    resultats = scraper.scraper_commandes(*portail.periode)
+
+    phases = [p for p in resultats["phases"] if p["statut"] != "evitee"]
+    assert all(p["tentatives"] <= 5 for p in phases)
+    essais_en_echec = sum(p["tentatives"] - (p["statut"] == "ok") for p in phases)
+    assert essais_en_echec > 0
+    assert len(echecs) == essais_en_echec
+
+
+def test_session_reutilisee_sur_le_portail_local(portail_local):
+    """Le domaine des cookies vient de base_url / login_url : 127.0.0.1 garde sa session d'un run à l'autre"""
+    portail, nouveau_scraper = portail_local
+    runs = [nouveau_scraper().scraper_commandes(*portail.periode) for _ in range(2)]
+
+    connexions = [{p["phase"]: p["statut"] for p in r["phases"]}["1-4_connexion"] for r in runs]
+    assert connexions == ["ok", "evitee"]
+    assert all(r["success"] for r in runs)
+
+
+def test_gomme_suivie_sans_css_sur_playwright(portail_local, firefox):
+    """Le portail local démarre filtré et ne sert aucun CSS : la gomme sans taille doit quand même être suivie"""
+    portail, nouveau_scraper = portail_local
+    resultats = nouveau_scraper(backend="playwright").scraper_commandes(*portail.periode)
+
+    assert resultats["success"]
+    assert len(resultats["commandes"]) == len(portail.filtrer({}))
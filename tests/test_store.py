@@ -0,0 +1,25 @@
+from benchmarks.fixtures import generer_commandes
+from pipeline import commandes_dataframe
+from store import CommandeStore
+
+
+def test_synchronisation_et_vues_du_tableau_de_bord(tmp_path):
+    df = commandes_dataframe(generer_commandes(100))
+    debut, fin = df["date_livraison"].min().date(), df["date_livraison"].max().date()
+    store = CommandeStore(str(tmp_path / "rapthor.db"))
+
+    assert len(store.synchroniser(df, debut, fin)["nouvelles"]) == 100
+
+    modifiee = df.assign(montant=df["montant"].where(df.index != 0, 99999.0)).iloc[:-1]
+    rapport = store.synchroniser(modifiee, debut, fin)
+    assert rapport["modifiees"] == [df.loc[0, "numero"]]
+    assert rapport["disparues"] == [df.iloc[-1]["numero"]]
+    assert rapport["inchangees"] == 98
+
+    resultats = store.resultats(debut, fin, seuil=850)
+    attendu = commandes_dataframe(generer_commandes(100)).iloc[:-1]
+    assert len(resultats["commandes"]) == 99
+    assert set(resultats["desadv_a_faire"]["numero"]) == set(attendu.loc[attendu["desadv"], "numero"])
+    assert set(resultats["commandes_sup_seuil"]["numero"]) == (
+        set(attendu.loc[attendu["montant"] > 850, "numero"]) | {df.loc[0, "numero"]}
+    )